@@ -0,0 +1,90 @@
+"""Compare ``database.load_history`` with ``pd.read_sql`` on a synthetic universe.
+
+Usage:
+    python -m benchmarks.bench_load_history --tickers 200 --days 1260 --layout compact
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.database import get_engine, init_db, load_history, save_daily_metrics
+
+COLUMNS = ["open", "high", "low", "close", "volume", "sma_50", "sma_200"]
+
+
+def _seed(db_path: str, n_tickers: int, n_days: int, layout: str) -> list:
+    init_db(db_path, {"journal_mode": "WAL", "synchronous": "OFF"}, layout)
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2015-01-01", periods=n_days).date
+    symbols = [f"T{i:04d}" for i in range(n_tickers)]
+    for symbol in symbols:
+        close = 100 + rng.normal(0, 1, n_days).cumsum()
+        df = pd.DataFrame({
+            "ticker": symbol, "date": dates, "open": close, "high": close + 1, "low": close - 1,
+            "close": close, "volume": 1000,
+        })
+        df["sma_50"] = df["close"].rolling(50, min_periods=10).mean()
+        df["sma_200"] = df["close"].rolling(200, min_periods=20).mean()
+        save_daily_metrics(db_path, df)
+    return symbols
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--days", type=int, default=1260)
+    parser.add_argument("--layout", choices=["standard", "compact"], default="standard")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        symbols = _seed(db_path, args.tickers, args.days, args.layout)
+        rows = args.tickers * args.days
+        marks = ", ".join("?" * len(symbols))
+        sql = (
+            f"SELECT ticker_symbol, date, {', '.join(COLUMNS)} FROM daily_metrics "
+            f"WHERE ticker_symbol IN ({marks}) ORDER BY ticker_symbol, date"
+        )
+        engine = get_engine(db_path)
+
+        def _read_sql() -> None:
+            with engine.connect() as conn:
+                df = pd.read_sql(
+                    sql, conn.connection.driver_connection, params=symbols, parse_dates=["date"]
+                )
+            # Same shape of result as load_history: one block per ticker
+            {t: g for t, g in df.groupby("ticker_symbol", sort=False)}
+
+        timings = {
+            "pd.read_sql": _time(_read_sql, args.repeat),
+            "load_history": _time(
+                lambda: load_history(db_path, symbols, columns=COLUMNS), args.repeat
+            ),
+            "load_history(arrow)": _time(
+                lambda: load_history(db_path, symbols, columns=COLUMNS, as_arrow=True), args.repeat
+            ),
+        }
+        print(f"{rows} rows, {args.tickers} tickers, layout={args.layout}")
+        for name, secs in timings.items():
+            print(f"{name:>22}: {secs:8.3f}s  {rows / secs:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,14 @@
 __all__ = [
     "config",
     "models",
+    "cache",
+    "providers",
+    "async_fetch",
     "data_fetcher",
+    "indicators",
     "processor",
     "signals",
+    "screener",
     "database",
+    "writer",
 ]
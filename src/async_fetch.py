@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .cache import NegativeCache
+from .config import AppConfig
+from .data_fetcher import FundamentalsSnapshot, fetch_fundamentals, fetch_prices
+from .models import RawData
+from .providers import DataProvider, get_provider
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Asyncio token bucket allowing ``rate`` acquisitions per second, bursting to ``capacity``.
+
+    A non-positive ``rate`` disables limiting. Must be created inside the
+    running event loop.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class _ThrottledProvider:
+    """Provider proxy for executor threads: every call waits on the loop's limiter.
+
+    Each call first takes a slot from the per-host semaphore and a token from
+    the global bucket (both owned by the event loop), then runs the blocking
+    provider call in the calling worker thread.
+    """
+
+    def __init__(
+        self,
+        inner: DataProvider,
+        loop: asyncio.AbstractEventLoop,
+        bucket: TokenBucket,
+        host_slots: asyncio.Semaphore,
+    ):
+        self.inner = inner
+        self.name = inner.name
+        self._loop = loop
+        self._bucket = bucket
+        self._slots = host_slots
+
+    async def _admit(self) -> None:
+        await self._slots.acquire()
+        try:
+            await self._bucket.acquire()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        asyncio.run_coroutine_threadsafe(self._admit(), self._loop).result()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._loop.call_soon_threadsafe(self._slots.release)
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        return self._call(self.inner.history, symbol, period, start, interval)
+
+    def quarterly_balance_sheet(self, symbol):
+        return self._call(self.inner.quarterly_balance_sheet, symbol)
+
+    def balance_sheet(self, symbol):
+        return self._call(self.inner.balance_sheet, symbol)
+
+    def info(self, symbol):
+        return self._call(self.inner.info, symbol)
+
+    def first_trade_date(self, symbol):
+        return self._call(self.inner.first_trade_date, symbol)
+
+
+def _prefetch(snapshot: FundamentalsSnapshot, endpoint: str) -> None:
+    try:
+        snapshot.get(endpoint)
+    except Exception:
+        pass  # not memoised; the fallback chain retries and logs it
+
+
+@dataclass
+class FetchOutcome:
+    ticker: str
+    raw: Optional[RawData] = None
+    error: Optional[BaseException] = None
+    seconds: float = 0.0
+
+
+async def fetch_many_async(
+    tickers: Iterable[str], cfg: AppConfig, provider: Optional[DataProvider] = None
+) -> Dict[str, FetchOutcome]:
+    """Fetch many tickers concurrently under a global rate limit.
+
+    Per ticker, price history and the fundamentals chain run concurrently;
+    across tickers, all fetches overlap subject to ``requests_per_second`` /
+    ``rate_burst`` (token bucket) and ``max_concurrency`` in-flight calls.
+
+    Args:
+        tickers: Ticker symbols.
+        cfg: AppConfig with data settings.
+        provider: Optional provider; defaults to the one selected in config.
+
+    Returns:
+        Mapping of ticker to FetchOutcome, in input order.
+    """
+    settings = cfg.data_settings
+    loop = asyncio.get_running_loop()
+    bucket = TokenBucket(settings.requests_per_second, settings.rate_burst)
+    throttled = _ThrottledProvider(
+        provider or get_provider(settings),
+        loop,
+        bucket,
+        asyncio.Semaphore(max(1, settings.max_concurrency)),
+    )
+    # Three blocking jobs per ticker (history, info prefetch, fundamentals);
+    # extra threads just wait on the limiter
+    n_threads = max(3, 3 * settings.max_concurrency)
+    in_flight = asyncio.Semaphore(max(1, n_threads // 3))
+    negative = NegativeCache.from_settings(settings)
+
+    with ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="fetch") as executor:
+
+        async def _one(ticker: str) -> FetchOutcome:
+            if not settings.incremental and negative.is_empty(ticker):
+                # Skip the fundamentals calls too for symbols known to be empty
+                return FetchOutcome(
+                    ticker=ticker,
+                    error=RuntimeError(f"No price history for {ticker} (negative cache)"),
+                )
+            async with in_flight:
+                start = time.perf_counter()
+                snapshot = FundamentalsSnapshot(ticker, throttled)
+                prices_job = loop.run_in_executor(executor, fetch_prices, ticker, cfg, throttled)
+                # info is always needed; prefetch it alongside the balance-sheet chain
+                info_job = loop.run_in_executor(executor, _prefetch, snapshot, "info")
+                fund_job = loop.run_in_executor(
+                    executor, fetch_fundamentals, ticker, throttled, snapshot
+                )
+                prices_res, _, fund_res = await asyncio.gather(
+                    prices_job, info_job, fund_job, return_exceptions=True
+                )
+                outcome = FetchOutcome(ticker=ticker, seconds=time.perf_counter() - start)
+                if isinstance(prices_res, BaseException):
+                    outcome.error = prices_res
+                elif isinstance(fund_res, BaseException):
+                    outcome.error = fund_res
+                else:
+                    prices, incremental_from = prices_res
+                    fundamentals, filings = fund_res
+                    outcome.raw = RawData(
+                        ticker=ticker,
+                        price_frame=prices,
+                        fundamentals=fundamentals,
+                        filings=filings,
+                        incremental_from=incremental_from,
+                        fetch_timings=dict(snapshot.timings),
+                    )
+                return outcome
+
+        symbols = list(tickers)
+        outcomes = await asyncio.gather(*(_one(t) for t in symbols))
+    logger.info(
+        "Fetched %d tickers (%d failed)",
+        len(outcomes),
+        sum(1 for o in outcomes if o.error is not None),
+    )
+    return {o.ticker: o for o in outcomes}
+
+
+def fetch_many(
+    tickers: Iterable[str], cfg: AppConfig, provider: Optional[DataProvider] = None
+) -> Dict[str, FetchOutcome]:
+    """Synchronous wrapper around ``fetch_many_async``."""
+    return asyncio.run(fetch_many_async(tickers, cfg, provider))
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+from .config import DataSettings
+
+logger = logging.getLogger(__name__)
+
+try:  # Parquet needs pyarrow; fall back to pickle without it
+    import pyarrow  # noqa: F401
+
+    _HAS_PARQUET = True
+except ImportError:
+    _HAS_PARQUET = False
+
+try:  # POSIX advisory locks for the shared negative-cache file
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a response is not cached (or has expired).
+
+    Deliberately not a ``RuntimeError``: that signals a ticker with no price
+    history, whereas a cache miss is a failed fetch.
+    """
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache for raw data-provider responses.
+
+    Entries are keyed by a hash of ticker, endpoint and call parameters. Price
+    frames are stored as Parquet (pickle when pyarrow is unavailable or the
+    frame has non-string column labels, e.g. balance sheets); dicts such as
+    ``info`` are stored as JSON. Freshness is judged from the file mtime
+    against a per-endpoint TTL in seconds; endpoints without a TTL are not cached.
+    """
+
+    def __init__(self, root: str, ttls: Dict[str, int], offline: bool = False):
+        self.root = Path(root)
+        self.ttls = dict(ttls)
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings: DataSettings) -> Optional["ResponseCache"]:
+        if not settings.cache_dir:
+            if settings.offline:
+                raise ValueError("data_settings.offline requires data_settings.cache_dir")
+            return None
+        return cls(settings.cache_dir, settings.cache_ttls, offline=settings.offline)
+
+    @staticmethod
+    def key(ticker: str, endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+        payload = json.dumps(
+            {"ticker": ticker, "endpoint": endpoint, "params": params or {}},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Dict[str, Path]:
+        base = self.root / key[:2] / key
+        return {
+            "parquet": base.with_suffix(".parquet"),
+            "pkl": base.with_suffix(".pkl"),
+            "json": base.with_suffix(".json"),
+        }
+
+    def _read(self, key: str, ttl: Optional[int]) -> Any:
+        for fmt, path in self._paths(key).items():
+            if not path.exists():
+                continue
+            # Offline mode serves stale entries rather than nothing
+            if not self.offline and (ttl is None or time.time() - path.stat().st_mtime > ttl):
+                return None
+            if fmt == "parquet":
+                return pd.read_parquet(path)
+            if fmt == "pkl":
+                return pd.read_pickle(path)
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def _write(self, key: str, value: Any) -> None:
+        paths = self._paths(key)
+        paths["json"].parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(value, pd.DataFrame):
+            if _HAS_PARQUET and all(isinstance(c, str) for c in value.columns):
+                path = paths["parquet"]
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                value.to_parquet(tmp)
+            else:
+                path = paths["pkl"]
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                value.to_pickle(tmp)
+        else:
+            path = paths["json"]
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(value, f, default=str)
+        # Atomic rename so concurrent batch workers never read partial files
+        os.replace(tmp, path)
+
+    def get_or_fetch(
+        self,
+        ticker: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        fetch: Callable[[], Any],
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Return a cached response, or call ``fetch`` and cache its result.
+
+        ``cache_if`` vetoes caching a fetched value (e.g. an empty probe whose
+        expiry belongs to ``NegativeCache``).
+
+        Raises:
+            CacheMiss: In offline mode when no cached entry exists.
+        """
+        key = self.key(ticker, endpoint, params)
+        ttl = self.ttls.get(endpoint)
+        cached = self._read(key, ttl)
+        if cached is not None:
+            self.hits += 1
+            logger.info("Cache hit for %s %s %s", ticker, endpoint, params or "")
+            return cached
+        self.misses += 1
+        if self.offline:
+            raise CacheMiss(f"No cached {endpoint} for {ticker} (offline mode)")
+        logger.info("Cache miss for %s %s %s", ticker, endpoint, params or "")
+        value = fetch()
+        if ttl and value is not None and (cache_if is None or cache_if(value)):
+            self._write(key, value)
+        return value
+
+
+class NegativeCache:
+    """Remembers symbols that returned no price history, with expiry.
+
+    Backed by ``<root>/negative_symbols.json`` when ``root`` is given (shared by
+    batch workers), otherwise kept in memory for the process. Updates are
+    read-modify-write under a process-wide lock, plus an ``flock`` on
+    ``negative_symbols.lock`` across processes where available.
+    """
+
+    # Process-wide store used when no cache directory is configured
+    _memory: Dict[str, float] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, ttl: int, root: Optional[str] = None):
+        self.ttl = ttl
+        self.path = Path(root) / "negative_symbols.json" if root else None
+
+    @classmethod
+    def from_settings(cls, settings: DataSettings) -> "NegativeCache":
+        return cls(settings.negative_cache_ttl, settings.cache_dir)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with NegativeCache._lock:
+            if self.path is None or fcntl is None:
+                yield
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_suffix(".lock"), "a") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, float]:
+        if self.path is None:
+            return dict(NegativeCache._memory)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, entries: Dict[str, float]) -> None:
+        if self.path is None:
+            NegativeCache._memory = entries
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+    def is_empty(self, symbol: str) -> bool:
+        """True if ``symbol`` is known to have no history and the entry has not expired."""
+        if self.ttl <= 0:
+            return False
+        expires = self._load().get(symbol)
+        return expires is not None and expires > time.time()
+
+    def mark_empty(self, symbol: str) -> None:
+        if self.ttl <= 0:
+            return
+        with self._locked():
+            now = time.time()
+            entries = {k: v for k, v in self._load().items() if v > now}
+            entries[symbol] = now + self.ttl
+            self._store(entries)
+
+    def clear(self, symbol: str) -> None:
+        with self._locked():
+            entries = self._load()
+            if symbol in entries:
+                del entries[symbol]
+                self._store(entries)
@@ -3,14 +3,79 @@ from __future__ import annotations
 import logging
 import os
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
 
+# SQLite PRAGMA presets applied on every new connection. "bulk-load" trades
+# durability for throughput during batch ingestion; "read-mostly" favours
+# large caches and memory-mapped reads for screening queries.
+PRAGMA_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "mmap_size": 268435456,
+        "cache_size": -262144,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+    "read-mostly": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 1073741824,
+        "cache_size": -131072,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
 
 @dataclass
 class DatabaseConfig:
     path: str = "financial_data.db"
+    profile: str = "default"
+    # Storage layout for new databases: "standard" or "compact" (integer ticker
+    # ids, epoch-day dates, WITHOUT ROWID table); see the migrate command
+    layout: str = "standard"
+    # Background writer: queued jobs before producers block, and the pending
+    # row count / age (seconds) that triggers a group commit
+    writer_queue: int = 64
+    group_commit_rows: int = 20000
+    group_commit_seconds: float = 0.5
+    # Explicit overrides; None means "take the value from the profile"
+    journal_mode: Optional[str] = None
+    synchronous: Optional[str] = None
+    mmap_size: Optional[int] = None
+    cache_size: Optional[int] = None
+    temp_store: Optional[str] = None
+    busy_timeout: Optional[int] = None
+
+    def pragmas(self, profile: Optional[str] = None) -> Dict[str, Any]:
+        """Resolve SQLite pragmas for a preset with explicit overrides applied.
+
+        Args:
+            profile: Preset name; defaults to the configured ``profile``.
+
+        Returns:
+            Mapping of pragma name to value.
+        """
+        name = profile or self.profile
+        if name not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown database profile: {name}")
+        resolved = dict(PRAGMA_PROFILES[name])
+        for key in resolved:
+            value = getattr(self, key)
+            if value is not None:
+                resolved[key] = value
+        return resolved
 
 
 @dataclass
@@ -22,6 +87,58 @@ class LoggingConfig:
 class DataSettings:
     historical_period: str = "5y"
     min_trading_days_for_sma: int = 200
+    # Only download bars newer than the last stored date
+    incremental: bool = False
+    incremental_overlap_days: int = 5
+    # Days after a balance sheet's period end before ratios use it (publication lag)
+    filing_lag_days: int = 45
+    # On-disk cache of raw yfinance responses; disabled when cache_dir is unset
+    cache_dir: Optional[str] = None
+    # Seconds each endpoint's cached response stays fresh; 0 disables caching it
+    cache_ttls: Dict[str, int] = field(
+        default_factory=lambda: {
+            "history": 6 * 3600,
+            "quarterly_balance_sheet": 24 * 3600,
+            "balance_sheet": 7 * 24 * 3600,
+            "info": 24 * 3600,
+            "first_trade_date": 7 * 24 * 3600,
+        }
+    )
+    # Serve exclusively from cache_dir; never touch the network
+    offline: bool = False
+    # Seconds a symbol with no price history is skipped without any request
+    negative_cache_ttl: int = 24 * 3600
+    # Data source: "yfinance" (live) or "replay" (recorded fixtures in replay_dir)
+    provider: str = "yfinance"
+    replay_dir: Optional[str] = None
+    # Synthetic per-call latency for the replay provider, for load testing
+    replay_latency_ms: float = 0.0
+    # Async fetch engine: global token bucket and per-host in-flight call cap
+    requests_per_second: float = 2.0
+    rate_burst: int = 4
+    max_concurrency: int = 4
+
+
+@dataclass
+class SignalSettings:
+    # Band around the 200SMA, as a fraction of it, the spread must leave to flip regime
+    hysteresis: float = 0.0
+    # Bars a new regime must last for its cross to count; 0 keeps every cross
+    min_gap: int = 0
+
+
+@dataclass
+class IndicatorSpec:
+    """One configured indicator: output ``name``, registered ``kind`` and its params.
+
+    Kinds live in ``src.indicators``; multi-output kinds (macd, bollinger)
+    write ``name_<suffix>`` columns. A ``source``/``reference`` param may name
+    another indicator, which is then computed first.
+    """
+
+    name: str
+    kind: str
+    params: Dict[str, Any] = field(default_factory=dict)
 
 
 @dataclass
@@ -29,6 +146,9 @@ class AppConfig:
     database: DatabaseConfig = field(default_factory=DatabaseConfig)
     logging: LoggingConfig = field(default_factory=LoggingConfig)
     data_settings: DataSettings = field(default_factory=DataSettings)
+    signals: SignalSettings = field(default_factory=SignalSettings)
+    # Extra indicators on top of the fixed DailyMetrics columns
+    indicators: List[IndicatorSpec] = field(default_factory=list)
 
 
 def load_config(path: Optional[str] = None) -> AppConfig:
@@ -51,6 +171,10 @@ def load_config(path: Optional[str] = None) -> AppConfig:
             cfg.logging = LoggingConfig(**data["logging"])
         if "data_settings" in data:
             cfg.data_settings = DataSettings(**data["data_settings"])
+        if "signals" in data:
+            cfg.signals = SignalSettings(**data["signals"])
+        if "indicators" in data:
+            cfg.indicators = [IndicatorSpec(**spec) for spec in data["indicators"] or []]
     return cfg
 
 
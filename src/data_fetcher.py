@@ -1,15 +1,22 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime
+import threading
+import time
+from datetime import date, timedelta
 from decimal import Decimal
-from typing import Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-import yfinance as yf
 
+from .cache import NegativeCache
 from .config import AppConfig
-from .models import PriceBar, RawData, RawFundamentals
+from .database import last_stored_date, load_price_history
+from .indicators import lookback_bars
+from .models import PRICE_COLUMNS, RawData, RawFundamentals, validate_price_frame
+from .processor import INDICATOR_LOOKBACK
+from .providers import DataProvider, get_provider, period_start
 
 logger = logging.getLogger(__name__)
 
@@ -23,118 +30,299 @@ def _safe_decimal(val: Optional[float | int]) -> Optional[Decimal]:
         return None
 
 
-def fetch_stock_data(ticker: str, cfg: AppConfig) -> RawData:
-    """Fetch daily OHLCV and fundamentals from yfinance with fallbacks.
+def _nan_to_none(val: Any) -> Any:
+    return None if val is None or pd.isna(val) else val
 
-    Args:
-        ticker: Ticker symbol (e.g., NVDA, RELIANCE.NS)
-        cfg: AppConfig with data settings.
 
-    Returns:
-        RawData validated by Pydantic.
+def _normalize_history(hist: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Turn a yfinance history frame into lower-case OHLCV columns with a ``date`` column."""
+    if hist is None or hist.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+    hist = hist.reset_index()
+    # yfinance returns 'Date' as datetime64; rename for consistency
+    date_col = "Date" if "Date" in hist.columns else "index"
+    return hist.rename(
+        columns={
+            date_col: "date",
+            "Open": "open",
+            "High": "high",
+            "Low": "low",
+            "Close": "close",
+            "Volume": "volume",
+        }
+    )
+
+
+def _fetch_full_history(ticker: str, cfg: AppConfig, provider: DataProvider) -> pd.DataFrame:
+    """Probe the listing date, then request exactly the range that exists.
+
+    Known-empty symbols are skipped via the negative cache, so delisted or
+    unknown tickers cost no request until the entry expires. Otherwise an
+    empty symbol costs the probe alone and any other symbol the probe plus
+    one history request (from the listing date when it is younger than the
+    configured period). Provider errors propagate: only an actual empty
+    answer marks a symbol as empty.
     """
-    t = yf.Ticker(ticker)
+    negative = NegativeCache.from_settings(cfg.data_settings)
+    if negative.is_empty(ticker):
+        raise RuntimeError(f"No price history for {ticker} (negative cache)")
+
+    first = provider.first_trade_date(ticker)
+    if first is None:
+        negative.mark_empty(ticker)
+        raise RuntimeError(f"No price history returned for {ticker}")
 
-    # Prices
     period = cfg.data_settings.historical_period
-    alt_periods = [period, "2y", "1y", "6mo", "3mo", "1mo", "5d"]
-    hist = None
-    for p in alt_periods:
-        try:
-            logger.info("Fetching price history for %s period=%s", ticker, p)
-            hist_try = t.history(period=p, interval="1d", auto_adjust=False)
-            if hist_try is not None and not hist_try.empty:
-                hist = hist_try
-                break
-        except Exception as e:
-            logger.warning("History fetch failed for %s period=%s: %s", ticker, p, e)
+    lower = period_start(pd.Timestamp(date.today()), period)
+    if lower is None or first > lower.date():
+        logger.info("Fetching price history for %s start=%s (listing date)", ticker, first)
+        hist = provider.history(ticker, start=first)
+    else:
+        logger.info("Fetching price history for %s period=%s", ticker, period)
+        hist = provider.history(ticker, period=period)
+
     if hist is None or hist.empty:
+        negative.mark_empty(ticker)
         raise RuntimeError(f"No price history returned for {ticker}")
+    negative.clear(ticker)
+    return hist
 
-    hist = hist.reset_index()
-    # yfinance returns 'Date' as datetime64; rename for consistency
-    if "Date" in hist.columns:
-        hist.rename(columns={"Date": "date", "Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}, inplace=True)
+
+def fetch_prices(
+    ticker: str, cfg: AppConfig, provider: DataProvider
+) -> Tuple[pd.DataFrame, Optional[date]]:
+    """Fetch and validate daily OHLCV for ``ticker``.
+
+    Returns:
+        Validated price frame and, for incremental fetches, the first date of
+        the newly downloaded range (``None`` for full fetches).
+
+    Raises:
+        RuntimeError: If no usable price history is available. Provider errors
+            (throttling, outages) propagate unchanged, incremental or not.
+    """
+    stored = None
+    last_date = None
+    if cfg.data_settings.incremental:
+        last_date = last_stored_date(cfg.database.path, ticker)
+    if last_date is not None:
+        # Re-request a small overlap window so vendor revisions replace stored bars
+        start = last_date - timedelta(days=cfg.data_settings.incremental_overlap_days)
+        logger.info("Fetching price history for %s start=%s (incremental)", ticker, start)
+        hist = provider.history(ticker, start=start)
+        # Only the trailing window the indicators need; older rows are not recomputed
+        stored = load_price_history(
+            cfg.database.path,
+            ticker,
+            end=start - timedelta(days=1),
+            limit=max(INDICATOR_LOOKBACK, lookback_bars(cfg.indicators)),
+        )
     else:
-        hist.rename(columns={"index": "date", "Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}, inplace=True)
-
-    prices = []
-    for _, row in hist.iterrows():
-        d = row["date"].date() if isinstance(row["date"], (pd.Timestamp, datetime)) else row["date"]
-        prices.append(
-            PriceBar(
-                date=d,
-                open=float(row["open"]),
-                high=float(row["high"]),
-                low=float(row["low"]),
-                close=float(row["close"]),
-                volume=int(row["volume"]) if not pd.isna(row["volume"]) else None,
-            )
+        hist = _fetch_full_history(ticker, cfg, provider)
+
+    prices = validate_price_frame(_normalize_history(hist))
+    if stored is not None and not stored.empty:
+        logger.info(
+            "Merging %d new bars with %d stored bars for %s", len(prices), len(stored), ticker
         )
+        prices = validate_price_frame(pd.concat([stored, prices], ignore_index=True))
+        prices = prices.drop_duplicates("date", keep="last").reset_index(drop=True)
+    if prices.empty:
+        raise RuntimeError(f"No valid price rows returned for {ticker}")
 
-    # Fundamentals with fallback
-    fundamentals = None
-    source_used = None
-    as_of = None
-    currency = None
+    return prices, (start if last_date is not None else None)
 
-    try:
-        qbs = t.quarterly_balance_sheet
-        if qbs is not None and not qbs.empty:
-            source_used = "quarterly_balance_sheet"
-            # Take latest column
-            col = qbs.columns[0]
-            as_of = col.date() if hasattr(col, "date") else None
-            total_equity = _safe_decimal(qbs.get("Total Stockholder Equity", pd.Series([None])).iloc[0] if "Total Stockholder Equity" in qbs.index else None)
-            total_debt = _safe_decimal(qbs.get("Total Debt", pd.Series([None])).iloc[0] if "Total Debt" in qbs.index else None)
-            cash = _safe_decimal(qbs.get("Cash And Cash Equivalents", pd.Series([None])).iloc[0] if "Cash And Cash Equivalents" in qbs.index else None)
+
+class FundamentalsSnapshot:
+    """Lazily fetched, memoised fundamentals responses for one ticker fetch.
+
+    Each endpoint (``info``, ``quarterly_balance_sheet``, ``balance_sheet``) is
+    requested only when first accessed and its response is reused afterwards.
+    Failures are raised but not memoised, so a later access retries a
+    transient error. Access is thread-safe so concurrent readers wait for an
+    in-flight request instead of repeating it. ``timings`` records seconds
+    spent per endpoint. A snapshot is created per fetch and dropped with it.
+    """
+
+    ENDPOINTS = ("info", "quarterly_balance_sheet", "balance_sheet")
+
+    def __init__(self, ticker: str, provider: DataProvider):
+        self.ticker = ticker
+        self.provider = provider
+        self.timings: Dict[str, float] = {}
+        self._results: Dict[str, Any] = {}
+        self._locks = {name: threading.Lock() for name in self.ENDPOINTS}
+
+    def get(self, endpoint: str) -> Any:
+        with self._locks[endpoint]:
+            if endpoint not in self._results:
+                start = time.perf_counter()
+                try:
+                    self._results[endpoint] = getattr(self.provider, endpoint)(self.ticker)
+                finally:
+                    self.timings[endpoint] = time.perf_counter() - start
+            return self._results[endpoint]
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        return self.get("info") or {}
+
+    @property
+    def quarterly_balance_sheet(self) -> Optional[pd.DataFrame]:
+        return self.get("quarterly_balance_sheet")
+
+    @property
+    def balance_sheet(self) -> Optional[pd.DataFrame]:
+        return self.get("balance_sheet")
+
+
+# Balance-sheet line items by filings-table column; yfinance labels vary by
+# version and market, so the first label present wins.
+_FILING_ITEMS: Dict[str, Tuple[str, ...]] = {
+    "total_shareholder_equity": (
+        "Stockholders Equity",
+        "Total Stockholder Equity",
+        "Common Stock Equity",
+    ),
+    "total_debt": ("Total Debt",),
+    "cash_and_short_term_investments": (
+        "Cash And Cash Equivalents",
+        "Cash Cash Equivalents And Short Term Investments",
+    ),
+    "shares_outstanding": ("Ordinary Shares Number", "Share Issued"),
+}
+
+FILING_COLUMNS = ["as_of", *_FILING_ITEMS]
+
+
+def _filings_table(sheet: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Turn a balance sheet (line items x filing dates) into one row per filing."""
+    if sheet is None or sheet.empty:
+        return pd.DataFrame(columns=FILING_COLUMNS)
+    out = pd.DataFrame({"as_of": pd.to_datetime(sheet.columns, errors="coerce")})
+    for col, labels in _FILING_ITEMS.items():
+        label = next((lbl for lbl in labels if lbl in sheet.index), None)
+        values = sheet.loc[label].to_numpy() if label is not None else None
+        if values is None:
+            out[col] = np.nan
         else:
-            raise ValueError("quarterly empty")
-    except Exception:
+            out[col] = pd.to_numeric(pd.Series(values), errors="coerce")
+    out = out.dropna(subset=["as_of"])
+    out["as_of"] = out["as_of"].dt.date
+    return out
+
+
+def fetch_fundamentals(
+    ticker: str, provider: DataProvider, snapshot: Optional[FundamentalsSnapshot] = None
+) -> Tuple[RawFundamentals, pd.DataFrame]:
+    """Fetch fundamentals and the full balance-sheet filing history.
+
+    Every quarterly and annual filing column is kept in a compact filings
+    table (``FILING_COLUMNS``; quarterly wins when both report the same date)
+    for point-in-time joins. ``RawFundamentals`` carries the latest filing,
+    with the quarterly -> annual -> info fallback for its ``source``.
+
+    Responses come from a ``FundamentalsSnapshot``, so ``info`` is requested
+    once even though both the fallback and the share/EV lookup read it.
+
+    Returns:
+        Latest fundamentals and the filings table sorted by ``as_of``.
+    """
+    snapshot = snapshot or FundamentalsSnapshot(ticker, provider)
+    source_used = None
+    currency = None
+    tables = []
+    for name, label in (
+        ("quarterly_balance_sheet", "quarterly_balance_sheet"),
+        ("balance_sheet", "annual_balance_sheet"),
+    ):
         try:
-            abs_ = t.balance_sheet
-            if abs_ is not None and not abs_.empty:
-                source_used = "annual_balance_sheet"
-                col = abs_.columns[0]
-                as_of = col.date() if hasattr(col, "date") else None
-                total_equity = _safe_decimal(abs_.get("Total Stockholder Equity", pd.Series([None])).iloc[0] if "Total Stockholder Equity" in abs_.index else None)
-                total_debt = _safe_decimal(abs_.get("Total Debt", pd.Series([None])).iloc[0] if "Total Debt" in abs_.index else None)
-                cash = _safe_decimal(abs_.get("Cash And Cash Equivalents", pd.Series([None])).iloc[0] if "Cash And Cash Equivalents" in abs_.index else None)
-            else:
-                raise ValueError("annual empty")
-        except Exception:
-            info = t.info or {}
-            source_used = "info"
-            total_equity = None
-            total_debt = _safe_decimal(info.get("totalDebt"))
-            cash = _safe_decimal(info.get("totalCash"))
-            currency = info.get("currency")
-
-    # Shares and per-share book value
-    info = {}
+            table = _filings_table(snapshot.get(name))
+        except Exception as e:
+            logger.warning("Fetching %s failed for %s: %s", name, ticker, e)
+            continue
+        if not table.empty:
+            source_used = source_used or label
+            tables.append(table)
+    filings = (
+        pd.concat(tables, ignore_index=True)
+        .drop_duplicates("as_of", keep="first")
+        .sort_values("as_of")
+        .reset_index(drop=True)
+        if tables
+        else pd.DataFrame(columns=FILING_COLUMNS)
+    )
+
+    info: Dict[str, Any] = {}
     try:
-        info = t.info or {}
-        currency = currency or info.get("currency")
-        shares = info.get("sharesOutstanding")
-        book_value_ps = info.get("bookValue")  # per share
-        enterprise_value = info.get("enterpriseValue")
-    except Exception:
-        shares = None
-        book_value_ps = None
-        enterprise_value = None
+        info = snapshot.info
+    except Exception as e:
+        logger.warning("Fetching info failed for %s: %s", ticker, e)
+
+    if not filings.empty:
+        latest = filings.iloc[-1]
+        as_of = latest["as_of"]
+        total_equity = _safe_decimal(_nan_to_none(latest["total_shareholder_equity"]))
+        total_debt = _safe_decimal(_nan_to_none(latest["total_debt"]))
+        cash = _safe_decimal(_nan_to_none(latest["cash_and_short_term_investments"]))
+    else:
+        source_used = "info"
+        as_of = None
+        total_equity = None
+        total_debt = _safe_decimal(info.get("totalDebt"))
+        cash = _safe_decimal(info.get("totalCash"))
+    currency = info.get("currency")
 
     fundamentals = RawFundamentals(
         total_shareholder_equity=total_equity,
-        shares_outstanding=shares,
+        shares_outstanding=info.get("sharesOutstanding"),
         total_debt=total_debt,
         cash_and_short_term_investments=cash,
-        book_value=_safe_decimal(book_value_ps),
-        enterprise_value=_safe_decimal(enterprise_value),
+        book_value=_safe_decimal(info.get("bookValue")),  # per share
+        enterprise_value=_safe_decimal(info.get("enterpriseValue")),
         currency=currency,
         as_of=as_of,
         source=source_used,
     )
+    return fundamentals, filings
+
+
+def fetch_stock_data(
+    ticker: str, cfg: AppConfig, provider: Optional[DataProvider] = None
+) -> RawData:
+    """Fetch daily OHLCV and fundamentals from the data provider with fallbacks.
+
+    With ``data_settings.incremental`` enabled and bars already stored for the
+    ticker, only bars from the last stored date (minus an overlap window) are
+    downloaded and merged with the trailing ``INDICATOR_LOOKBACK`` stored bars;
+    ``RawData.incremental_from`` marks where the downloaded range starts.
+
+    When ``data_settings.cache_dir`` is set, every provider response goes
+    through the on-disk ``ResponseCache`` (``offline`` serves only from it).
 
-    raw = RawData(ticker=ticker, prices=prices, fundamentals=fundamentals)
-    logger.info("Fetched %d price rows and fundamentals source=%s", len(prices), source_used)
+    Args:
+        ticker: Ticker symbol (e.g., NVDA, RELIANCE.NS)
+        cfg: AppConfig with data settings.
+        provider: Optional provider; defaults to the one selected in config.
+
+    Returns:
+        RawData validated by Pydantic.
+    """
+    provider = provider or get_provider(cfg.data_settings)
+    start = time.perf_counter()
+    prices, incremental_from = fetch_prices(ticker, cfg, provider)
+    history_seconds = time.perf_counter() - start
+    snapshot = FundamentalsSnapshot(ticker, provider)
+    fundamentals, filings = fetch_fundamentals(ticker, provider, snapshot)
+    raw = RawData(
+        ticker=ticker,
+        price_frame=prices,
+        fundamentals=fundamentals,
+        filings=filings,
+        incremental_from=incremental_from,
+        fetch_timings={"history": history_seconds, **snapshot.timings},
+    )
+    logger.info(
+        "Fetched %d price rows and fundamentals source=%s", len(prices), fundamentals.source
+    )
     return raw
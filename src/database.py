@@ -1,27 +1,66 @@
 from __future__ import annotations
 
+import atexit
 import logging
-from datetime import date
-from typing import Iterable, List, Optional
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import (
     Column,
     Date,
     Float,
+    ForeignKey,
     Integer,
     MetaData,
     String,
     UniqueConstraint,
+    and_,
     create_engine,
+    delete,
+    event,
+    func,
+    insert,
     select,
     text,
 )
 from sqlalchemy.dialects.sqlite import insert as sqlite_upsert
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
 
 logger = logging.getLogger(__name__)
 
+try:  # Optional Arrow output for load_history
+    import pyarrow as pa
+
+    _HAS_ARROW = True
+except ImportError:
+    _HAS_ARROW = False
+
+# SQLITE_MAX_VARIABLE_NUMBER default before SQLite 3.32
+SQLITE_MAX_PARAMS = 999
+
+DAILY_METRIC_COLUMNS = [
+    "date",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "sma_50",
+    "sma_200",
+    "high_52w",
+    "pct_from_52w_high",
+    "book_value_per_share",
+    "price_to_book",
+    "enterprise_value",
+]
+
 
 class Base(DeclarativeBase):
     metadata = MetaData()
@@ -61,6 +100,73 @@ class DailyMetric(Base):
     )
 
 
+class DailyMetricCompact(Base):
+    """Compact layout of ``daily_metrics``: clustered on (ticker_id, day), no rowid.
+
+    ``day`` is days since 1970-01-01. In this layout ``daily_metrics`` is a
+    view over this table joined to ``tickers`` (see ``COMPACT_VIEW_SQL``).
+    """
+
+    __tablename__ = "daily_metrics_compact"
+
+    ticker_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("tickers.id"), primary_key=True, autoincrement=False
+    )
+    day: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    open: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    high: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    low: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    close: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    volume: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    sma_50: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    sma_200: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    high_52w: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pct_from_52w_high: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    book_value_per_share: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    price_to_book: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    enterprise_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+_VALUE_COLUMNS = [c for c in DAILY_METRIC_COLUMNS if c != "date"]
+_EPOCH = date(1970, 1, 1)
+# Keeps every reader of ``daily_metrics`` working on the compact layout;
+# ``id`` is synthesised since the compact table has no rowid
+COMPACT_VIEW_SQL = (
+    "CREATE VIEW IF NOT EXISTS daily_metrics AS "
+    "SELECT c.ticker_id * 1000000 + c.day AS id, t.symbol AS ticker_symbol, "
+    "date(c.day * 86400, 'unixepoch') AS date, "
+    + ", ".join(f"c.{col}" for col in _VALUE_COLUMNS)
+    + " FROM daily_metrics_compact c JOIN tickers t ON t.id = c.ticker_id"
+)
+LAYOUTS = ("standard", "compact")
+# Relative tolerance under which a recomputed float counts as unchanged;
+# rolling windows restarted from a different first bar can differ in the last ulps
+_SAME_REL_TOL = 1e-12
+
+
+class LatestMetric(Base):
+    """Each ticker's most recent ``daily_metrics`` row, kept in step by ``save_daily_metrics``."""
+
+    __tablename__ = "latest_metrics"
+
+    ticker_symbol: Mapped[str] = mapped_column(String, primary_key=True)
+    date: Mapped[date] = mapped_column(Date)
+    open: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    high: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    low: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    close: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    volume: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    sma_50: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    sma_200: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    high_52w: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    pct_from_52w_high: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    book_value_per_share: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    price_to_book: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    enterprise_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+
 class SignalEvent(Base):
     __tablename__ = "signal_events"
 
@@ -74,20 +180,443 @@ class SignalEvent(Base):
     )
 
 
-def get_engine(db_path: str):
-    url = f"sqlite:///{db_path}"
-    return create_engine(url, future=True)
+class IndicatorValue(Base):
+    """Configured indicator outputs in long form, one row per (ticker, date, name)."""
 
+    __tablename__ = "indicator_values"
 
-def init_db(db_path: str) -> None:
-    engine = get_engine(db_path)
-    Base.metadata.create_all(engine)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    ticker_symbol: Mapped[str] = mapped_column(String, index=True)
+    date: Mapped[date] = mapped_column(Date, index=True)
+    name: Mapped[str] = mapped_column(String)
+    value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("ticker_symbol", "date", "name", name="uix_indicator_symbol_date_name"),
+    )
+
+
+# Source data kept apart from derived metrics so they can be recomputed offline
+PRICE_BAR_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+FILING_VALUE_COLUMNS = [
+    "total_shareholder_equity",
+    "total_debt",
+    "cash_and_short_term_investments",
+    "shares_outstanding",
+]
+SNAPSHOT_COLUMNS = [
+    "shares_outstanding",
+    "book_value",
+    "enterprise_value",
+    "currency",
+    "as_of",
+    "source",
+]
+
+
+class PriceBar(Base):
+    """Raw OHLCV bars as fetched, one row per (ticker, date)."""
+
+    __tablename__ = "price_bars"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    ticker_symbol: Mapped[str] = mapped_column(String)
+    date: Mapped[date] = mapped_column(Date)
+    open: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    high: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    low: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    close: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    volume: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("ticker_symbol", "date", name="uix_price_bars_symbol_date"),
+    )
+
+
+class Filing(Base):
+    """Balance-sheet filings used for point-in-time fundamentals."""
+
+    __tablename__ = "filings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    ticker_symbol: Mapped[str] = mapped_column(String)
+    as_of: Mapped[date] = mapped_column(Date)
+    total_shareholder_equity: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    total_debt: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    cash_and_short_term_investments: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    shares_outstanding: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("ticker_symbol", "as_of", name="uix_filings_symbol_as_of"),
+    )
+
+
+class TickerFundamentals(Base):
+    """Latest fundamentals snapshot per ticker (the ``info`` fallback values)."""
+
+    __tablename__ = "ticker_fundamentals"
+
+    ticker_symbol: Mapped[str] = mapped_column(String, primary_key=True)
+    shares_outstanding: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    book_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    enterprise_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    currency: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    as_of: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    source: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+
+@dataclass
+class UpsertStats:
+    inserted: int = 0
+    updated: int = 0
+    # Rows identical to what is already stored, so not written at all
+    skipped: int = 0
+
+
+_ENGINES: Dict[str, Tuple[int, Engine, Optional[Dict[str, Any]]]] = {}
+_ENGINES_LOCK = threading.Lock()
+
+_PRAGMA_NAMES = {
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "temp_store",
+    "busy_timeout",
+}
+
+
+def _engine_key(db_path: str) -> str:
+    return db_path if db_path == ":memory:" else os.path.abspath(db_path)
+
+
+def _install_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    for name, value in pragmas.items():
+        if name not in _PRAGMA_NAMES:
+            raise ValueError(f"Unsupported SQLite pragma: {name}")
+        if not isinstance(value, int) and not str(value).isalnum():
+            raise ValueError(f"Invalid value for pragma {name}: {value!r}")
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def get_engine(db_path: str, pragmas: Optional[Dict[str, Any]] = None) -> Engine:
+    """Return the process-wide engine for ``db_path``, creating it on first use.
+
+    Engines are cached per absolute path so every write in a run (and across
+    tickers in a batch) shares one connection pool. An engine inherited from a
+    parent process is discarded without closing the parent's connections.
+
+    Args:
+        db_path: SQLite database path.
+        pragmas: Optional PRAGMA settings applied on every new connection
+            (see ``DatabaseConfig.pragmas``). Passing a different set than the
+            cached engine was built with replaces that engine.
+    """
+    key = _engine_key(db_path)
+    pid = os.getpid()
+    with _ENGINES_LOCK:
+        entry = _ENGINES.get(key)
+        if entry is not None:
+            owner_pid, engine, current = entry
+            if owner_pid == pid and (pragmas is None or pragmas == current):
+                return engine
+            engine.dispose(close=owner_pid == pid)
+        engine = create_engine(f"sqlite:///{db_path}", future=True)
+        if pragmas:
+            _install_pragmas(engine, pragmas)
+        _ENGINES[key] = (pid, engine, dict(pragmas) if pragmas else None)
+        return engine
+
+
+def dispose_engine(db_path: str) -> None:
+    """Close pooled connections for ``db_path`` and drop it from the registry."""
+    with _ENGINES_LOCK:
+        entry = _ENGINES.pop(_engine_key(db_path), None)
+    if entry is not None:
+        entry[1].dispose()
+
+
+def dispose_all_engines() -> None:
+    """Close every cached engine; registered to run at interpreter exit."""
+    with _ENGINES_LOCK:
+        entries = list(_ENGINES.values())
+        _ENGINES.clear()
+    for _, engine, _ in entries:
+        engine.dispose()
+
+
+def _reset_engines_after_fork() -> None:
+    global _ENGINES_LOCK
+    _ENGINES_LOCK = threading.Lock()
+    for _, engine, _ in _ENGINES.values():
+        engine.dispose(close=False)
+    _ENGINES.clear()
+
+
+atexit.register(dispose_all_engines)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
+
+@contextmanager
+def session_scope(db_path: str) -> Iterator[Session]:
+    """Open a session on the cached engine and commit it as one transaction.
+
+    Pass the yielded session to the ``save_*``/``upsert_*`` helpers to group
+    several writes into a single commit.
+    """
+    with Session(get_engine(db_path)) as session:
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+
+@contextmanager
+def _use_session(db_path: str, session: Optional[Session]) -> Iterator[Session]:
+    # Reuse the caller's transaction when given; otherwise commit on our own.
+    if session is not None:
+        yield session
+    else:
+        with session_scope(db_path) as own:
+            yield own
+
+
+_LAYOUT_SQL = "SELECT type FROM sqlite_master WHERE name = 'daily_metrics'"
+
+
+def storage_layout(db_path: str, session: Optional[Session] = None) -> str:
+    """Return ``"compact"`` if ``daily_metrics`` is the compact view, else ``"standard"``.
+
+    Not cached: it is a single ``sqlite_master`` lookup, and reading it each
+    time means a migration by another process is seen at once. Pass
+    ``session`` to read it in the same transaction as the caller's writes.
+    """
+    if session is not None:
+        kind = session.execute(text(_LAYOUT_SQL)).scalar()
+    else:
+        with get_engine(db_path).connect() as conn:
+            kind = conn.execute(text(_LAYOUT_SQL)).scalar()
+    return "compact" if kind == "view" else "standard"
+
+
+def init_db(
+    db_path: str, pragmas: Optional[Dict[str, Any]] = None, layout: str = "standard"
+) -> None:
+    """Create missing tables.
+
+    Args:
+        db_path: SQLite database path.
+        pragmas: Optional PRAGMA settings for the engine.
+        layout: ``"standard"`` or ``"compact"`` for new databases. An existing
+            database keeps its layout; convert it with ``migrate_to_compact``.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown storage layout: {layout}")
+    engine = get_engine(db_path, pragmas)
+    with engine.connect() as conn:
+        existing = conn.execute(text(_LAYOUT_SQL)).scalar()
+    if existing is not None:
+        current = "compact" if existing == "view" else "standard"
+        if current != layout:
+            logger.warning(
+                "%s uses the %s layout; run the migrate command to convert it", db_path, current
+            )
+        layout = current
+    tables = [
+        t
+        for t in Base.metadata.sorted_tables
+        if t.name != ("daily_metrics" if layout == "compact" else "daily_metrics_compact")
+    ]
+    Base.metadata.create_all(engine, tables=tables)
+    if layout == "compact":
+        with engine.begin() as conn:
+            conn.execute(text(COMPACT_VIEW_SQL))
+    with Session(engine) as session:
+        # Databases created before latest_metrics existed get it backfilled once
+        has_latest = session.scalar(select(LatestMetric.ticker_symbol).limit(1)) is not None
+        has_metrics = session.scalar(select(DailyMetric.id).limit(1)) is not None
+        if has_metrics and not has_latest:
+            rebuild_latest_metrics(db_path, session=session)
+            session.commit()
+    # ... and price_bars seeded from the OHLCV copy in daily_metrics
+    _seed_price_bars(engine)
     logger.info("Initialized database at %s", db_path)
 
 
-def upsert_ticker(db_path: str, symbol: str, market: Optional[str], name: Optional[str], currency: Optional[str]) -> None:
+def _seed_price_bars(engine: Engine, batch_tickers: int = 200) -> int:
+    """Copy ``daily_metrics`` OHLCV into ``price_bars`` for tickers that have no bars.
+
+    Tickers are copied ``batch_tickers`` at a time, one transaction each, so
+    seeding a large database never holds one long write lock. A ticker is
+    all-or-nothing, so an interrupted seed resumes on the next ``init_db``.
+
+    Returns:
+        Number of bars copied.
+    """
+    has_bars = select(PriceBar.id).where(PriceBar.ticker_symbol == LatestMetric.ticker_symbol)
+    with engine.connect() as conn:
+        missing = list(
+            conn.scalars(select(LatestMetric.ticker_symbol).where(~has_bars.exists()))
+        )
+    cols = ["ticker_symbol", *PRICE_BAR_COLUMNS]
+    source = select(*(getattr(DailyMetric, c) for c in cols))
+    copied = 0
+    for i in range(0, len(missing), batch_tickers):
+        chunk = missing[i : i + batch_tickers]
+        rows = source.where(DailyMetric.ticker_symbol.in_(chunk))
+        with engine.begin() as conn:
+            copied += conn.execute(insert(PriceBar).from_select(cols, rows)).rowcount
+        logger.info("Seeded price_bars for %d of %d tickers", i + len(chunk), len(missing))
+    return copied
+
+
+def rebuild_latest_metrics(db_path: str, session: Optional[Session] = None) -> int:
+    """Repopulate ``latest_metrics`` from ``daily_metrics`` in one INSERT ... SELECT.
+
+    Returns:
+        Number of tickers written.
+    """
+    last = (
+        select(DailyMetric.ticker_symbol, func.max(DailyMetric.date).label("date"))
+        .group_by(DailyMetric.ticker_symbol)
+        .subquery()
+    )
+    cols = ["ticker_symbol", *DAILY_METRIC_COLUMNS]
+    rows = select(*(getattr(DailyMetric, c) for c in cols)).join(
+        last,
+        and_(DailyMetric.ticker_symbol == last.c.ticker_symbol, DailyMetric.date == last.c.date),
+    )
+    with _use_session(db_path, session) as session:
+        session.execute(delete(LatestMetric))
+        result = session.execute(insert(LatestMetric).from_select(cols, rows))
+    logger.info("Rebuilt latest_metrics for %d tickers", result.rowcount)
+    return result.rowcount
+
+
+def _ticker_ids(session: Session, symbols: Iterable[str]) -> Dict[str, int]:
+    """Map symbols to ``tickers.id``, inserting bare ticker rows for new symbols."""
+    symbols = list(dict.fromkeys(symbols))
+    session.execute(
+        sqlite_upsert(Ticker).on_conflict_do_nothing(index_elements=[Ticker.symbol]),
+        [{"symbol": sym} for sym in symbols],
+    )
+    ids: Dict[str, int] = {}
+    for i in range(0, len(symbols), SQLITE_MAX_PARAMS):
+        chunk = symbols[i : i + SQLITE_MAX_PARAMS]
+        rows = session.execute(select(Ticker.symbol, Ticker.id).where(Ticker.symbol.in_(chunk)))
+        ids.update((sym, tid) for sym, tid in rows)
+    return ids
+
+
+def _save_compact(session: Session, records: List[Dict[str, Any]], chunk_size: int) -> None:
+    ids = _ticker_ids(session, (r["ticker_symbol"] for r in records))
+    rows = [
+        {
+            "ticker_id": ids[r["ticker_symbol"]],
+            "day": (r["date"] - _EPOCH).days,
+            **{col: r[col] for col in _VALUE_COLUMNS},
+        }
+        for r in records
+    ]
+    insert_stmt = sqlite_upsert(DailyMetricCompact)
+    stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[DailyMetricCompact.ticker_id, DailyMetricCompact.day],
+        set_={col: insert_stmt.excluded[col] for col in _VALUE_COLUMNS},
+    )
+    for i in range(0, len(rows), chunk_size):
+        session.execute(stmt, rows[i : i + chunk_size])
+
+
+def migrate_to_compact(db_path: str, batch_size: int = 50000, vacuum: bool = False) -> int:
+    """Convert a standard-layout database to the compact layout in place.
+
+    Rows are copied in ``batch_size`` id ranges, each in its own transaction,
+    so memory stays flat and an interrupted run leaves the original table
+    intact (rerunning starts over idempotently). The old table and its
+    indexes are then dropped and replaced by the ``daily_metrics`` view.
+
+    Args:
+        db_path: SQLite database path.
+        batch_size: Rows copied per transaction.
+        vacuum: Run VACUUM afterwards to return freed pages to the OS.
+
+    Returns:
+        Number of rows copied (0 if the database was already compact).
+    """
+    init_db(db_path)
+    if storage_layout(db_path) == "compact":
+        logger.info("%s already uses the compact layout", db_path)
+        return 0
     engine = get_engine(db_path)
-    with Session(engine) as session:
+    Base.metadata.create_all(engine, tables=[DailyMetricCompact.__table__])
+    value_cols = ", ".join(_VALUE_COLUMNS)
+    copy_sql = text(
+        f"INSERT OR REPLACE INTO daily_metrics_compact (ticker_id, day, {value_cols}) "
+        "SELECT t.id, CAST(julianday(m.date) - 2440587.5 AS INTEGER), "
+        + ", ".join(f"m.{col}" for col in _VALUE_COLUMNS)
+        + " FROM daily_metrics m JOIN tickers t ON t.symbol = m.ticker_symbol"
+        " WHERE m.id > :lo AND m.id <= :hi"
+    )
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT OR IGNORE INTO tickers (symbol) "
+                "SELECT DISTINCT ticker_symbol FROM daily_metrics"
+            )
+        )
+        max_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM daily_metrics")).scalar()
+    copied = 0
+    for lo in range(0, max_id, batch_size):
+        with engine.begin() as conn:
+            copied += conn.execute(copy_sql, {"lo": lo, "hi": lo + batch_size}).rowcount
+        logger.info("Migrated daily_metrics rows up to id %d", min(lo + batch_size, max_id))
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE daily_metrics"))
+        conn.execute(text(COMPACT_VIEW_SQL))
+    if vacuum:
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    logger.info("Migrated %d daily_metrics rows of %s to the compact layout", copied, db_path)
+    return copied
+
+
+def _save_latest(session: Session, df: pd.DataFrame, records: List[Dict[str, Any]]) -> None:
+    """Upsert each ticker's newest row of ``df`` unless a newer one is already stored."""
+    order = pd.DataFrame({
+        "ticker": df["ticker"].to_numpy(),
+        "date": df["date"].to_numpy(),
+        "pos": np.arange(len(df)),
+    }).sort_values(["ticker", "date"], kind="stable")
+    newest = order.drop_duplicates("ticker", keep="last")["pos"]
+    insert_stmt = sqlite_upsert(LatestMetric)
+    stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[LatestMetric.ticker_symbol],
+        set_={col: insert_stmt.excluded[col] for col in DAILY_METRIC_COLUMNS},
+        where=insert_stmt.excluded.date >= LatestMetric.date,
+    )
+    session.execute(stmt, [records[p] for p in newest])
+
+
+def upsert_ticker(
+    db_path: str,
+    symbol: str,
+    market: Optional[str],
+    name: Optional[str],
+    currency: Optional[str],
+    session: Optional[Session] = None,
+) -> None:
+    with _use_session(db_path, session) as session:
         stmt = sqlite_upsert(Ticker).values(
             symbol=symbol, market=market, name=name, currency=currency
         )
@@ -97,61 +626,648 @@ def upsert_ticker(db_path: str, symbol: str, market: Optional[str], name: Option
             "currency": stmt.excluded.currency,
         })
         session.execute(stmt)
-        session.commit()
 
 
-def save_daily_metrics(db_path: str, df: pd.DataFrame) -> None:
+def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a metrics frame into DB-ready dicts with NaN/NA mapped to None."""
+    out = pd.DataFrame(index=df.index)
+    out["ticker_symbol"] = df["ticker"]
+    for col in DAILY_METRIC_COLUMNS:
+        if col == "date":
+            out[col] = df["date"]
+        elif col in df.columns:
+            out[col] = df[col]
+        else:
+            out[col] = None
+    out = out.astype(object).where(out.notna(), None)
+    records = out.to_dict("records")
+    for rec in records:
+        if rec["volume"] is not None:
+            rec["volume"] = int(rec["volume"])
+    return records
+
+
+def _indicator_records(df: pd.DataFrame, columns: Sequence[str]) -> List[Dict[str, Any]]:
+    """Melt the configured indicator ``columns`` present in ``df`` to long rows."""
+    extra = [c for c in columns if c in df.columns and c not in DAILY_METRIC_COLUMNS]
+    if not extra:
+        return []
+    values = df[extra].to_numpy(dtype="float64")
+    n = len(df)
+    flat = values.ravel(order="F")
+    return [
+        {"ticker_symbol": t, "date": d, "name": name, "value": None if v != v else float(v)}
+        for t, d, name, v in zip(
+            np.tile(df["ticker"].to_numpy(), len(extra)),
+            np.tile(df["date"].to_numpy(), len(extra)),
+            np.repeat(np.asarray(extra, dtype=object), n),
+            flat,
+        )
+    ]
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Whether a new value equals the stored one (floats within ``_SAME_REL_TOL``)."""
+    if a is None or b is None:
+        return a is None and b is None
+    return a == b or abs(a - b) <= _SAME_REL_TOL * max(abs(a), abs(b))
+
+
+def _stored_indicators(
+    session: Session, symbol: str, lo: date, hi: date
+) -> Dict[Tuple[date, str], Optional[float]]:
+    rows = session.execute(
+        select(IndicatorValue.date, IndicatorValue.name, IndicatorValue.value).where(
+            IndicatorValue.ticker_symbol == symbol, IndicatorValue.date.between(lo, hi)
+        )
+    )
+    return {(d, name): value for d, name, value in rows}
+
+
+def _save_indicator_values(
+    session: Session, df: pd.DataFrame, columns: Sequence[str], chunk_size: int
+) -> int:
+    """Upsert indicator outputs that are new or changed; returns the rows written."""
+    records = _indicator_records(df, columns)
+    if not records:
+        return 0
+    stored: Dict[Tuple[str, date, str], Optional[float]] = {}
+    for symbol, dates in df.groupby("ticker", sort=False)["date"]:
+        existing = _stored_indicators(session, symbol, dates.min(), dates.max())
+        for (d, name), value in existing.items():
+            stored[(symbol, d, name)] = value
+    keys = [(r["ticker_symbol"], r["date"], r["name"]) for r in records]
+    records = [
+        r for r, k in zip(records, keys) if k not in stored or not _same(r["value"], stored[k])
+    ]
+    insert_stmt = sqlite_upsert(IndicatorValue)
+    stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[IndicatorValue.ticker_symbol, IndicatorValue.date, IndicatorValue.name],
+        set_={"value": insert_stmt.excluded.value},
+    )
+    for i in range(0, len(records), chunk_size):
+        session.execute(stmt, records[i : i + chunk_size])
+    return len(records)
+
+
+def _stored_rows(
+    session: Session, layout: str, symbol: str, lo: date, hi: date
+) -> Dict[date, Tuple[Any, ...]]:
+    """Stored metric values (``_VALUE_COLUMNS`` order) of ``symbol`` keyed by date."""
+    if layout == "compact":
+        ticker_id = session.execute(select(Ticker.id).where(Ticker.symbol == symbol)).scalar()
+        if ticker_id is None:
+            return {}
+        cols = [getattr(DailyMetricCompact, c) for c in _VALUE_COLUMNS]
+        rows = session.execute(
+            select(DailyMetricCompact.day, *cols).where(
+                DailyMetricCompact.ticker_id == ticker_id,
+                DailyMetricCompact.day.between((lo - _EPOCH).days, (hi - _EPOCH).days),
+            )
+        )
+        return {_EPOCH + timedelta(days=r[0]): tuple(r[1:]) for r in rows}
+    cols = [getattr(DailyMetric, c) for c in _VALUE_COLUMNS]
+    rows = session.execute(
+        select(DailyMetric.date, *cols).where(
+            DailyMetric.ticker_symbol == symbol, DailyMetric.date.between(lo, hi)
+        )
+    )
+    return {r[0]: tuple(r[1:]) for r in rows}
+
+
+def _stored_bars(session: Session, symbol: str, lo: date, hi: date) -> Dict[date, Tuple[Any, ...]]:
+    cols = [getattr(PriceBar, c) for c in PRICE_BAR_COLUMNS]
+    rows = session.execute(
+        select(*cols).where(PriceBar.ticker_symbol == symbol, PriceBar.date.between(lo, hi))
+    )
+    return {r[0]: tuple(r[1:]) for r in rows}
+
+
+def _save_price_bars(
+    session: Session,
+    records: List[Dict[str, Any]],
+    groups: Dict[str, np.ndarray],
+    chunk_size: int,
+) -> int:
+    """Upsert the OHLCV part of metric records into ``price_bars``, skipping unchanged bars."""
+    values = PRICE_BAR_COLUMNS[1:]
+    writes = []
+    for symbol, positions in groups.items():
+        dates = [records[p]["date"] for p in positions]
+        stored = _stored_bars(session, symbol, min(dates), max(dates))
+        for p in positions:
+            rec = records[p]
+            old = stored.get(rec["date"])
+            if old is None or not all(_same(rec[col], v) for col, v in zip(values, old)):
+                bar = {col: rec[col] for col in PRICE_BAR_COLUMNS}
+                writes.append({"ticker_symbol": symbol, **bar})
+    insert_stmt = sqlite_upsert(PriceBar)
+    stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[PriceBar.ticker_symbol, PriceBar.date],
+        set_={col: insert_stmt.excluded[col] for col in values},
+    )
+    for i in range(0, len(writes), chunk_size):
+        session.execute(stmt, writes[i : i + chunk_size])
+    return len(writes)
+
+
+def save_daily_metrics(
+    db_path: str,
+    df: pd.DataFrame,
+    chunk_size: int = 500,
+    session: Optional[Session] = None,
+    indicators: Sequence[str] = (),
+) -> UpsertStats:
+    """Bulk upsert a metrics frame into ``daily_metrics``.
+
+    Rows are written with one executemany upsert per chunk instead of one
+    statement per row, keeping the ``ON CONFLICT(ticker_symbol, date) DO UPDATE``
+    semantics so reruns stay idempotent. The configured indicator columns
+    named in ``indicators`` go to ``indicator_values`` (other extra columns
+    are ignored), the OHLCV part goes to ``price_bars`` and each ticker's
+    newest row also refreshes ``latest_metrics``, all in the same transaction.
+
+    Rows (and bars and indicator values) identical to what is already stored are not
+    written, so rerunning a ticker only touches new or revised bars instead of
+    generating journal traffic for its whole history.
+
+    Args:
+        db_path: SQLite database path.
+        df: Frame with a ``ticker`` column plus the ``DailyMetrics`` fields.
+        chunk_size: Rows per executemany batch.
+        session: Optional open session; when given, the caller owns the commit.
+        indicators: Indicator output columns of ``df`` to store (see
+            ``indicators.output_columns``).
+
+    Returns:
+        UpsertStats with counts of inserted, updated and skipped rows.
+    """
+    stats = UpsertStats()
     if df.empty:
-        return
-    engine = get_engine(db_path)
-    with Session(engine) as session:
-        for _, row in df.iterrows():
-            stmt = sqlite_upsert(DailyMetric).values(
-                ticker_symbol=row["ticker"],
-                date=row["date"],
-                open=row.get("open"),
-                high=row.get("high"),
-                low=row.get("low"),
-                close=row.get("close"),
-                volume=int(row["volume"]) if pd.notna(row.get("volume")) else None,
-                sma_50=row.get("sma_50"),
-                sma_200=row.get("sma_200"),
-                high_52w=row.get("high_52w"),
-                pct_from_52w_high=row.get("pct_from_52w_high"),
-                book_value_per_share=row.get("book_value_per_share"),
-                price_to_book=row.get("price_to_book"),
-                enterprise_value=row.get("enterprise_value"),
+        return stats
+    records = _to_records(df)
+    insert_stmt = sqlite_upsert(DailyMetric)
+    stmt = insert_stmt.on_conflict_do_update(
+        index_elements=[DailyMetric.ticker_symbol, DailyMetric.date],
+        set_={col: insert_stmt.excluded[col] for col in DAILY_METRIC_COLUMNS if col != "date"},
+    )
+    with _use_session(db_path, session) as session:
+        layout = storage_layout(db_path, session)
+        groups = df.groupby("ticker", sort=False).indices
+        changed: List[int] = []
+        for symbol, positions in groups.items():
+            dates = [records[p]["date"] for p in positions]
+            stored = _stored_rows(session, layout, symbol, min(dates), max(dates))
+            for p in positions:
+                rec = records[p]
+                old = stored.get(rec["date"])
+                if old is None:
+                    stats.inserted += 1
+                elif all(_same(rec[col], v) for col, v in zip(_VALUE_COLUMNS, old)):
+                    stats.skipped += 1
+                    continue
+                else:
+                    stats.updated += 1
+                changed.append(p)
+        changed.sort()
+        writes = [records[p] for p in changed]
+        if writes:
+            if layout == "compact":
+                _save_compact(session, writes, chunk_size)
+            else:
+                for i in range(0, len(writes), chunk_size):
+                    session.execute(stmt, writes[i : i + chunk_size])
+            # An unchanged newest row is already in latest_metrics
+            _save_latest(session, df.iloc[changed], writes)
+        bar_rows = _save_price_bars(session, records, groups, chunk_size)
+        indicator_rows = _save_indicator_values(session, df, indicators, chunk_size)
+    logger.info(
+        "Saved %d daily_metrics rows (inserted=%d updated=%d skipped=%d), %d price bars, "
+        "%d indicator values",
+        len(writes),
+        stats.inserted,
+        stats.updated,
+        stats.skipped,
+        bar_rows,
+        indicator_rows,
+    )
+    return stats
+
+
+def delete_signal_events(
+    db_path: str, symbols: Iterable[str], session: Optional[Session] = None
+) -> int:
+    """Remove every stored signal event of ``symbols``; returns the rows deleted."""
+    symbols = list(symbols)
+    deleted = 0
+    with _use_session(db_path, session) as session:
+        for i in range(0, len(symbols), SQLITE_MAX_PARAMS):
+            chunk = symbols[i : i + SQLITE_MAX_PARAMS]
+            deleted += session.execute(
+                delete(SignalEvent).where(SignalEvent.ticker_symbol.in_(chunk))
+            ).rowcount
+    return deleted
+
+
+def save_signal_events(
+    db_path: str,
+    symbol: str,
+    dates: Iterable[date],
+    signal_type: str,
+    session: Optional[Session] = None,
+) -> None:
+    signals = pd.DataFrame({"ticker": symbol, "date": list(dates), "signal_type": signal_type})
+    save_signal_frame(db_path, signals, session=session)
+
+
+def save_signal_frame(
+    db_path: str,
+    signals: pd.DataFrame,
+    chunk_size: int = 500,
+    session: Optional[Session] = None,
+) -> int:
+    """Bulk insert a (ticker, date, signal_type) frame into ``signal_events``.
+
+    Existing events are left untouched (``ON CONFLICT DO NOTHING``), so reruns
+    are idempotent.
+
+    Args:
+        db_path: SQLite database path.
+        signals: Frame with ticker, date and signal_type columns.
+        chunk_size: Rows per executemany batch.
+        session: Optional open session; when given, the caller owns the commit.
+
+    Returns:
+        Number of rows submitted.
+    """
+    if signals.empty:
+        return 0
+    records = [
+        {"ticker_symbol": t, "date": d, "signal_type": s}
+        for t, d, s in zip(signals["ticker"], signals["date"], signals["signal_type"])
+    ]
+    stmt = sqlite_upsert(SignalEvent).on_conflict_do_nothing(index_elements=[
+        SignalEvent.ticker_symbol, SignalEvent.date, SignalEvent.signal_type
+    ])
+    with _use_session(db_path, session) as session:
+        for i in range(0, len(records), chunk_size):
+            session.execute(stmt, records[i : i + chunk_size])
+    return len(records)
+
+
+def save_fundamentals(
+    db_path: str,
+    symbol: str,
+    filings: Optional[pd.DataFrame] = None,
+    snapshot: Optional[Dict[str, Any]] = None,
+    session: Optional[Session] = None,
+) -> None:
+    """Store a ticker's filing history and fundamentals snapshot for offline reprocessing.
+
+    Args:
+        db_path: SQLite database path.
+        symbol: Ticker symbol.
+        filings: Frame with ``as_of`` plus ``FILING_VALUE_COLUMNS``.
+        snapshot: Mapping with any of ``SNAPSHOT_COLUMNS``.
+        session: Optional open session; when given, the caller owns the commit.
+    """
+    with _use_session(db_path, session) as session:
+        if filings is not None and not filings.empty:
+            out = pd.DataFrame({"ticker_symbol": symbol, "as_of": filings["as_of"].to_numpy()})
+            for col in FILING_VALUE_COLUMNS:
+                out[col] = filings[col].to_numpy(dtype="float64") if col in filings else np.nan
+            out = out.astype(object).where(out.notna(), None)
+            insert_stmt = sqlite_upsert(Filing)
+            stmt = insert_stmt.on_conflict_do_update(
+                index_elements=[Filing.ticker_symbol, Filing.as_of],
+                set_={col: insert_stmt.excluded[col] for col in FILING_VALUE_COLUMNS},
             )
+            session.execute(stmt, out.to_dict("records"))
+        if snapshot is not None:
+            values = {col: snapshot.get(col) for col in SNAPSHOT_COLUMNS}
+            stmt = sqlite_upsert(TickerFundamentals).values(ticker_symbol=symbol, **values)
             stmt = stmt.on_conflict_do_update(
-                index_elements=[DailyMetric.ticker_symbol, DailyMetric.date],
-                set_={
-                    "open": stmt.excluded.open,
-                    "high": stmt.excluded.high,
-                    "low": stmt.excluded.low,
-                    "close": stmt.excluded.close,
-                    "volume": stmt.excluded.volume,
-                    "sma_50": stmt.excluded.sma_50,
-                    "sma_200": stmt.excluded.sma_200,
-                    "high_52w": stmt.excluded.high_52w,
-                    "pct_from_52w_high": stmt.excluded.pct_from_52w_high,
-                    "book_value_per_share": stmt.excluded.book_value_per_share,
-                    "price_to_book": stmt.excluded.price_to_book,
-                    "enterprise_value": stmt.excluded.enterprise_value,
-                },
+                index_elements=[TickerFundamentals.ticker_symbol],
+                set_={col: stmt.excluded[col] for col in SNAPSHOT_COLUMNS},
             )
             session.execute(stmt)
-        session.commit()
 
 
-def save_signal_events(db_path: str, symbol: str, dates: Iterable[date], signal_type: str) -> None:
-    engine = get_engine(db_path)
-    with Session(engine) as session:
-        for d in dates:
-            stmt = sqlite_upsert(SignalEvent).values(
-                ticker_symbol=symbol, date=d, signal_type=signal_type
+def stored_symbols(db_path: str) -> List[str]:
+    """Symbols with at least one stored price bar, sorted."""
+    with Session(get_engine(db_path)) as session:
+        return list(
+            session.scalars(select(PriceBar.ticker_symbol).distinct().order_by(PriceBar.ticker_symbol))
+        )
+
+
+def load_price_bars(db_path: str, symbols: Iterable[str]) -> pd.DataFrame:
+    """Load every stored bar of ``symbols`` as one long frame sorted by ticker and date.
+
+    Returns:
+        Frame with columns ticker, date, open, high, low, close, volume.
+    """
+    symbols = list(symbols)
+    cols = [getattr(PriceBar, c) for c in PRICE_BAR_COLUMNS]
+    rows: List[Any] = []
+    with Session(get_engine(db_path)) as session:
+        for i in range(0, len(symbols), SQLITE_MAX_PARAMS):
+            chunk = symbols[i : i + SQLITE_MAX_PARAMS]
+            rows.extend(
+                session.execute(
+                    select(PriceBar.ticker_symbol, *cols)
+                    .where(PriceBar.ticker_symbol.in_(chunk))
+                    .order_by(PriceBar.ticker_symbol, PriceBar.date)
+                ).all()
             )
-            stmt = stmt.on_conflict_do_nothing(index_elements=[
-                SignalEvent.ticker_symbol, SignalEvent.date, SignalEvent.signal_type
-            ])
-            session.execute(stmt)
-        session.commit()
+    return pd.DataFrame(rows, columns=["ticker", *PRICE_BAR_COLUMNS])
+
+
+def load_fundamentals(
+    db_path: str, symbols: Iterable[str]
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Load stored filings and fundamentals snapshots for ``symbols``.
+
+    Returns:
+        ``(filings, snapshots)``: filings with ticker, as_of and
+        ``FILING_VALUE_COLUMNS`` sorted by ticker and as_of; snapshots with
+        ticker and ``SNAPSHOT_COLUMNS``, one row per ticker that has one.
+    """
+    symbols = list(symbols)
+    filing_cols = ["as_of", *FILING_VALUE_COLUMNS]
+    filings: List[Any] = []
+    snapshots: List[Any] = []
+    with Session(get_engine(db_path)) as session:
+        for i in range(0, len(symbols), SQLITE_MAX_PARAMS):
+            chunk = symbols[i : i + SQLITE_MAX_PARAMS]
+            filings.extend(
+                session.execute(
+                    select(Filing.ticker_symbol, *(getattr(Filing, c) for c in filing_cols))
+                    .where(Filing.ticker_symbol.in_(chunk))
+                    .order_by(Filing.ticker_symbol, Filing.as_of)
+                ).all()
+            )
+            snapshots.extend(
+                session.execute(
+                    select(
+                        TickerFundamentals.ticker_symbol,
+                        *(getattr(TickerFundamentals, c) for c in SNAPSHOT_COLUMNS),
+                    ).where(TickerFundamentals.ticker_symbol.in_(chunk))
+                ).all()
+            )
+    return (
+        pd.DataFrame(filings, columns=["ticker", *filing_cols]),
+        pd.DataFrame(snapshots, columns=["ticker", *SNAPSHOT_COLUMNS]),
+    )
+
+
+def last_stored_date(db_path: str, symbol: str) -> Optional[date]:
+    """Return the most recent stored price bar date for ``symbol``, if any."""
+    with Session(get_engine(db_path)) as session:
+        return session.scalar(
+            select(func.max(PriceBar.date)).where(PriceBar.ticker_symbol == symbol)
+        )
+
+
+def load_price_history(
+    db_path: str,
+    symbol: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: Optional[int] = None,
+) -> pd.DataFrame:
+    """Load stored ``price_bars`` rows for ``symbol`` as a frame sorted by date.
+
+    Args:
+        db_path: SQLite database path.
+        symbol: Ticker symbol.
+        start: Optional inclusive lower date bound.
+        end: Optional inclusive upper date bound.
+        limit: Optional number of most recent bars to keep within the range.
+
+    Returns:
+        Frame with columns date, open, high, low, close, volume.
+    """
+    cols = [getattr(PriceBar, c) for c in PRICE_BAR_COLUMNS]
+    stmt = select(*cols).where(PriceBar.ticker_symbol == symbol)
+    if start is not None:
+        stmt = stmt.where(PriceBar.date >= start)
+    if end is not None:
+        stmt = stmt.where(PriceBar.date <= end)
+    stmt = stmt.order_by(PriceBar.date.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    with Session(get_engine(db_path)) as session:
+        rows = session.execute(stmt).all()
+    return pd.DataFrame(rows[::-1], columns=[c.key for c in cols])
+
+
+def load_recent_metrics(db_path: str, symbol: str, limit: int) -> pd.DataFrame:
+    """Load the ``limit`` most recent ``daily_metrics`` rows for ``symbol``.
+
+    Returns:
+        Frame with a ``ticker`` column plus the metric columns, sorted by date,
+        followed by one column per stored indicator.
+    """
+    stmt = (
+        select(DailyMetric)
+        .where(DailyMetric.ticker_symbol == symbol)
+        .order_by(DailyMetric.date.desc())
+        .limit(limit)
+    )
+    with Session(get_engine(db_path)) as session:
+        rows = session.scalars(stmt).all()
+        extra = []
+        if rows:
+            extra = session.execute(
+                select(IndicatorValue.date, IndicatorValue.name, IndicatorValue.value).where(
+                    IndicatorValue.ticker_symbol == symbol, IndicatorValue.date >= rows[-1].date
+                )
+            ).all()
+    records = [
+        {"ticker": r.ticker_symbol, **{col: getattr(r, col) for col in DAILY_METRIC_COLUMNS}}
+        for r in reversed(rows)
+    ]
+    df = pd.DataFrame(records, columns=["ticker", *DAILY_METRIC_COLUMNS])
+    if extra:
+        wide = pd.DataFrame(extra, columns=["date", "name", "value"]).pivot(
+            index="date", columns="name", values="value"
+        )
+        wide.columns.name = None
+        df = df.merge(wide, left_on="date", right_index=True, how="left")
+    return df
+
+
+def load_latest_metrics(db_path: str, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Each ticker's most recent metrics from ``latest_metrics`` (a primary-key scan).
+
+    Args:
+        db_path: SQLite database path.
+        symbols: Optional tickers to restrict to; default all.
+
+    Returns:
+        Frame with a ``ticker`` column plus the metric columns, sorted by ticker.
+    """
+    cols = [getattr(LatestMetric, c) for c in DAILY_METRIC_COLUMNS]
+    stmt = select(LatestMetric.ticker_symbol, *cols).order_by(LatestMetric.ticker_symbol)
+    if symbols is not None:
+        stmt = stmt.where(LatestMetric.ticker_symbol.in_(list(symbols)))
+    with Session(get_engine(db_path)) as session:
+        rows = session.execute(stmt).all()
+    return pd.DataFrame(rows, columns=["ticker", *DAILY_METRIC_COLUMNS])
+
+
+def _history_query(
+    layout: str, n_symbols: int, columns: List[str], start: Optional[date], end: Optional[date]
+) -> Tuple[str, str, List[Any]]:
+    """Build the (count, rows) SQL pair and date-range params for ``load_history``.
+
+    Both statements order by the clustering key, so per-ticker counts line up
+    with the row stream.
+    """
+    marks = ", ".join("?" * n_symbols)
+    if layout == "compact":
+        key, day, symbol = "c.ticker_id", "c.day", "t.symbol"
+        base = (
+            "FROM daily_metrics_compact c JOIN tickers t ON t.id = c.ticker_id "
+            f"WHERE t.symbol IN ({marks})"
+        )
+        projection = ", ".join(f"c.{col}" for col in columns)
+        lo = (start - _EPOCH).days if start else None
+        hi = (end - _EPOCH).days if end else None
+    else:
+        key, day, symbol = "ticker_symbol", "date", "ticker_symbol"
+        base = f"FROM daily_metrics WHERE ticker_symbol IN ({marks})"
+        projection = ", ".join(columns)
+        lo = start.isoformat() if start else None
+        hi = end.isoformat() if end else None
+    params: List[Any] = []
+    if lo is not None:
+        base += f" AND {day} >= ?"
+        params.append(lo)
+    if hi is not None:
+        base += f" AND {day} <= ?"
+        params.append(hi)
+    count_sql = f"SELECT {symbol}, COUNT(*) {base} GROUP BY {key} ORDER BY {key}"
+    rows_sql = f"SELECT {day}, {projection} {base} ORDER BY {key}, {day}"
+    return count_sql, rows_sql, params
+
+
+def _load_history_chunk(
+    conn: Any,
+    layout: str,
+    symbols: List[str],
+    columns: List[str],
+    start: Optional[date],
+    end: Optional[date],
+    batch_size: int,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    count_sql, rows_sql, bounds = _history_query(layout, len(symbols), columns, start, end)
+    params = [*symbols, *bounds]
+    cursor = conn.cursor()
+    try:
+        counts = cursor.execute(count_sql, params).fetchall()
+        total = sum(n for _, n in counts)
+        dates = np.empty(total, dtype="datetime64[D]")
+        values = {col: np.empty(total, dtype="float64") for col in columns}
+        cursor.execute(rows_sql, params)
+        pos = 0
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            n = len(batch)
+            cols = list(zip(*batch))
+            # Compact rows carry epoch days, standard rows ISO strings
+            date_dtype = "int64" if layout == "compact" else "datetime64[D]"
+            dates[pos : pos + n] = np.asarray(cols[0], dtype=date_dtype).astype("datetime64[D]")
+            for i, col in enumerate(columns, start=1):
+                # None becomes NaN in a float64 conversion
+                values[col][pos : pos + n] = np.asarray(cols[i], dtype="float64")
+            pos += n
+    finally:
+        cursor.close()
+    if pos != total:
+        raise RuntimeError(f"load_history read {pos} rows but counted {total}")
+
+    out: Dict[str, Dict[str, np.ndarray]] = {}
+    offset = 0
+    for symbol, n in counts:
+        window = slice(offset, offset + n)
+        out[symbol] = {"date": dates[window], **{c: v[window] for c, v in values.items()}}
+        offset += n
+    return out
+
+
+def load_history(
+    db_path: str,
+    symbols: Iterable[str],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    columns: Optional[Iterable[str]] = None,
+    as_arrow: bool = False,
+    batch_size: int = 10000,
+) -> Dict[str, Any]:
+    """Read stored metrics for many tickers straight into numpy arrays.
+
+    Projection and the date range are pushed into SQL and rows arrive in
+    clustering-key order from a raw DB-API cursor. A per-ticker ``COUNT``,
+    read in the same transaction as the rows, sizes the output arrays up
+    front; each ``fetchmany`` batch is transposed and copied into them, so no
+    ORM objects or per-row dicts are built.
+    Both storage layouts are supported.
+
+    Args:
+        db_path: SQLite database path.
+        symbols: Tickers to load.
+        start: Optional inclusive lower date bound.
+        end: Optional inclusive upper date bound.
+        columns: Metric columns to project (default: all of them).
+        as_arrow: Return ``pyarrow.RecordBatch`` values (requires pyarrow).
+        batch_size: Rows per ``fetchmany``.
+
+    Returns:
+        Mapping of ticker to ``{"date": datetime64[D], <column>: float64, ...}``
+        arrays (or a RecordBatch of them). Tickers without rows in range are
+        omitted; nulls are NaN.
+    """
+    columns = list(columns) if columns is not None else list(_VALUE_COLUMNS)
+    unknown = set(columns) - set(_VALUE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown daily_metrics columns: {sorted(unknown)}")
+    if as_arrow and not _HAS_ARROW:
+        raise ImportError("load_history(as_arrow=True) requires pyarrow")
+    symbols = list(dict.fromkeys(symbols))
+    out: Dict[str, Any] = {}
+    conn = get_engine(db_path).raw_connection()
+    try:
+        # One read transaction, so every COUNT and row SELECT sees the same snapshot
+        conn.execute("BEGIN")
+        kind = conn.execute(_LAYOUT_SQL).fetchone()
+        layout = "compact" if kind is not None and kind[0] == "view" else "standard"
+        # Two slots are reserved for the date bounds
+        step = SQLITE_MAX_PARAMS - 2
+        for i in range(0, len(symbols), step):
+            out.update(
+                _load_history_chunk(
+                    conn, layout, symbols[i : i + step], columns, start, end, batch_size
+                )
+            )
+    finally:
+        conn.rollback()
+        conn.close()
+    if as_arrow:
+        out = {sym: pa.RecordBatch.from_pydict(arrays) for sym, arrays in out.items()}
+    logger.info("Loaded history for %d of %d tickers", len(out), len(symbols))
+    return out
+
+
+def load_signal_events(db_path: str, symbol: str) -> List[Tuple[date, str]]:
+    """Return stored ``(date, signal_type)`` pairs for ``symbol`` ordered by date."""
+    stmt = (
+        select(SignalEvent.date, SignalEvent.signal_type)
+        .where(SignalEvent.ticker_symbol == symbol)
+        .order_by(SignalEvent.date)
+    )
+    with Session(get_engine(db_path)) as session:
+        return [(d, t) for d, t in session.execute(stmt)]
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import inspect
+import logging
+import math
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .config import IndicatorSpec
+
+logger = logging.getLogger(__name__)
+
+Output = Union[pd.Series, Dict[str, pd.Series]]
+IndicatorFn = Callable[..., Output]
+
+# Columns every price frame provides; anything else a spec reads must be
+# another indicator
+BASE_COLUMNS = ("open", "high", "low", "close", "volume")
+# Params that name an input series, used to build the dependency graph
+_SOURCE_PARAMS = ("source", "reference")
+_WINDOW_PARAMS = ("window", "fast", "slow", "signal")
+# An EWM with smoothing alpha >= 1/window forgets its starting state by a
+# factor (1 - alpha)**n <= exp(-n / window); warming up for this many windows
+# leaves a relative residual below 1e-14, well under the DB's skip tolerance,
+# so incremental runs reproduce a full recompute to float noise
+EWM_WARMUP = math.ceil(-math.log(1e-14))
+
+
+@dataclass
+class IndicatorKind:
+    fn: IndicatorFn
+    # Column suffixes produced; "" is the column called exactly ``name``
+    outputs: Tuple[str, ...] = ("",)
+    # Bars of history per unit of window needed to warm up (EWMs need more);
+    # kinds with several window params (MACD) warm up over their sum
+    warmup: float = 1.0
+
+
+INDICATOR_KINDS: Dict[str, IndicatorKind] = {}
+
+
+def register(kind: str, outputs: Tuple[str, ...] = ("",), warmup: float = 1.0):
+    """Decorator registering an indicator function under ``kind``.
+
+    The function receives an ``IndicatorContext`` plus the spec's params and
+    returns a Series (single output) or a dict of suffix -> Series.
+    """
+
+    def _wrap(fn: IndicatorFn) -> IndicatorFn:
+        INDICATOR_KINDS[kind] = IndicatorKind(fn, outputs, warmup)
+        return fn
+
+    return _wrap
+
+
+def output_columns(spec: IndicatorSpec) -> List[str]:
+    kind = _kind(spec)
+    return [spec.name if not sfx else f"{spec.name}_{sfx}" for sfx in kind.outputs]
+
+
+def _kind(spec: IndicatorSpec) -> IndicatorKind:
+    if spec.kind not in INDICATOR_KINDS:
+        raise ValueError(f"Unknown indicator kind {spec.kind!r} for {spec.name!r}")
+    return INDICATOR_KINDS[spec.kind]
+
+
+class IndicatorContext:
+    """Per-panel store of series and memoised intermediates.
+
+    Intermediates (rolling aggregates, EWMs, true range, ...) are cached by a
+    key of their inputs, so indicators that share them -- an SMA and a
+    Bollinger band on the same window, MACD and a configured EMA, ATR and a
+    true-range based filter -- compute them once. All windows run per ticker.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._groups = df["ticker"]
+        self._cache: Dict[Hashable, pd.Series] = {}
+
+    def _memo(self, key: Hashable, compute: Callable[[], pd.Series]) -> pd.Series:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def series(self, name: str) -> pd.Series:
+        return self._memo(
+            ("col", name), lambda: pd.to_numeric(self.df[name], errors="coerce").astype("float64")
+        )
+
+    def add(self, name: str, values: pd.Series) -> None:
+        self._cache[("col", name)] = values
+
+    def rolling(self, source: str, window: int, min_periods: Optional[int], how: str) -> pd.Series:
+        min_periods = window if min_periods is None else min_periods
+
+        def _compute() -> pd.Series:
+            roll = self.series(source).groupby(self._groups, sort=False).rolling(
+                window=window, min_periods=min_periods
+            )
+            return getattr(roll, how)().reset_index(level=0, drop=True).sort_index()
+
+        return self._memo(("rolling", source, window, min_periods, how), _compute)
+
+    def ewm(self, source: str, alpha: float, min_periods: int = 0) -> pd.Series:
+        def _compute() -> pd.Series:
+            ewm = self.series(source).groupby(self._groups, sort=False).ewm(
+                alpha=alpha, adjust=False, min_periods=min_periods
+            )
+            return ewm.mean().reset_index(level=0, drop=True).sort_index()
+
+        return self._memo(("ewm", source, alpha, min_periods), _compute)
+
+    def shift(self, source: str, periods: int = 1) -> pd.Series:
+        return self._memo(
+            ("shift", source, periods),
+            lambda: self.series(source).groupby(self._groups, sort=False).shift(periods),
+        )
+
+    def derived(self, name: str, compute: Callable[[], pd.Series]) -> pd.Series:
+        """Memoise a named intermediate and expose it as a series source."""
+        return self._memo(("col", name), compute)
+
+    def true_range(self) -> pd.Series:
+        def _compute() -> pd.Series:
+            prev_close = self.shift("close")
+            high, low = self.series("high"), self.series("low")
+            return pd.concat(
+                [high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1
+            ).max(axis=1, skipna=True)
+
+        return self.derived("_true_range", _compute)
+
+
+def _resolve(specs: Iterable[IndicatorSpec]) -> List[IndicatorSpec]:
+    """Order specs so every indicator follows the indicators it reads (Kahn's algorithm).
+
+    Raises:
+        ValueError: On duplicate names, unknown sources or dependency cycles.
+    """
+    specs = list(specs)
+    by_column: Dict[str, IndicatorSpec] = {}
+    for spec in specs:
+        for col in output_columns(spec):
+            if col in by_column or col in BASE_COLUMNS:
+                raise ValueError(f"Duplicate indicator output column {col!r}")
+            by_column[col] = spec
+    deps: Dict[str, set] = {}
+    for spec in specs:
+        deps[spec.name] = set()
+        for param in _SOURCE_PARAMS:
+            src = spec.params.get(param)
+            if src is None or src in BASE_COLUMNS:
+                continue
+            if src not in by_column:
+                raise ValueError(f"Indicator {spec.name!r} reads unknown series {src!r}")
+            deps[spec.name].add(by_column[src].name)
+
+    ordered: List[IndicatorSpec] = []
+    ready = [s for s in specs if not deps[s.name]]
+    pending = {s.name: s for s in specs if deps[s.name]}
+    while ready:
+        spec = ready.pop(0)
+        ordered.append(spec)
+        for name in list(pending):
+            deps[name].discard(spec.name)
+            if not deps[name]:
+                ready.append(pending.pop(name))
+    if pending:
+        raise ValueError(f"Indicator dependency cycle among: {sorted(pending)}")
+    return ordered
+
+
+def compute_indicators(df: pd.DataFrame, specs: Iterable[IndicatorSpec]) -> pd.DataFrame:
+    """Add every indicator in ``specs`` to a long (ticker, date) frame.
+
+    Args:
+        df: Frame sorted by ticker and date with OHLCV columns.
+        specs: Indicators to compute, in any order.
+
+    Returns:
+        ``df`` with one float column per indicator output.
+    """
+    ctx = IndicatorContext(df)
+    for spec in _resolve(specs):
+        result = _kind(spec).fn(ctx, **spec.params)
+        if isinstance(result, pd.Series):
+            result = {"": result}
+        for sfx, values in result.items():
+            col = spec.name if not sfx else f"{spec.name}_{sfx}"
+            ctx.add(col, values)
+            df[col] = values.to_numpy()
+    return df
+
+
+def lookback_bars(specs: Iterable[IndicatorSpec]) -> int:
+    """Bars of stored history needed to warm up ``specs`` for incremental runs.
+
+    ``specs`` are resolved together with ``CORE_INDICATORS``, as in
+    ``process_panel``, so they may read core columns and the result covers the
+    core windows too. An indicator reading another one (``source``/``reference``)
+    needs its own warmup on top of its input's.
+    """
+    needed: Dict[str, int] = {}
+    for spec in _resolve([*CORE_INDICATORS, *specs]):
+        kind = _kind(spec)
+        params = {
+            name: p.default
+            for name, p in inspect.signature(kind.fn).parameters.items()
+            if p.default is not inspect.Parameter.empty
+        }
+        params.update(spec.params)
+        windows = sum(int(params[p]) for p in _WINDOW_PARAMS if params.get(p) is not None)
+        upstream = max(
+            (needed.get(params[p], 0) for p in _SOURCE_PARAMS if params.get(p) is not None),
+            default=0,
+        )
+        bars = upstream + int(np.ceil(windows * kind.warmup))
+        for col in output_columns(spec):
+            needed[col] = bars
+    return max(needed.values(), default=0)
+
+
+# ---- Built-in kinds ----
+
+
+@register("sma")
+def sma(
+    ctx: IndicatorContext, window: int, source: str = "close", min_periods: Optional[int] = None
+):
+    return ctx.rolling(source, window, min_periods, "mean")
+
+
+@register("rolling_max")
+def rolling_max(
+    ctx: IndicatorContext, window: int, source: str = "high", min_periods: Optional[int] = None
+):
+    return ctx.rolling(source, window, min_periods, "max")
+
+
+@register("rolling_min")
+def rolling_min(
+    ctx: IndicatorContext, window: int, source: str = "low", min_periods: Optional[int] = None
+):
+    return ctx.rolling(source, window, min_periods, "min")
+
+
+@register("pct_from")
+def pct_from(ctx: IndicatorContext, reference: str, source: str = "close"):
+    """Percentage distance of ``source`` from ``reference`` (e.g. the 52-week high)."""
+    return (ctx.series(source) / ctx.series(reference) - 1.0) * 100.0
+
+
+@register("ema", warmup=EWM_WARMUP)
+def ema(ctx: IndicatorContext, window: int, source: str = "close"):
+    return ctx.ewm(source, 2.0 / (window + 1), min_periods=window)
+
+
+@register("rsi", warmup=EWM_WARMUP)
+def rsi(ctx: IndicatorContext, window: int = 14, source: str = "close"):
+    """Wilder's RSI (smoothing factor 1/window)."""
+    delta = ctx.derived(f"_delta_{source}", lambda: ctx.series(source) - ctx.shift(source))
+    ctx.derived(f"_gain_{source}", lambda: delta.clip(lower=0.0))
+    ctx.derived(f"_loss_{source}", lambda: (-delta).clip(lower=0.0))
+    gain = ctx.ewm(f"_gain_{source}", 1.0 / window, min_periods=window)
+    loss = ctx.ewm(f"_loss_{source}", 1.0 / window, min_periods=window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+@register("macd", outputs=("", "signal", "hist"), warmup=EWM_WARMUP)
+def macd(
+    ctx: IndicatorContext, fast: int = 12, slow: int = 26, signal: int = 9, source: str = "close"
+):
+    line = ema(ctx, fast, source) - ema(ctx, slow, source)
+    name = f"_macd_{source}_{fast}_{slow}"
+    ctx.derived(name, lambda: line)
+    sig = ctx.ewm(name, 2.0 / (signal + 1), min_periods=signal)
+    return {"": line, "signal": sig, "hist": line - sig}
+
+
+@register("bollinger", outputs=("mid", "upper", "lower"))
+def bollinger(ctx: IndicatorContext, window: int = 20, num_std: float = 2.0, source: str = "close"):
+    mid = ctx.rolling(source, window, None, "mean")
+    std = ctx.rolling(source, window, None, "std")
+    return {"mid": mid, "upper": mid + num_std * std, "lower": mid - num_std * std}
+
+
+@register("atr", warmup=EWM_WARMUP)
+def atr(ctx: IndicatorContext, window: int = 14):
+    """Wilder's Average True Range."""
+    ctx.true_range()
+    return ctx.ewm("_true_range", 1.0 / window, min_periods=window)
+
+
+# Indicators behind the fixed ``DailyMetrics`` columns
+CORE_INDICATORS: List[IndicatorSpec] = [
+    # SMAs with min_periods to allow recent IPOs
+    IndicatorSpec("sma_50", "sma", {"window": 50, "min_periods": 10}),
+    IndicatorSpec("sma_200", "sma", {"window": 200, "min_periods": 20}),
+    # 52-week high ~ 252 trading days
+    IndicatorSpec("high_52w", "rolling_max", {"window": 252, "min_periods": 20}),
+    IndicatorSpec("pct_from_52w_high", "pct_from", {"reference": "high_52w"}),
+]
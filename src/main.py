@@ -2,120 +2,683 @@ from __future__ import annotations
 
 import json
 import logging
-from datetime import datetime
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import typer
 
+from .async_fetch import fetch_many
 from .config import AppConfig, load_config, setup_logging
 from .data_fetcher import fetch_stock_data
-from .database import init_db, save_daily_metrics, save_signal_events, upsert_ticker
-from .models import DailyMetrics, ExportPayload, SignalEvent
-from .processor import process_data
-from .signals import detect_death_crossover, detect_golden_crossover
+from .database import (
+    SNAPSHOT_COLUMNS,
+    init_db,
+    load_fundamentals,
+    load_history,
+    load_price_bars,
+    load_recent_metrics,
+    migrate_to_compact,
+    stored_symbols,
+)
+from .indicators import output_columns
+from .models import (
+    BatchSummary,
+    ExportPayload,
+    RawData,
+    RawFundamentals,
+    SignalEvent,
+    TickerSummary,
+)
+from .processor import process_data, process_panel, to_daily_metrics
+from .providers import YFinanceProvider, record_fixtures
+from .screener import screen as run_screen
+from .signals import SIGNAL_COLUMNS, detect_crossovers, detect_crossovers_panel
+from .writer import BackgroundWriter, WriteJob
 
 app = typer.Typer(add_completion=False)
 logger = logging.getLogger(__name__)
 
 
-@app.command()
-def run(
-    ticker: str = typer.Option(..., "--ticker", help="Ticker symbol, e.g., NVDA or RELIANCE.NS"),
-    output: Optional[str] = typer.Option(None, "--output", help="Output JSON filepath"),
-    config: Optional[str] = typer.Option(None, "--config", help="Config YAML path"),
-):
-    """Run full pipeline: fetch, process, detect signals, save to DB and JSON."""
-    cfg: AppConfig = load_config(config)
-    setup_logging(cfg.logging.level)
+@dataclass
+class PipelineResult:
+    """Outcome of the fetch/process/signal stages for one ticker (no DB access)."""
 
-    # Initialize DB
-    init_db(cfg.database.path)
+    ticker: str
+    notes: List[str] = field(default_factory=list)
+    currency: Optional[str] = None
+    df: Optional[pd.DataFrame] = None
+    golden: List[date] = field(default_factory=list)
+    death: List[date] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    failed_stage: Optional[str] = None
+    error: Optional[str] = None
+    # True when df only holds newly fetched rows (see RawData.incremental_from)
+    incremental: bool = False
+    # Source fundamentals, persisted alongside price bars for offline reprocessing
+    fundamentals: Optional[RawFundamentals] = None
+    filings: Optional[pd.DataFrame] = None
+
+
+def _record_fetch_error(result: PipelineResult, e: BaseException) -> None:
+    if isinstance(e, RuntimeError):
+        # Common for very recent listings or unavailable tickers
+        logger.warning("Fetch returned no history for %s: %s", result.ticker, e)
+        result.notes.append("no_price_history")
+    else:
+        logger.error("Failed to fetch data for %s: %s", result.ticker, e, exc_info=e)
+        result.failed_stage, result.error = "fetch", str(e)
+
+
+def analyze_ticker(ticker: str, cfg: AppConfig) -> PipelineResult:
+    """Fetch, process and detect signals for one ticker.
+
+    Safe to run in a worker process: it only reads the database, so all
+    writes can be funnelled through a single writer.
 
-    notes: list[str] = []
+    Args:
+        ticker: Ticker symbol.
+        cfg: Application config.
+
+    Returns:
+        PipelineResult with per-stage timings in seconds.
+    """
+    result = PipelineResult(ticker=ticker)
 
     # Fetch
+    start = time.perf_counter()
     try:
         raw = fetch_stock_data(ticker, cfg)
-        if raw.fundamentals and raw.fundamentals.source:
-            notes.append(f"fundamentals_source={raw.fundamentals.source}")
-        if raw.fundamentals and raw.fundamentals.currency:
-            currency = raw.fundamentals.currency
-        else:
-            currency = None
-        # best-effort ticker info
-        upsert_ticker(cfg.database.path, symbol=ticker, market=None, name=None, currency=currency)
-    except RuntimeError as e:
-        # Common for very recent listings or unavailable tickers
-        logger.warning("Fetch returned no history for %s: %s", ticker, e)
-        notes.append("no_price_history")
-        payload = ExportPayload(
-            ticker=ticker,
-            generated_at=datetime.utcnow(),
-            notes=notes,
-            signals=[],
-            last_metrics=[],
-        )
-        if output:
-            out_path = Path(output)
-            out_path.write_text(json.dumps(payload.model_dump(mode="json"), indent=2), encoding="utf-8")
-            logger.info("Wrote analysis JSON to %s", out_path)
-        else:
-            print(json.dumps(payload.model_dump(mode="json"), indent=2))
-        return
     except Exception as e:
-        logger.exception("Failed to fetch data: %s", e)
-        raise typer.Exit(code=1)
+        _record_fetch_error(result, e)
+        return result
+    finally:
+        result.timings["fetch"] = time.perf_counter() - start
+    return analyze_raw(raw, result, cfg)
+
+
+def _note_raw(raw: RawData, result: PipelineResult) -> None:
+    result.fundamentals, result.filings = raw.fundamentals, raw.filings
+    if raw.fundamentals and raw.fundamentals.source:
+        result.notes.append(f"fundamentals_source={raw.fundamentals.source}")
+    if raw.fundamentals and raw.fundamentals.currency:
+        result.currency = raw.fundamentals.currency
+    if raw.incremental_from is not None:
+        result.incremental = True
+        result.notes.append(f"incremental_from={raw.incremental_from.isoformat()}")
+    for endpoint, secs in raw.fetch_timings.items():
+        result.timings[f"fetch.{endpoint}"] = secs
+
+
+def _signal_frame(df: pd.DataFrame, raws: List[RawData], db_path: str) -> pd.DataFrame:
+    """Prefix incremental tickers' rows of ``df`` with their stored SMA history.
+
+    Incremental frames only hold the anchor row and the new bars, which loses
+    the hysteresis regime and any cross still awaiting ``min_gap``
+    confirmation. Scanning the stored ``sma_50``/``sma_200`` history as well
+    makes the detected events those of a full recompute, so they can replace
+    the ticker's stored events.
+    """
+    tickers = [raw.ticker for raw in raws if raw.incremental_from is not None]
+    stored = load_history(db_path, tickers, columns=["sma_50", "sma_200"]) if tickers else {}
+    if not stored:
+        return df
+    history = [
+        pd.DataFrame({"ticker": ticker, **arrays}).assign(date=arrays["date"].astype(object))
+        for ticker, arrays in stored.items()
+    ]
+    fresh = df[["ticker", "date", "sma_50", "sma_200"]]
+    frame = pd.concat([*history, fresh], ignore_index=True)
+    # The anchor row is both stored and recomputed; keep the recomputed one
+    frame = frame.drop_duplicates(["ticker", "date"], keep="last")
+    return frame.sort_values(["ticker", "date"], kind="stable", ignore_index=True)
+
+
+def analyze_raw(
+    raw: RawData,
+    result: Optional[PipelineResult] = None,
+    cfg: Optional[AppConfig] = None,
+) -> PipelineResult:
+    """Process already-fetched data and detect signals (the non-network stages)."""
+    result = result or PipelineResult(ticker=raw.ticker)
+    cfg = cfg or AppConfig()
+    ticker = raw.ticker
+    _note_raw(raw, result)
 
     # Process
+    start = time.perf_counter()
     try:
-        df = process_data(raw)
+        result.df = process_data(raw, cfg.indicators, cfg.data_settings.filing_lag_days)
     except Exception as e:
-        logger.exception("Failed to process data: %s", e)
-        raise typer.Exit(code=1)
+        logger.exception("Failed to process data for %s: %s", ticker, e)
+        result.failed_stage, result.error = "process", str(e)
+        return result
+    finally:
+        result.timings["process"] = time.perf_counter() - start
 
     # Detect signals
-    golden = detect_golden_crossover(df)
-    death = detect_death_crossover(df)
+    start = time.perf_counter()
+    frame = _signal_frame(result.df, [raw], cfg.database.path)
+    crosses = detect_crossovers(frame, cfg.signals.hysteresis, cfg.signals.min_gap)
+    result.golden = crosses.golden.tolist()
+    result.death = crosses.death.tolist()
+    result.timings["signals"] = time.perf_counter() - start
+    return result
+
 
-    # Save to DB
+def analyze_panel(
+    raws: List[RawData],
+    results: Dict[str, PipelineResult],
+    cfg: Optional[AppConfig] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Process and detect signals for many fetched tickers in one panel pass.
+
+    Fills ``results`` (keyed by ticker) in place; the panel's stage times are
+    shared evenly across tickers in their ``process``/``signals`` timings.
+
+    Returns:
+        The metrics panel and the (ticker, date, signal_type) signal table,
+        both empty if processing failed.
+    """
+    cfg = cfg or AppConfig()
+    for raw in raws:
+        _note_raw(raw, results[raw.ticker])
+    share = 1.0 / max(1, len(raws))
+    start = time.perf_counter()
     try:
-        save_daily_metrics(cfg.database.path, df)
-        save_signal_events(cfg.database.path, ticker, golden, "golden_cross")
-        save_signal_events(cfg.database.path, ticker, death, "death_cross")
+        panel = process_panel(raws, cfg.indicators, cfg.data_settings.filing_lag_days)
     except Exception as e:
-        logger.exception("Failed to save to database: %s", e)
-        # proceed to export JSON even if DB fails
-        notes.append("database_save_failed")
+        logger.exception("Failed to process panel of %d tickers: %s", len(raws), e)
+        for raw in raws:
+            results[raw.ticker].failed_stage, results[raw.ticker].error = "process", str(e)
+        return pd.DataFrame(), pd.DataFrame(columns=SIGNAL_COLUMNS)
+    process_secs = (time.perf_counter() - start) * share
+
+    start = time.perf_counter()
+    signals = detect_crossovers_panel(
+        _signal_frame(panel, raws, cfg.database.path),
+        cfg.signals.hysteresis,
+        cfg.signals.min_gap,
+    )
+    signal_secs = (time.perf_counter() - start) * share
+
+    frames = {t: g.reset_index(drop=True) for t, g in panel.groupby("ticker", sort=False)}
+    by_type = {
+        key: list(g["date"]) for key, g in signals.groupby(["ticker", "signal_type"], sort=False)
+    }
+    for raw in raws:
+        result = results[raw.ticker]
+        result.df = frames.get(raw.ticker, panel.iloc[0:0])
+        result.golden = by_type.get((raw.ticker, "golden_cross"), [])
+        result.death = by_type.get((raw.ticker, "death_cross"), [])
+        result.timings["process"] = process_secs
+        result.timings["signals"] = signal_secs
+    return panel, signals
+
+
+def _write_job(
+    result: PipelineResult, cfg: AppConfig, replace_signals: bool = False
+) -> WriteJob:
+    """Package a result's ticker info, fundamentals, metrics and signals for the writer.
+
+    Incremental results carry the ticker's full recomputed signal history (see
+    ``_signal_frame``), so their stored events are always replaced.
+    """
+    signals = pd.DataFrame(
+        [(result.ticker, d, "golden_cross") for d in result.golden]
+        + [(result.ticker, d, "death_cross") for d in result.death],
+        columns=SIGNAL_COLUMNS,
+    )
+    snapshot = None
+    if result.fundamentals is not None:
+        snapshot = {}
+        for col in SNAPSHOT_COLUMNS:
+            value = getattr(result.fundamentals, col)
+            snapshot[col] = float(value) if isinstance(value, Decimal) else value
+    return WriteJob(
+        ticker=result.ticker,
+        metrics=result.df,
+        signals=signals,
+        currency=result.currency,
+        indicators=tuple(col for spec in cfg.indicators for col in output_columns(spec)),
+        filings=result.filings,
+        fundamentals=snapshot,
+        replace_signals=replace_signals or result.incremental,
+    )
+
+
+def _stored_raws(db_path: str, symbols: List[str]) -> List[RawData]:
+    """Rebuild ``RawData`` for ``symbols`` from stored price bars and fundamentals."""
+    bars = load_price_bars(db_path, symbols)
+    filings, snapshots = load_fundamentals(db_path, symbols)
+    filings_by_ticker = {
+        t: g.drop(columns="ticker").reset_index(drop=True)
+        for t, g in filings.groupby("ticker", sort=False)
+    }
+    snapshot_by_ticker = {
+        row["ticker"]: {k: v for k, v in row.items() if k != "ticker" and pd.notna(v)}
+        for row in snapshots.to_dict("records")
+    }
+    raws = []
+    for ticker, frame in bars.groupby("ticker", sort=False):
+        snapshot = snapshot_by_ticker.get(ticker)
+        raws.append(
+            RawData(
+                ticker=ticker,
+                price_frame=frame.drop(columns="ticker"),
+                fundamentals=RawFundamentals(**snapshot) if snapshot is not None else None,
+                filings=filings_by_ticker.get(ticker),
+            )
+        )
+    return raws
+
+
+def _start_writer(cfg: AppConfig, on_commit=None) -> BackgroundWriter:
+    db = cfg.database
+    return BackgroundWriter(
+        db.path,
+        max_queue=db.writer_queue,
+        group_rows=db.group_commit_rows,
+        group_seconds=db.group_commit_seconds,
+        on_commit=on_commit,
+    )
 
-    # Build export payload
+
+def _build_payload(result: PipelineResult, db_path: Optional[str] = None) -> ExportPayload:
+    """Build the export payload for a ticker.
+
+    Incremental results only carry the newly computed rows, so when ``db_path``
+    is given they are laid over the ticker's stored rows to fill the last
+    metrics. Nothing needs to be committed first: the in-memory rows win over
+    stored ones, and the signal history is always complete in memory (see
+    ``_signal_frame``).
+    """
     last_metrics_records = []
-    if not df.empty:
+    frame = result.df
+    if result.incremental and db_path:
+        stored = load_recent_metrics(db_path, result.ticker, 30)
+        if frame is None or frame.empty:
+            frame = stored
+        elif not stored.empty:
+            frame = pd.concat([stored, frame], ignore_index=True).drop_duplicates(
+                "date", keep="last"
+            )
+    if frame is not None and not frame.empty:
         # Take last 30 rows
-        tail = df.sort_values("date").tail(30)
-        for _, row in tail.iterrows():
-            last_metrics_records.append(DailyMetrics(**row.to_dict()))
-
+        last_metrics_records = to_daily_metrics(frame.sort_values("date").tail(30))
     signals = [
-        *(SignalEvent(ticker=ticker, date=d, signal_type="golden_cross") for d in golden),
-        *(SignalEvent(ticker=ticker, date=d, signal_type="death_cross") for d in death),
+        SignalEvent(ticker=result.ticker, date=d, signal_type=kind)
+        for kind, dates in (("golden_cross", result.golden), ("death_cross", result.death))
+        for d in dates
     ]
-    payload = ExportPayload(
-        ticker=ticker,
+    return ExportPayload(
+        ticker=result.ticker,
         generated_at=datetime.utcnow(),
-        notes=notes,
+        notes=result.notes,
         signals=signals,
         last_metrics=last_metrics_records,
     )
 
-    # Export JSON
+
+def _write_json(data: dict, output: Optional[str]) -> None:
     if output:
         out_path = Path(output)
-        out_path.write_text(json.dumps(payload.model_dump(mode="json"), indent=2), encoding="utf-8")
+        out_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
         logger.info("Wrote analysis JSON to %s", out_path)
     else:
-        print(json.dumps(payload.model_dump(mode="json"), indent=2))
+        print(json.dumps(data, indent=2))
+
+
+def _output_name(ticker: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", ticker).strip("_").lower() + "_analysis.json"
+
+
+def _read_tickers(tickers: List[str], tickers_file: Optional[str]) -> List[str]:
+    symbols: List[str] = []
+    for item in tickers:
+        symbols.extend(s.strip() for s in item.split(","))
+    if tickers_file:
+        for line in Path(tickers_file).read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                symbols.append(line)
+    # de-duplicate while keeping order
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
+@app.command()
+def run(
+    ticker: str = typer.Option(..., "--ticker", help="Ticker symbol, e.g., NVDA or RELIANCE.NS"),
+    output: Optional[str] = typer.Option(None, "--output", help="Output JSON filepath"),
+    config: Optional[str] = typer.Option(None, "--config", help="Config YAML path"),
+):
+    """Run full pipeline: fetch, process, detect signals, save to DB and JSON."""
+    cfg: AppConfig = load_config(config)
+    setup_logging(cfg.logging.level)
+
+    # Initialize DB
+    init_db(cfg.database.path, cfg.database.pragmas(), cfg.database.layout)
+
+    result = analyze_ticker(ticker, cfg)
+    if result.error:
+        raise typer.Exit(code=1)
+
+    # Export only once the commit outcome is known
+    with _start_writer(cfg) as writer:
+        if result.df is not None:
+            writer.submit(_write_job(result, cfg))
+    if result.ticker in writer.errors:
+        result.notes.append("database_save_failed")
+    _write_json(_build_payload(result, cfg.database.path).model_dump(mode="json"), output)
+    if result.ticker in writer.errors:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def batch(
+    tickers: List[str] = typer.Option(
+        [], "--tickers", help="Comma-separated ticker symbols; may be repeated"
+    ),
+    tickers_file: Optional[str] = typer.Option(
+        None, "--file", help="File with one ticker per line ('#' starts a comment)"
+    ),
+    output_dir: str = typer.Option("results", "--output-dir", help="Directory for JSON outputs"),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", help="Worker processes for fetch/process/signals (default: CPU count)"
+    ),
+    fetch_mode: str = typer.Option(
+        "pool",
+        "--fetch-mode",
+        help="pool: fetch inside workers; async: fetch in the parent with the rate-limited "
+        "async engine and use workers for processing only",
+    ),
+    panel: bool = typer.Option(
+        False,
+        "--panel",
+        help="With --fetch-mode async: process all fetched tickers in one vectorised "
+        "panel pass in the parent instead of per-ticker worker jobs",
+    ),
+    config: Optional[str] = typer.Option(None, "--config", help="Config YAML path"),
+):
+    """Run the pipeline for many tickers across a process pool.
+
+    Workers fetch, process and detect signals; a background writer thread in
+    the parent is the single DB writer, group-committing many tickers per
+    transaction while the parent writes one JSON per ticker plus ``summary.json``.
+    """
+    if fetch_mode not in ("pool", "async"):
+        raise typer.BadParameter("--fetch-mode must be 'pool' or 'async'")
+    if panel and fetch_mode != "async":
+        raise typer.BadParameter("--panel requires --fetch-mode async")
+    cfg: AppConfig = load_config(config)
+    setup_logging(cfg.logging.level)
+
+    symbols = _read_tickers(tickers, tickers_file)
+    if not symbols:
+        logger.error("No tickers given; use --tickers and/or --file")
+        raise typer.Exit(code=2)
+
+    init_db(cfg.database.path, cfg.database.pragmas("bulk-load"), cfg.database.layout)
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_workers = max(1, min(workers or os.cpu_count() or 1, len(symbols)))
+    logger.info("Running batch for %d tickers with %d workers", len(symbols), n_workers)
+
+    batch_start = time.perf_counter()
+    summaries: List[TickerSummary] = []
+    finished: List[PipelineResult] = []
+    outputs: Dict[str, str] = {}
+    persist_secs: Dict[str, float] = {}
+
+    def _committed(ticker: str, error: Optional[str], seconds: float) -> None:
+        # runs on the writer thread
+        persist_secs[ticker] = seconds
+
+    writer = _start_writer(cfg, on_commit=_committed)
+
+    def _finish(result: PipelineResult) -> None:
+        if not result.error:
+            if result.df is not None:
+                writer.submit(_write_job(result, cfg))
+            start = time.perf_counter()
+            out_path = out_dir / _output_name(result.ticker)
+            payload = _build_payload(result, cfg.database.path)
+            _write_json(payload.model_dump(mode="json"), str(out_path))
+            result.timings["export"] = time.perf_counter() - start
+            outputs[result.ticker] = str(out_path)
+        finished.append(result)
+
+    try:
+        if fetch_mode == "async":
+            # Network-bound stage in the parent under the global rate limiter,
+            # CPU-bound stages fanned out to the pool
+            outcomes = fetch_many(symbols, cfg)
+            pending: List[PipelineResult] = []
+            for symbol in symbols:
+                outcome = outcomes[symbol]
+                result = PipelineResult(ticker=symbol, timings={"fetch": outcome.seconds})
+                if outcome.error is not None:
+                    _record_fetch_error(result, outcome.error)
+                    _finish(result)
+                else:
+                    pending.append(result)
+            jobs = [(outcomes[r.ticker].raw, r) for r in pending]
+            if panel:
+                # Per-ticker jobs; the writer coalesces them into group commits
+                analyze_panel([raw for raw, _ in jobs], {r.ticker: r for r in pending}, cfg)
+                for result in pending:
+                    _finish(result)
+            elif n_workers == 1:
+                for raw, result in jobs:
+                    _finish(analyze_raw(raw, result, cfg))
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=n_workers, initializer=setup_logging, initargs=(cfg.logging.level,)
+                ) as pool:
+                    futures = {
+                        pool.submit(analyze_raw, raw, result, cfg): result
+                        for raw, result in jobs
+                    }
+                    for fut in as_completed(futures):
+                        try:
+                            result = fut.result()
+                        except Exception as e:
+                            logger.exception("Worker crashed for %s: %s", futures[fut].ticker, e)
+                            result = futures[fut]
+                            result.failed_stage, result.error = "worker", str(e)
+                        _finish(result)
+        elif n_workers == 1:
+            for symbol in symbols:
+                _finish(analyze_ticker(symbol, cfg))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_workers, initializer=setup_logging, initargs=(cfg.logging.level,)
+            ) as pool:
+                futures = {pool.submit(analyze_ticker, symbol, cfg): symbol for symbol in symbols}
+                for fut in as_completed(futures):
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        logger.exception("Worker crashed for %s: %s", futures[fut], e)
+                        result = PipelineResult(
+                            ticker=futures[fut], failed_stage="worker", error=str(e)
+                        )
+                    _finish(result)
+    finally:
+        # Waits for the last group commit
+        writer.close()
+
+    for result in finished:
+        if result.ticker in writer.errors:
+            # The JSON was exported before the commit; re-export it with the note
+            result.notes.append("database_save_failed")
+            if result.ticker in outputs:
+                payload = _build_payload(result, cfg.database.path)
+                _write_json(payload.model_dump(mode="json"), outputs[result.ticker])
+        if result.ticker in persist_secs:
+            result.timings["persist"] = persist_secs[result.ticker]
+        summaries.append(
+            TickerSummary(
+                ticker=result.ticker,
+                status="failed" if result.error else "ok",
+                rows=0 if result.df is None else len(result.df),
+                output=outputs.get(result.ticker),
+                timings=result.timings,
+                failed_stage=result.failed_stage,
+                error=result.error,
+                notes=result.notes,
+            )
+        )
+
+    order = {s: i for i, s in enumerate(symbols)}
+    summaries.sort(key=lambda s: order[s.ticker])
+    stage_totals: Dict[str, float] = {}
+    for s in summaries:
+        for stage, secs in s.timings.items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + secs
+    summary = BatchSummary(
+        generated_at=datetime.utcnow(),
+        workers=n_workers,
+        total_seconds=time.perf_counter() - batch_start,
+        succeeded=sum(1 for s in summaries if s.status == "ok"),
+        failed=sum(1 for s in summaries if s.status != "ok"),
+        stage_totals=stage_totals,
+        tickers=summaries,
+    )
+    _write_json(summary.model_dump(mode="json"), str(out_dir / "summary.json"))
+    if summary.failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def screen(
+    where: List[str] = typer.Option(
+        [], "--where", help="Filter on the latest row, e.g. 'price_to_book < 3'; may be repeated"
+    ),
+    signal: List[str] = typer.Option(
+        [],
+        "--signal",
+        help="Require a recent signal, e.g. 'golden_cross:20' (days); may be repeated",
+    ),
+    order_by: Optional[str] = typer.Option(None, "--order-by", help="Field to rank by"),
+    descending: bool = typer.Option(False, "--desc", help="Rank highest first"),
+    limit: Optional[int] = typer.Option(None, "--limit", help="Maximum number of results"),
+    output: Optional[str] = typer.Option(None, "--output", help="Output JSON filepath"),
+    config: Optional[str] = typer.Option(None, "--config", help="Config YAML path"),
+):
+    """Screen every ticker's latest stored metrics with SQL-compiled filters."""
+    cfg: AppConfig = load_config(config)
+    setup_logging(cfg.logging.level)
+    init_db(cfg.database.path, cfg.database.pragmas("read-mostly"), cfg.database.layout)
+    try:
+        df = run_screen(
+            cfg.database.path,
+            filters=where,
+            signals=signal,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    rows = df.astype(object).where(df.notna(), None).to_dict("records")
+    _write_json(json.loads(json.dumps(rows, default=str)), output)
+
+
+@app.command()
+def migrate(
+    to: str = typer.Option("compact", "--to", help="Target storage layout (only 'compact')"),
+    batch_size: int = typer.Option(50000, "--batch-size", help="Rows copied per transaction"),
+    vacuum: bool = typer.Option(False, "--vacuum", help="VACUUM afterwards to shrink the file"),
+    config: Optional[str] = typer.Option(None, "--config", help="Config YAML path"),
+):
+    """Convert the configured database to another storage layout in batches."""
+    if to != "compact":
+        raise typer.BadParameter("--to must be 'compact'")
+    cfg: AppConfig = load_config(config)
+    setup_logging(cfg.logging.level)
+    init_db(cfg.database.path, cfg.database.pragmas("bulk-load"))
+    migrate_to_compact(cfg.database.path, batch_size=batch_size, vacuum=vacuum)
+
+
+@app.command()
+def reprocess(
+    tickers: List[str] = typer.Option(
+        [],
+        "--tickers",
+        help="Comma-separated ticker symbols; may be repeated (default: all stored)",
+    ),
+    tickers_file: Optional[str] = typer.Option(
+        None, "--file", help="File with one ticker per line ('#' starts a comment)"
+    ),
+    chunk: int = typer.Option(200, "--chunk", help="Tickers processed per panel pass"),
+    config: Optional[str] = typer.Option(None, "--config", help="Config YAML path"),
+):
+    """Recompute derived metrics and signals from stored price bars and filings (no network)."""
+    cfg: AppConfig = load_config(config)
+    setup_logging(cfg.logging.level)
+    db_path = cfg.database.path
+    init_db(db_path, cfg.database.pragmas("bulk-load"), cfg.database.layout)
+    symbols = _read_tickers(tickers, tickers_file) or stored_symbols(db_path)
+    if not symbols:
+        logger.error("No stored price bars to reprocess")
+        raise typer.Exit(code=2)
+
+    start = time.perf_counter()
+    submitted = 0
+    failed: List[str] = []
+    with _start_writer(cfg) as writer:
+        for i in range(0, len(symbols), max(1, chunk)):
+            batch_symbols = symbols[i : i + max(1, chunk)]
+            raws = _stored_raws(db_path, batch_symbols)
+            results = {raw.ticker: PipelineResult(ticker=raw.ticker) for raw in raws}
+            failed.extend(s for s in batch_symbols if s not in results)  # no stored bars
+            analyze_panel(raws, results, cfg)
+            for result in results.values():
+                if result.error or result.df is None:
+                    failed.append(result.ticker)
+                    continue
+                # Fundamentals came from the DB; only the derived data is rewritten
+                result.fundamentals = result.filings = None
+                writer.submit(_write_job(result, cfg, replace_signals=True))
+                submitted += 1
+    logger.info(
+        "Reprocessed %d tickers in %.1fs (%d rows unchanged)",
+        submitted - len(writer.errors),
+        time.perf_counter() - start,
+        writer.skipped,
+    )
+    failed.extend(writer.errors)
+    if failed:
+        logger.error("Reprocessing failed for: %s", ", ".join(sorted(failed)))
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def record(
+    tickers: List[str] = typer.Option(
+        [], "--tickers", help="Comma-separated ticker symbols; may be repeated"
+    ),
+    tickers_file: Optional[str] = typer.Option(
+        None, "--file", help="File with one ticker per line ('#' starts a comment)"
+    ),
+    out_dir: str = typer.Option(..., "--out-dir", help="Fixture directory for the replay provider"),
+    period: str = typer.Option("max", "--period", help="History period to record"),
+    config: Optional[str] = typer.Option(None, "--config", help="Config YAML path"),
+):
+    """Record live yfinance responses as fixtures for the replay provider."""
+    cfg: AppConfig = load_config(config)
+    setup_logging(cfg.logging.level)
+    provider = YFinanceProvider()
+    for symbol in _read_tickers(tickers, tickers_file):
+        record_fixtures(provider, symbol, out_dir, period=period)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import logging
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, model_validator
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
 
 
 # ---- Raw Data Schemas ----
@@ -25,6 +32,49 @@ class PriceBar(BaseModel):
         return self
 
 
+def validate_price_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the ``PriceBar`` rules to a whole OHLCV frame at once.
+
+    Coerces dates to ``datetime.date`` and OHLC to float64, maps missing or
+    non-finite volume to NA (nullable Int64), and drops rows with missing or
+    non-finite OHLC or ``high < low``.
+
+    Args:
+        df: Frame with columns date, open, high, low, close and optionally volume.
+
+    Returns:
+        New frame with exactly ``PRICE_COLUMNS``, sorted by date.
+    """
+    missing = [c for c in PRICE_COLUMNS[:-1] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Price frame missing columns: {missing}")
+    dates = df["date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
+    out = pd.DataFrame({"date": dates.dt.date.to_numpy()})
+    for col in ("open", "high", "low", "close"):
+        out[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+    if "volume" in df.columns:
+        volume = pd.to_numeric(df["volume"], errors="coerce").to_numpy(dtype="float64", copy=True)
+        volume[~np.isfinite(volume)] = np.nan
+        out["volume"] = pd.array(volume, dtype="Float64").astype("Int64")
+    else:
+        out["volume"] = pd.array([pd.NA] * len(out), dtype="Int64")
+
+    ohlc = out[["open", "high", "low", "close"]].to_numpy()
+    finite = np.isfinite(ohlc).all(axis=1) & out["date"].notna().to_numpy()
+    inverted = finite & (out["high"].to_numpy() < out["low"].to_numpy())
+    valid = finite & ~inverted
+    if not valid.all():
+        logger.warning(
+            "Dropped %d invalid price rows (non-finite=%d, high<low=%d)",
+            int((~valid).sum()),
+            int((~finite).sum()),
+            int(inverted.sum()),
+        )
+    return out[valid].sort_values("date").reset_index(drop=True)
+
+
 class RawFundamentals(BaseModel):
     # Quarterly or annual fields; optional due to yfinance sparsity
     total_shareholder_equity: Optional[Decimal] = None
@@ -39,9 +89,32 @@ class RawFundamentals(BaseModel):
 
 
 class RawData(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     ticker: str
-    prices: List[PriceBar]
+    prices: List[PriceBar] = Field(default_factory=list)
+    # Columnar alternative to ``prices``; validated as a whole, no per-row models
+    price_frame: Optional[pd.DataFrame] = None
     fundamentals: Optional[RawFundamentals] = None
+    # One row per balance-sheet filing (as_of, equity, debt, cash, shares),
+    # joined point-in-time onto prices by the processor
+    filings: Optional[pd.DataFrame] = None
+    # Set for incremental fetches: first date of newly downloaded bars; earlier
+    # rows are only the stored lookback window needed for indicators
+    incremental_from: Optional[date] = None
+    # Seconds spent per provider endpoint while fetching
+    fetch_timings: Dict[str, float] = Field(default_factory=dict)
+
+    @field_validator("price_frame")
+    @classmethod
+    def validate_frame(cls, v: Optional[pd.DataFrame]):
+        return None if v is None else validate_price_frame(v)
+
+    def to_price_frame(self) -> pd.DataFrame:
+        """Return prices as a DataFrame with ``PRICE_COLUMNS``."""
+        if self.price_frame is not None:
+            return self.price_frame
+        return pd.DataFrame([p.model_dump() for p in self.prices], columns=PRICE_COLUMNS)
 
 
 # ---- Processed Metrics Schemas ----
@@ -62,6 +135,8 @@ class DailyMetrics(BaseModel):
     book_value_per_share: Optional[float] = None
     price_to_book: Optional[float] = None
     enterprise_value: Optional[float] = None
+    # Configured indicators (see AppConfig.indicators), keyed by output column
+    indicators: Dict[str, Optional[float]] = Field(default_factory=dict)
 
     @model_validator(mode="after")
     def validate_prices(self):
@@ -88,3 +163,27 @@ class ExportPayload(BaseModel):
     notes: List[str]
     signals: List[SignalEvent]
     last_metrics: List[DailyMetrics]
+
+
+# ---- Batch Run Schemas ----
+
+
+class TickerSummary(BaseModel):
+    ticker: str
+    status: str  # "ok" or "failed"
+    rows: int = 0
+    output: Optional[str] = None
+    timings: Dict[str, float] = Field(default_factory=dict)  # seconds per stage
+    failed_stage: Optional[str] = None
+    error: Optional[str] = None
+    notes: List[str] = Field(default_factory=list)
+
+
+class BatchSummary(BaseModel):
+    generated_at: datetime
+    workers: int
+    total_seconds: float
+    succeeded: int
+    failed: int
+    stage_totals: Dict[str, float]
+    tickers: List[TickerSummary]
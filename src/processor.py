@@ -1,41 +1,54 @@
 from __future__ import annotations
 
 import logging
-from typing import List
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
 
 import numpy as np
 import pandas as pd
 
-from .models import DailyMetrics, RawData
+from .config import IndicatorSpec
+from .indicators import CORE_INDICATORS, compute_indicators, output_columns
+from .models import DailyMetrics, RawData, RawFundamentals
 
 logger = logging.getLogger(__name__)
 
+# Fixed columns; configured indicators travel as extra columns / ``indicators``
+METRIC_COLUMNS = [f for f in DailyMetrics.model_fields if f != "indicators"]
+# Longest rolling window (52-week high); bars needed before the first new date
+INDICATOR_LOOKBACK = 252
+# Days from a balance sheet's period end until it counts as published; filings
+# carry no release date and quarterly reports land up to ~45 days later
+FILING_LAG_DAYS = 45
+_REQUIRED_COLUMNS = ["ticker", "date", "open", "high", "low", "close"]
+
+
+def _compute_indicators(df: pd.DataFrame, specs: Sequence[IndicatorSpec] = ()) -> pd.DataFrame:
+    """Core plus configured indicators for a long (ticker, date) frame."""
+    df = df.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
+    return compute_indicators(df, [*CORE_INDICATORS, *specs])
 
-def _compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.sort_values("date").copy()
-    # SMAs with min_periods to allow recent IPOs
-    df["sma_50"] = df["close"].rolling(window=50, min_periods=10).mean()
-    df["sma_200"] = df["close"].rolling(window=200, min_periods=20).mean()
-    # 52-week high ~ 252 trading days
-    df["high_52w"] = df["high"].rolling(window=252, min_periods=20).max()
-    df["pct_from_52w_high"] = np.where(
-        df["high_52w"].notna(), (df["close"] / df["high_52w"] - 1.0) * 100.0, np.nan
-    )
-    return df
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype="float64")
+    return pd.to_numeric(df[name], errors="coerce").astype("float64")
 
 
 def _compute_fundamentals(df: pd.DataFrame) -> pd.DataFrame:
-    # Book Value Per Share (BVPS) = total equity / shares_outstanding
-    equity = df.get("total_shareholder_equity")
-    shares = df.get("shares_outstanding")
+    """Per-row BVPS, P/B and EV from the fundamentals in force on each date.
+
+    Derived values take precedence. Reported ``book_value`` /
+    ``enterprise_value`` (from ``info``) are only present for tickers without
+    filings (see ``_merge_fundamentals``), where they fill rows that cannot be
+    derived; bars before a ticker's first published filing stay NaN.
+    """
     close = df["close"]
-    if equity is not None and shares is not None:
-        with np.errstate(divide="ignore", invalid="ignore"):
-            bvps = np.where((shares > 0), (equity / shares).astype(float), np.nan)
-    else:
-        # fallback to book_value per share if provided by info
-        bvps = df.get("book_value", pd.Series(index=df.index, dtype=float))
-    df["book_value_per_share"] = bvps
+    shares = _column(df, "shares_outstanding")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Book Value Per Share (BVPS) = total equity / shares_outstanding
+        bvps = _column(df, "total_shareholder_equity") / shares.where(shares > 0)
+    df["book_value_per_share"] = bvps.fillna(_column(df, "book_value"))
 
     with np.errstate(divide="ignore", invalid="ignore"):
         df["price_to_book"] = np.where(
@@ -44,56 +57,207 @@ def _compute_fundamentals(df: pd.DataFrame) -> pd.DataFrame:
             np.nan,
         )
 
-    # Enterprise Value (simplified): if info provided, use it; else market cap + debt - cash
-    if "enterprise_value" not in df.columns or df["enterprise_value"].isna().all():
-        # Approximate market cap using shares * close
-        if shares is not None:
-            market_cap = shares * close
-        else:
-            market_cap = pd.Series(index=df.index, data=np.nan)
-        total_debt = df.get("total_debt", pd.Series(index=df.index, data=np.nan))
-        cash = df.get(
-            "cash_and_short_term_investments", pd.Series(index=df.index, data=np.nan)
-        )
-        df["enterprise_value"] = market_cap + total_debt - cash
-
+    # Enterprise Value (simplified) = market cap + debt - cash
+    derived_ev = shares * close + _column(df, "total_debt") - _column(
+        df, "cash_and_short_term_investments"
+    )
+    df["enterprise_value"] = derived_ev.fillna(_column(df, "enterprise_value"))
     return df
 
 
-def process_data(raw_data: RawData) -> pd.DataFrame:
+def _merge_fundamentals(
+    prices: pd.DataFrame, raws: List[RawData], filing_lag_days: int = FILING_LAG_DAYS
+) -> pd.DataFrame:
+    """Attach to each bar the fundamentals in force on that date.
+
+    With a filings history, every bar is joined to its ticker's latest filing
+    published on or before it (``merge_asof``, backward, on the period end
+    plus ``filing_lag_days``), so ratios use the balance sheet known at the
+    time rather than one still being prepared; bars before the first
+    published filing get NaN. Shares
+    missing from a filing fall back to ``info``. Tickers without filings get
+    their ``info`` snapshot broadcast to every bar.
+    """
+    filing_frames = [
+        raw.filings.assign(ticker=raw.ticker)
+        for raw in raws
+        if raw.filings is not None and not raw.filings.empty
+    ]
+    snapshot = pd.DataFrame(
+        [
+            {
+                "ticker": raw.ticker,
+                "_has_filings": raw.filings is not None and not raw.filings.empty,
+                "_info_shares": _as_float(raw.fundamentals, "shares_outstanding"),
+                "_info_book_value": _as_float(raw.fundamentals, "book_value"),
+                "_info_enterprise_value": _as_float(raw.fundamentals, "enterprise_value"),
+            }
+            for raw in raws
+        ],
+        columns=[
+            "ticker",
+            "_has_filings",
+            "_info_shares",
+            "_info_book_value",
+            "_info_enterprise_value",
+        ],
+    )
+
+    merged = prices.sort_values("date", kind="stable").reset_index(drop=True)
+    if filing_frames:
+        right = pd.concat(filing_frames, ignore_index=True)
+        published = pd.to_datetime(right["as_of"]) + pd.Timedelta(days=filing_lag_days)
+        right["_key"] = published.astype("datetime64[ns]")
+        right = right.drop(columns="as_of").sort_values("_key", kind="stable")
+        merged["_key"] = pd.to_datetime(merged["date"]).astype("datetime64[ns]")
+        merged = pd.merge_asof(
+            merged, right, on="_key", by="ticker", direction="backward"
+        ).drop(columns="_key")
+    merged = merged.merge(snapshot, on="ticker", how="left")
+
+    broadcast = ~merged["_has_filings"].fillna(False).astype(bool)
+    merged["shares_outstanding"] = _column(merged, "shares_outstanding").fillna(
+        merged["_info_shares"]
+    )
+    merged["book_value"] = merged["_info_book_value"].where(broadcast)
+    merged["enterprise_value"] = merged["_info_enterprise_value"].where(broadcast)
+    return merged.drop(columns=[c for c in snapshot.columns if c != "ticker"])
+
+
+def _as_float(fund: Optional[RawFundamentals], name: str) -> float:
+    value = getattr(fund, name) if fund is not None else None
+    return float(value) if value is not None else np.nan
+
+
+def process_data(
+    raw_data: RawData,
+    indicators: Sequence[IndicatorSpec] = (),
+    filing_lag_days: int = FILING_LAG_DAYS,
+) -> pd.DataFrame:
     """Merge prices with fundamentals and compute indicators/ratios.
 
+    For incremental inputs (``raw_data.incremental_from`` set) indicators are
+    computed over the stored lookback window plus new bars, and only rows from
+    ``incremental_from`` (and the anchor row before it) are returned.
+
     Args:
         raw_data: Validated raw data.
+        indicators: Extra indicators (from config) to add as columns.
+        filing_lag_days: Days after a filing's period end before ratios use it.
 
     Returns:
         DataFrame with daily metrics.
     """
-    prices = pd.DataFrame([p.model_dump() for p in raw_data.prices])
-
-    # Fundamentals as-of merge by forward-fill
-    fund = raw_data.fundamentals
-    if fund:
-        fdf = pd.DataFrame([fund.model_dump()])
-        # forward-fill across all dates; implicitly assume point-in-time until next filing
-        fdf["date"] = prices["date"].min()
-        merged = prices.merge(fdf, on="date", how="left")
-        merged = merged.sort_values("date").ffill()
-    else:
-        merged = prices.copy()
-
-    merged = _compute_indicators(merged)
+    return process_panel([raw_data], indicators, filing_lag_days)
+
+
+def process_panel(
+    raws: Iterable[RawData],
+    indicators: Sequence[IndicatorSpec] = (),
+    filing_lag_days: int = FILING_LAG_DAYS,
+) -> pd.DataFrame:
+    """Process many tickers as one long (ticker, date) panel.
+
+    Prices are stacked into a single frame, fundamentals are joined
+    per ticker with one ``merge_asof``, and indicators come from grouped
+    rolling windows, so the cost is one vectorised pass rather than one
+    ``process_data`` call per ticker. Incremental inputs are trimmed per
+    ticker exactly as in ``process_data``.
+
+    Args:
+        raws: Validated raw data, one per ticker.
+        indicators: Extra indicators (from config) to add as columns.
+        filing_lag_days: Days after a filing's period end before ratios use it.
+
+    Returns:
+        Validated metrics frame sorted by ticker and date, ready for
+        ``save_daily_metrics``.
+    """
+    raws = list(raws)
+    extra = [col for spec in indicators for col in output_columns(spec)]
+    if not raws:
+        return validate_metrics_frame(pd.DataFrame(columns=METRIC_COLUMNS), extra)
+    prices = pd.concat(
+        [raw.to_price_frame().assign(ticker=raw.ticker) for raw in raws], ignore_index=True
+    )
+    merged = _merge_fundamentals(prices, raws, filing_lag_days)
+    merged = _compute_indicators(merged, indicators)
     merged = _compute_fundamentals(merged)
 
-    merged["ticker"] = raw_data.ticker
+    since = {raw.ticker: raw.incremental_from for raw in raws if raw.incremental_from is not None}
+    if since:
+        merged = _trim_to_incremental(merged, since)
+
+    return validate_metrics_frame(merged, extra)
+
+
+def _trim_to_incremental(df: pd.DataFrame, since: Dict[str, date]) -> pd.DataFrame:
+    """Keep each ticker's rows from its ``since`` date plus the preceding anchor row.
+
+    The anchor row has a full ``INDICATOR_LOOKBACK`` window behind it, so its
+    values match the stored row; keeping it lets crossover detection see the
+    transition into the first new bar. Tickers absent from ``since`` are kept
+    whole. ``df`` must be sorted by ticker and date.
+    """
+    cutoff = pd.to_datetime(df["ticker"].map(since))
+    is_new = (pd.to_datetime(df["date"]) >= cutoff) | cutoff.isna()
+    anchor = is_new.groupby(df["ticker"], sort=False).shift(-1, fill_value=False) & ~is_new
+    return df[is_new | anchor]
+
+
+def validate_metrics_frame(df: pd.DataFrame, extra_columns: Sequence[str] = ()) -> pd.DataFrame:
+    """Enforce the ``DailyMetrics`` rules on a whole frame with boolean masks.
 
-    # Validate rows via Pydantic model
-    records: List[DailyMetrics] = []
-    for _, row in merged.iterrows():
-        try:
-            records.append(DailyMetrics(**row.to_dict()))
-        except Exception as e:
-            logger.warning("Validation error on date=%s: %s", row.get("date"), e)
+    Coerces every field to its column dtype (float64, nullable Int64 volume),
+    drops rows missing a required field or with ``high < low`` and logs the
+    counts, without building a model per row.
 
-    out = pd.DataFrame([r.model_dump() for r in records])
-    return out
+    Args:
+        df: Frame containing at least the required ``DailyMetrics`` fields.
+        extra_columns: Configured indicator columns to keep (as float64)
+            after the fixed ones.
+
+    Returns:
+        Frame with the ``METRIC_COLUMNS`` in field order, then ``extra_columns``.
+    """
+    out = pd.DataFrame(index=df.index)
+    out["ticker"] = df["ticker"].astype(object)
+    out["date"] = df["date"]
+    for col in METRIC_COLUMNS[2:]:
+        if col not in df.columns:
+            out[col] = np.nan
+        elif col == "volume":
+            volume = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", copy=True)
+            volume[~np.isfinite(volume)] = np.nan
+            out[col] = pd.array(volume, dtype="Float64").astype("Int64")
+        else:
+            out[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in extra_columns:
+        if col in df.columns:
+            out[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        else:
+            out[col] = np.nan
+
+    missing = out[_REQUIRED_COLUMNS].isna().any(axis=1).to_numpy()
+    inverted = (out["high"] < out["low"]).to_numpy()
+    valid = ~missing & ~inverted
+    if not valid.all():
+        logger.warning(
+            "Dropped %d invalid metric rows (missing required=%d, high<low=%d)",
+            int((~valid).sum()),
+            int(missing.sum()),
+            int(inverted.sum()),
+        )
+    return out[valid].reset_index(drop=True)
+
+
+def to_daily_metrics(df: pd.DataFrame) -> List[DailyMetrics]:
+    """Build ``DailyMetrics`` models for a validated frame (e.g. the exported tail).
+
+    Columns beyond ``METRIC_COLUMNS`` go into ``DailyMetrics.indicators``.
+    """
+    frame = df.astype(object).where(df.notna(), None)
+    extra = [c for c in df.columns if c not in METRIC_COLUMNS]
+    fixed = frame[METRIC_COLUMNS].to_dict("records")
+    values = frame[extra].to_dict("records") if extra else [{} for _ in fixed]
+    return [DailyMetrics(**r, indicators=v) for r, v in zip(fixed, values)]
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from .cache import ResponseCache
+from .config import DataSettings
+
+logger = logging.getLogger(__name__)
+
+
+class DataProvider(Protocol):
+    """Source of raw market data, shaped like the yfinance ``Ticker`` responses.
+
+    ``history`` returns a frame indexed by date with Open/High/Low/Close/Volume
+    columns; balance sheets are indexed by line item with one column per filing
+    date; ``info`` is a flat dict.
+    """
+
+    name: str
+
+    def history(
+        self,
+        symbol: str,
+        period: Optional[str] = None,
+        start: Optional[date] = None,
+        interval: str = "1d",
+    ) -> pd.DataFrame: ...
+
+    def quarterly_balance_sheet(self, symbol: str) -> pd.DataFrame: ...
+
+    def balance_sheet(self, symbol: str) -> pd.DataFrame: ...
+
+    def info(self, symbol: str) -> Dict[str, Any]: ...
+
+    def first_trade_date(self, symbol: str) -> Optional[date]:
+        """Listing date of ``symbol``, or ``None`` if the symbol has no history."""
+        ...
+
+
+class YFinanceProvider:
+    """Live provider backed by ``yfinance.Ticker``.
+
+    ``Ticker`` objects are reused across one ticker's endpoints, but only the
+    ``max_tickers`` most recently used are kept, so a long-lived provider
+    does not retain every symbol (and its cached responses) it has seen.
+    """
+
+    name = "yfinance"
+
+    def __init__(self, max_tickers: int = 64) -> None:
+        self.max_tickers = max_tickers
+        self._tickers: "OrderedDict[str, yf.Ticker]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ticker(self, symbol: str) -> yf.Ticker:
+        with self._lock:
+            ticker = self._tickers.pop(symbol, None) or yf.Ticker(symbol)
+            self._tickers[symbol] = ticker
+            while len(self._tickers) > self.max_tickers:
+                self._tickers.popitem(last=False)
+            return ticker
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        t = self._ticker(symbol)
+        if start is not None:
+            return t.history(start=start, interval=interval, auto_adjust=False)
+        return t.history(period=period, interval=interval, auto_adjust=False)
+
+    def quarterly_balance_sheet(self, symbol):
+        return self._ticker(symbol).quarterly_balance_sheet
+
+    def balance_sheet(self, symbol):
+        return self._ticker(symbol).balance_sheet
+
+    def info(self, symbol):
+        return self._ticker(symbol).info or {}
+
+    def first_trade_date(self, symbol):
+        # Reuses metadata from an earlier history() call on the same Ticker,
+        # otherwise costs a single 5d request
+        meta = self._ticker(symbol).get_history_metadata() or {}
+        first = meta.get("firstTradeDate")
+        if first is None:
+            return None
+        if isinstance(first, (int, float)):
+            first = pd.Timestamp(first, unit="s", tz="UTC")
+        return pd.Timestamp(first).date()
+
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def period_start(last: pd.Timestamp, period: Optional[str]) -> Optional[pd.Timestamp]:
+    """First timestamp covered by a yfinance ``period`` ending at ``last``.
+
+    Args:
+        last: End of the period (the last bar, or today).
+        period: yfinance period string, e.g. ``"5y"``, ``"6mo"`` or ``"ytd"``.
+
+    Returns:
+        The period start, or ``None`` for ``"max"`` (or no period).
+
+    Raises:
+        ValueError: If ``period`` is not a supported period string.
+    """
+    if not period or period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=last.year, month=1, day=1, tz=last.tz)
+    m = _PERIOD_RE.match(period)
+    if not m:
+        raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(m.group(1)), m.group(2)
+    offset = {
+        "d": pd.DateOffset(days=n),
+        "wk": pd.DateOffset(weeks=n),
+        "mo": pd.DateOffset(months=n),
+        "y": pd.DateOffset(years=n),
+    }[unit]
+    return last - offset
+
+
+class ReplayProvider:
+    """Offline provider serving recorded fixtures from disk.
+
+    Layout: ``<root>/<SYMBOL>/history.{parquet,csv}``,
+    ``quarterly_balance_sheet.{parquet,csv}``, ``balance_sheet.{parquet,csv}``
+    and ``info.json``. Missing files behave like an empty yfinance response.
+    ``period`` is applied relative to the last recorded bar so replays are
+    deterministic. ``latency_ms`` adds a synthetic delay to every call.
+    """
+
+    name = "replay"
+
+    def __init__(self, root: str, latency_ms: float = 0.0):
+        self.root = Path(root)
+        self.latency_ms = latency_ms
+
+    def _sleep(self) -> None:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def _frame(self, symbol: str, name: str, index_is_date: bool) -> pd.DataFrame:
+        base = self.root / symbol / name
+        if base.with_suffix(".parquet").exists():
+            return pd.read_parquet(base.with_suffix(".parquet"))
+        if base.with_suffix(".csv").exists():
+            df = pd.read_csv(base.with_suffix(".csv"), index_col=0)
+            if index_is_date:
+                df.index = pd.DatetimeIndex(pd.to_datetime(df.index), name="Date")
+            else:
+                df.columns = pd.to_datetime(df.columns)
+            return df
+        return pd.DataFrame()
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        self._sleep()
+        hist = self._frame(symbol, "history", index_is_date=True)
+        if hist.empty:
+            return hist
+        if start is not None:
+            lower = pd.Timestamp(start)
+            if hist.index.tz is not None:
+                lower = lower.tz_localize(hist.index.tz)
+        else:
+            lower = period_start(hist.index.max(), period)
+        return hist if lower is None else hist[hist.index >= lower]
+
+    def quarterly_balance_sheet(self, symbol):
+        self._sleep()
+        return self._frame(symbol, "quarterly_balance_sheet", index_is_date=False)
+
+    def balance_sheet(self, symbol):
+        self._sleep()
+        return self._frame(symbol, "balance_sheet", index_is_date=False)
+
+    def info(self, symbol):
+        self._sleep()
+        path = self.root / symbol / "info.json"
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def first_trade_date(self, symbol):
+        self._sleep()
+        hist = self._frame(symbol, "history", index_is_date=True)
+        return None if hist.empty else hist.index.min().date()
+
+
+class CachedProvider:
+    """Wraps another provider with the on-disk ``ResponseCache``."""
+
+    def __init__(self, inner: DataProvider, cache: ResponseCache):
+        self.inner = inner
+        self.cache = cache
+        self.name = inner.name
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        params = {"interval": interval, **({"start": start} if start else {"period": period})}
+        return self.cache.get_or_fetch(
+            symbol, "history", params, lambda: self.inner.history(symbol, period, start, interval)
+        )
+
+    def quarterly_balance_sheet(self, symbol):
+        return self.cache.get_or_fetch(
+            symbol,
+            "quarterly_balance_sheet",
+            None,
+            lambda: self.inner.quarterly_balance_sheet(symbol),
+        )
+
+    def balance_sheet(self, symbol):
+        return self.cache.get_or_fetch(
+            symbol, "balance_sheet", None, lambda: self.inner.balance_sheet(symbol)
+        )
+
+    def info(self, symbol):
+        return self.cache.get_or_fetch(symbol, "info", None, lambda: self.inner.info(symbol))
+
+    def first_trade_date(self, symbol):
+        # Stored as {"date": iso-string} so JSON round-trips cleanly. An empty
+        # probe is not cached: NegativeCache decides when that symbol is retried
+        cached = self.cache.get_or_fetch(
+            symbol,
+            "first_trade_date",
+            None,
+            lambda: {"date": _iso(self.inner.first_trade_date(symbol))},
+            cache_if=lambda value: value.get("date") is not None,
+        )
+        value = cached.get("date")
+        return date.fromisoformat(value) if value else None
+
+
+def _iso(d: Optional[date]) -> Optional[str]:
+    return d.isoformat() if d is not None else None
+
+
+_PROVIDERS: Dict[Tuple[Any, ...], DataProvider] = {}
+_PROVIDERS_LOCK = threading.Lock()
+
+
+def get_provider(settings: DataSettings) -> DataProvider:
+    """Return the process-wide provider for these settings.
+
+    The provider is built on first use (wrapped with the response cache if
+    enabled) and reused afterwards. It holds only bounded per-ticker state
+    (recent yfinance ``Ticker`` objects); fundamentals snapshots are scoped
+    to each fetch.
+    """
+    key = (
+        settings.provider,
+        settings.replay_dir,
+        settings.replay_latency_ms,
+        settings.cache_dir,
+        settings.offline,
+        tuple(sorted(settings.cache_ttls.items())),
+    )
+    with _PROVIDERS_LOCK:
+        if key not in _PROVIDERS:
+            _PROVIDERS[key] = _build_provider(settings)
+        return _PROVIDERS[key]
+
+
+def _build_provider(settings: DataSettings) -> DataProvider:
+    if settings.provider == "yfinance":
+        provider: DataProvider = YFinanceProvider()
+    elif settings.provider == "replay":
+        if not settings.replay_dir:
+            raise ValueError("data_settings.provider=replay requires data_settings.replay_dir")
+        provider = ReplayProvider(settings.replay_dir, settings.replay_latency_ms)
+    else:
+        raise ValueError(f"Unknown data provider: {settings.provider}")
+    cache = ResponseCache.from_settings(settings)
+    return CachedProvider(provider, cache) if cache is not None else provider
+
+
+def record_fixtures(provider: DataProvider, symbol: str, root: str, period: str = "max") -> Path:
+    """Record one symbol's responses from ``provider`` in ``ReplayProvider`` layout.
+
+    Args:
+        provider: Source provider (usually ``YFinanceProvider``).
+        symbol: Ticker symbol.
+        root: Fixture root directory.
+        period: History period to record.
+
+    Returns:
+        Directory the fixtures were written to.
+    """
+    out = Path(root) / symbol
+    out.mkdir(parents=True, exist_ok=True)
+    hist = provider.history(symbol, period=period)
+    if hist is not None and not hist.empty:
+        hist = hist.copy()
+        # Keep exchange-local dates; CSV cannot round-trip mixed UTC offsets
+        if hist.index.tz is not None:
+            hist.index = hist.index.tz_localize(None)
+        hist.index.name = "Date"
+        hist.to_csv(out / "history.csv")
+    for name in ("quarterly_balance_sheet", "balance_sheet"):
+        sheet = getattr(provider, name)(symbol)
+        if sheet is not None and not sheet.empty:
+            sheet.to_csv(out / f"{name}.csv")
+    with open(out / "info.json", "w", encoding="utf-8") as f:
+        json.dump(provider.info(symbol) or {}, f, indent=2, default=str)
+    logger.info("Recorded fixtures for %s to %s", symbol, out)
+    return out
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+from sqlalchemy import and_, exists, func, literal, select
+from sqlalchemy.orm import Session
+
+from .database import (
+    DAILY_METRIC_COLUMNS,
+    IndicatorValue,
+    LatestMetric,
+    SignalEvent,
+    get_engine,
+)
+
+logger = logging.getLogger(__name__)
+
+_OPS = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "=": lambda a, b: a == b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+_FILTER_RE = re.compile(r"^\s*([A-Za-z_][\w]*)\s*(<=|>=|==|!=|<|>|=)\s*(\S+)\s*$")
+_NAME_RE = re.compile(r"^[A-Za-z_]\w*$")
+SIGNAL_TYPES = ("golden_cross", "death_cross")
+# Numeric metric columns usable in filters; any other name must be an
+# indicator stored in indicator_values
+METRIC_FIELDS = [c for c in DAILY_METRIC_COLUMNS if c != "date"]
+
+
+@dataclass
+class Filter:
+    """``field op value`` on a ticker's latest row; ``value`` may name another field."""
+
+    field: str
+    op: str
+    value: Union[float, str]
+
+    @classmethod
+    def parse(cls, text: str) -> "Filter":
+        """Parse an expression such as ``"price_to_book < 3"`` or ``"close > sma_200"``."""
+        m = _FILTER_RE.match(text)
+        if not m or m.group(2) not in _OPS:
+            raise ValueError(f"Invalid filter expression: {text!r}")
+        name, op, raw = m.groups()
+        try:
+            value: Union[float, str] = float(raw)
+        except ValueError:
+            if not _NAME_RE.match(raw):
+                raise ValueError(f"Invalid filter value in {text!r}") from None
+            value = raw
+        return cls(name, op, value)
+
+
+@dataclass
+class SignalFilter:
+    """Require a ``signal_type`` event within ``days`` calendar days of the latest row."""
+
+    signal_type: str
+    days: int
+
+    @classmethod
+    def parse(cls, text: str) -> "SignalFilter":
+        """Parse ``"golden_cross:20"``."""
+        kind, _, days = text.partition(":")
+        if kind not in SIGNAL_TYPES or not days.strip().isdigit():
+            raise ValueError(f"Invalid signal filter {text!r}; expected e.g. golden_cross:20")
+        return cls(kind, int(days))
+
+
+@dataclass
+class ScreenQuery:
+    filters: List[Filter] = field(default_factory=list)
+    signals: List[SignalFilter] = field(default_factory=list)
+    order_by: Optional[str] = None
+    descending: bool = False
+    limit: Optional[int] = None
+
+
+def _latest_rows():
+    """Each ticker's most recent metrics, read straight from ``latest_metrics``."""
+    cols = [getattr(LatestMetric, c) for c in DAILY_METRIC_COLUMNS]
+    return select(LatestMetric.ticker_symbol.label("ticker"), *cols).subquery("latest")
+
+
+def _latest_indicator_names(session: Session) -> List[str]:
+    """Indicator names stored for any ticker's latest row (via the unique index)."""
+    stmt = (
+        select(IndicatorValue.name)
+        .join(
+            LatestMetric,
+            and_(
+                IndicatorValue.ticker_symbol == LatestMetric.ticker_symbol,
+                IndicatorValue.date == LatestMetric.date,
+            ),
+        )
+        .distinct()
+    )
+    return list(session.scalars(stmt))
+
+
+class _Compiler:
+    def __init__(self, latest, known: Iterable[str] = ()):
+        self.latest = latest
+        self.known = set(known)
+        self.indicators: Dict[str, Any] = {}
+
+    def column(self, name: str):
+        if name in METRIC_FIELDS:
+            return self.latest.c[name]
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid field name: {name!r}")
+        if name not in self.known:
+            raise ValueError(
+                f"Unknown field {name!r}; expected one of {METRIC_FIELDS} "
+                f"or a stored indicator {sorted(self.known)}"
+            )
+        if name not in self.indicators:
+            # Correlated lookup on the (ticker_symbol, date, name) unique index
+            self.indicators[name] = (
+                select(IndicatorValue.value)
+                .where(
+                    IndicatorValue.ticker_symbol == self.latest.c.ticker,
+                    IndicatorValue.date == self.latest.c.date,
+                    IndicatorValue.name == name,
+                )
+                .scalar_subquery()
+                .label(name)
+            )
+        return self.indicators[name]
+
+    def condition(self, flt: Filter):
+        rhs = self.column(flt.value) if isinstance(flt.value, str) else literal(flt.value)
+        return _OPS[flt.op](self.column(flt.field), rhs)
+
+    def signal(self, sig: SignalFilter):
+        return exists().where(
+            SignalEvent.ticker_symbol == self.latest.c.ticker,
+            SignalEvent.signal_type == sig.signal_type,
+            SignalEvent.date <= self.latest.c.date,
+            SignalEvent.date >= func.date(self.latest.c.date, f"-{sig.days} days"),
+        )
+
+
+def build_statement(query: ScreenQuery, indicators: Iterable[str] = ()):
+    """Compile a ``ScreenQuery`` into a SQLAlchemy select over the latest rows.
+
+    Field names outside ``METRIC_FIELDS`` must be among ``indicators``;
+    anything else raises ``ValueError`` rather than matching nothing.
+    """
+    latest = _latest_rows()
+    comp = _Compiler(latest, indicators)
+    conditions = [comp.condition(f) for f in query.filters]
+    conditions += [comp.signal(s) for s in query.signals]
+    order = comp.column(query.order_by) if query.order_by else latest.c.ticker
+    stmt = select(latest, *comp.indicators.values())
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+    stmt = stmt.order_by(order.desc() if query.descending else order.asc(), latest.c.ticker)
+    if query.limit is not None:
+        stmt = stmt.limit(query.limit)
+    return stmt
+
+
+def screen(
+    db_path: str,
+    filters: Sequence[Union[str, Filter]] = (),
+    signals: Sequence[Union[str, SignalFilter]] = (),
+    order_by: Optional[str] = None,
+    descending: bool = False,
+    limit: Optional[int] = None,
+) -> pd.DataFrame:
+    """Screen every ticker's latest metrics in a single SQL query.
+
+    Args:
+        db_path: SQLite database path.
+        filters: Expressions like ``"price_to_book < 3"`` or ``"close > sma_200"``;
+            names other than the fixed metric columns refer to stored indicators,
+            and an unknown name raises ``ValueError``.
+        signals: Recent-signal requirements like ``"golden_cross:20"``.
+        order_by: Field to rank by (default: ticker).
+        descending: Rank highest first.
+        limit: Maximum number of rows.
+
+    Returns:
+        One row per matching ticker: ticker, the metric columns and any
+        indicator referenced by the query, in rank order.
+    """
+    query = ScreenQuery(
+        filters=[f if isinstance(f, Filter) else Filter.parse(f) for f in filters],
+        signals=[s if isinstance(s, SignalFilter) else SignalFilter.parse(s) for s in signals],
+        order_by=order_by,
+        descending=descending,
+        limit=limit,
+    )
+    with Session(get_engine(db_path)) as session:
+        stmt = build_statement(query, _latest_indicator_names(session))
+        result = session.execute(stmt)
+        df = pd.DataFrame(result.all(), columns=list(result.keys()))
+    logger.info("Screen matched %d tickers", len(df))
+    return df
@@ -1,10 +1,95 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import date
-from typing import List
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 
+SIGNAL_COLUMNS = ["ticker", "date", "signal_type"]
+
+
+@dataclass
+class Crossovers:
+    """Golden and death cross dates as ``datetime64[D]`` arrays."""
+
+    golden: np.ndarray
+    death: np.ndarray
+
+
+def _crossing_codes(
+    df: pd.DataFrame, hysteresis: float = 0.0, min_gap: int = 0, by: Optional[str] = None
+) -> np.ndarray:
+    """Per-row crossing code: +1 golden, -1 death, 0 none.
+
+    The regime is the sign of ``sma_50 - sma_200``, computed once; a cross is
+    a change of regime, read off its diff. Inside the hysteresis band
+    (``|spread| <= hysteresis * |sma_200|``, which at 0 is just a tie) the
+    previous regime is kept, so touching without crossing never signals.
+    With ``min_gap`` a cross only counts if the new regime lasts at least
+    ``min_gap`` bars before the next cross; repeated crosses of the same type
+    left by that filter collapse to the first. The newest cross is held back
+    until ``min_gap`` bars follow it, so a leading-edge flap is never emitted
+    that a later run would drop. ``by`` names a grouping column (e.g.
+    ticker) that regimes and gaps never cross; rows must be sorted by it.
+    """
+    s50 = pd.to_numeric(df["sma_50"], errors="coerce").to_numpy(dtype="float64")
+    s200 = pd.to_numeric(df["sma_200"], errors="coerce").to_numpy(dtype="float64")
+    spread = s50 - s200
+    band = hysteresis * np.abs(s200)
+    regime = pd.Series(np.where(spread > band, 1.0, np.where(spread < -band, -1.0, np.nan)))
+    groups = None if by is None else pd.Series(df[by].to_numpy())
+    if groups is None:
+        regime = regime.ffill()
+        step = regime.diff()
+    else:
+        regime = regime.groupby(groups, sort=False).ffill()
+        step = regime.groupby(groups, sort=False).diff()
+    codes = np.sign(step.fillna(0.0).to_numpy()).astype(np.int8)
+
+    if min_gap > 0:
+        idx = np.flatnonzero(codes)
+        if len(idx):
+            if groups is None:
+                row_grp = np.zeros(len(codes), dtype=np.int64)
+            else:
+                row_grp = pd.factorize(groups)[0]
+            # One past each group's last row; groups are contiguous
+            ends = np.flatnonzero(np.append(row_grp[1:] != row_grp[:-1], True)) + 1
+            grp = row_grp[idx]
+            same_next = np.append(grp[1:] == grp[:-1], False)
+            gap_next = np.where(same_next, np.append(np.diff(idx), 0), ends[grp] - idx)
+            keep = gap_next >= min_gap
+            idx, grp = idx[keep], grp[keep]
+            kinds = codes[idx]
+            repeat = np.zeros(len(idx), dtype=bool)
+            repeat[1:] = (grp[1:] == grp[:-1]) & (kinds[1:] == kinds[:-1])
+            codes = np.zeros_like(codes)
+            codes[idx[~repeat]] = kinds[~repeat]
+    return codes
+
+
+def _as_dates(values: np.ndarray) -> np.ndarray:
+    return np.asarray(pd.to_datetime(values).to_numpy(dtype="datetime64[D]"))
+
+
+def detect_crossovers(df: pd.DataFrame, hysteresis: float = 0.0, min_gap: int = 0) -> Crossovers:
+    """Detect golden and death crosses of one ticker in a single pass.
+
+    Args:
+        df: DataFrame with columns [date, sma_50, sma_200] sorted by date.
+        hysteresis: Band around ``sma_200``, as a fraction of it, that the
+            spread must leave before the regime flips.
+        min_gap: Minimum number of bars a new regime must last to count.
+
+    Returns:
+        Crossovers with ``datetime64[D]`` date arrays.
+    """
+    codes = _crossing_codes(df, hysteresis, min_gap)
+    dates = df["date"].to_numpy()
+    return Crossovers(golden=_as_dates(dates[codes > 0]), death=_as_dates(dates[codes < 0]))
+
 
 def detect_golden_crossover(df: pd.DataFrame) -> List[date]:
     """Detect dates where 50SMA crosses above 200SMA.
@@ -15,15 +100,37 @@ def detect_golden_crossover(df: pd.DataFrame) -> List[date]:
     Returns:
         List of dates where golden cross occurs.
     """
-    s50 = df["sma_50"]
-    s200 = df["sma_200"]
-    cond = (s50 > s200) & (s50.shift(1) <= s200.shift(1))
-    return [pd.to_datetime(d).date() for d in df.loc[cond.fillna(False), "date"].tolist()]
+    return detect_crossovers(df).golden.tolist()
 
 
 def detect_death_crossover(df: pd.DataFrame) -> List[date]:
     """Detect dates where 50SMA crosses below 200SMA."""
-    s50 = df["sma_50"]
-    s200 = df["sma_200"]
-    cond = (s50 < s200) & (s50.shift(1) >= s200.shift(1))
-    return [pd.to_datetime(d).date() for d in df.loc[cond.fillna(False), "date"].tolist()]
+    return detect_crossovers(df).death.tolist()
+
+
+def detect_crossovers_panel(
+    df: pd.DataFrame, hysteresis: float = 0.0, min_gap: int = 0
+) -> pd.DataFrame:
+    """Detect golden and death crosses for every ticker of a panel in one pass.
+
+    Uses the same regime rules as ``detect_crossovers``, grouped by ticker so
+    a crossing is never inferred across two tickers' series.
+
+    Args:
+        df: Long frame with columns [ticker, date, sma_50, sma_200].
+        hysteresis: See ``detect_crossovers``.
+        min_gap: See ``detect_crossovers``.
+
+    Returns:
+        Frame with columns [ticker, date, signal_type] sorted by ticker and
+        date, ready for ``database.save_signal_frame``.
+    """
+    df = df.sort_values(["ticker", "date"], kind="stable")
+    codes = _crossing_codes(df, hysteresis, min_gap, by="ticker")
+    hits = codes != 0
+    out = pd.DataFrame({
+        "ticker": df["ticker"].to_numpy()[hits],
+        "date": df["date"].to_numpy()[hits],
+        "signal_type": np.where(codes[hits] > 0, "golden_cross", "death_cross"),
+    })
+    return out[SIGNAL_COLUMNS]
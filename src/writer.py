@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .database import (
+    UpsertStats,
+    delete_signal_events,
+    save_daily_metrics,
+    save_fundamentals,
+    save_signal_frame,
+    session_scope,
+    upsert_ticker,
+)
+from .signals import SIGNAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteJob:
+    """Everything persisted for one ticker: ticker row, metrics and signal events.
+
+    ``indicators`` names the configured indicator columns of ``metrics`` to
+    store; ``filings``/``fundamentals`` are the source fundamentals kept for offline
+    reprocessing; ``replace_signals`` drops the ticker's stored signal events
+    before writing ``signals`` (for full recomputations).
+    """
+
+    ticker: str
+    metrics: pd.DataFrame
+    signals: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=SIGNAL_COLUMNS))
+    currency: Optional[str] = None
+    indicators: Tuple[str, ...] = ()
+    filings: Optional[pd.DataFrame] = None
+    fundamentals: Optional[Dict[str, Any]] = None
+    replace_signals: bool = False
+
+    @property
+    def rows(self) -> int:
+        return len(self.metrics) + len(self.signals)
+
+
+class _Barrier:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """Write-behind DB writer: one thread, a bounded queue and group commits.
+
+    ``submit`` enqueues a ``WriteJob`` and returns immediately, blocking only
+    while the queue is full (backpressure). The writer thread coalesces jobs
+    from many tickers into a single transaction once ``group_rows`` rows are
+    pending or the oldest pending job is ``group_seconds`` old. If a group
+    commit fails, its jobs are retried one by one so only the failing
+    tickers are lost. ``flush`` waits until everything submitted so far is
+    committed; ``close`` flushes and stops the thread.
+
+    Args:
+        db_path: SQLite database path (the writer is its only writer).
+        max_queue: Maximum queued jobs before ``submit`` blocks.
+        group_rows: Pending rows that trigger a commit.
+        group_seconds: Maximum age of a pending job before a commit.
+        on_commit: Optional ``(ticker, error_or_None, seconds)`` callback,
+            called from the writer thread once per job.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_queue: int = 64,
+        group_rows: int = 20000,
+        group_seconds: float = 0.5,
+        on_commit: Optional[Callable[[str, Optional[str], float], None]] = None,
+    ):
+        self.db_path = db_path
+        self.group_rows = group_rows
+        self.group_seconds = group_seconds
+        self.on_commit = on_commit
+        self.errors: Dict[str, str] = {}
+        self.commits = 0
+        # daily_metrics rows left untouched because they matched the stored values
+        self.skipped = 0
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, max_queue))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(self, job: WriteJob) -> None:
+        if self._closed:
+            raise RuntimeError("BackgroundWriter is closed")
+        self._queue.put(job)
+
+    def flush(self) -> None:
+        """Block until every job submitted before this call is committed (or failed)."""
+        if self._closed:
+            return
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        barrier.done.wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        pending: List[WriteJob] = []
+        pending_rows = 0
+        deadline: Optional[float] = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # group deadline reached
+            if isinstance(item, WriteJob):
+                pending.append(item)
+                pending_rows += item.rows
+                if deadline is None:
+                    deadline = time.monotonic() + self.group_seconds
+                # A steady trickle of jobs never times out the get(), so the
+                # age limit has to be checked here as well
+                if pending_rows < self.group_rows and time.monotonic() < deadline:
+                    continue
+            if pending:
+                self._commit(pending)
+                pending, pending_rows, deadline = [], 0, None
+            if isinstance(item, _Barrier):
+                item.done.set()
+            elif item is _STOP:
+                return
+
+    def _commit(self, jobs: List[WriteJob]) -> None:
+        start = time.perf_counter()
+        try:
+            stats = self._write(jobs)
+        except Exception as e:
+            if len(jobs) == 1:
+                self._report(jobs[0], str(e), time.perf_counter() - start)
+                logger.error("Failed to save %s to database: %s", jobs[0].ticker, e)
+                return
+            logger.warning(
+                "Group commit of %d tickers failed (%s); retrying one by one", len(jobs), e
+            )
+            for job in jobs:
+                self._commit([job])
+            return
+        self.commits += 1
+        self.skipped += stats.skipped
+        share = (time.perf_counter() - start) / len(jobs)
+        logger.info(
+            "Committed %d tickers (%d rows, %d unchanged) in one transaction",
+            len(jobs),
+            sum(j.rows for j in jobs),
+            stats.skipped,
+        )
+        for job in jobs:
+            self._report(job, None, share)
+
+    def _write(self, jobs: List[WriteJob]) -> UpsertStats:
+        stats = UpsertStats()
+        with session_scope(self.db_path) as session:
+            for job in jobs:
+                upsert_ticker(
+                    self.db_path,
+                    symbol=job.ticker,
+                    market=None,
+                    name=None,
+                    currency=job.currency,
+                    session=session,
+                )
+                if job.filings is not None or job.fundamentals is not None:
+                    save_fundamentals(
+                        self.db_path, job.ticker, job.filings, job.fundamentals, session=session
+                    )
+            replaced = [j.ticker for j in jobs if j.replace_signals]
+            if replaced:
+                delete_signal_events(self.db_path, replaced, session=session)
+            # One bulk save per indicator set (normally a single one per run)
+            by_indicators: Dict[Tuple[str, ...], List[pd.DataFrame]] = {}
+            for job in jobs:
+                if not job.metrics.empty:
+                    by_indicators.setdefault(job.indicators, []).append(job.metrics)
+            for indicators, frames in by_indicators.items():
+                saved = save_daily_metrics(
+                    self.db_path,
+                    pd.concat(frames, ignore_index=True),
+                    session=session,
+                    indicators=indicators,
+                )
+                stats.inserted += saved.inserted
+                stats.updated += saved.updated
+                stats.skipped += saved.skipped
+            signals = [j.signals for j in jobs if not j.signals.empty]
+            if signals:
+                frame = pd.concat(signals, ignore_index=True)
+                save_signal_frame(self.db_path, frame, session=session)
+        return stats
+
+    def _report(self, job: WriteJob, error: Optional[str], seconds: float) -> None:
+        if error is not None:
+            self.errors[job.ticker] = error
+        if self.on_commit is not None:
+            try:
+                self.on_commit(job.ticker, error, seconds)
+            except Exception:
+                logger.exception("on_commit callback failed for %s", job.ticker)
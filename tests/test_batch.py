@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import pytest
+from typer.testing import CliRunner
+
+from src import main
+from src.database import load_latest_metrics
+
+GOOD = ["AAA", "BRK.B"]
+
+
+@pytest.fixture()
+def replay_config(tmp_path, price_df_simple):
+    fixtures = tmp_path / "fixtures"
+    for i, symbol in enumerate(GOOD):
+        (fixtures / symbol).mkdir(parents=True)
+        hist = price_df_simple.rename(columns=str.title).set_index("Date")
+        (hist + i).to_csv(fixtures / symbol / "history.csv")
+        (fixtures / symbol / "info.json").write_text(
+            json.dumps({"currency": "USD", "sharesOutstanding": 1000}), encoding="utf-8"
+        )
+    # Unparseable history: the fetch itself fails
+    (fixtures / "BAD").mkdir()
+    (fixtures / "BAD" / "history.csv").write_text("Date,Close\nnot-a-date,1\n", encoding="utf-8")
+    config = tmp_path / "config.yaml"
+    config.write_text(
+        f"database:\n  path: {tmp_path / 'batch.db'}\n"
+        f"data_settings:\n  provider: replay\n  replay_dir: {fixtures}\n"
+        "  requests_per_second: 1000\n  rate_burst: 100\n",
+        encoding="utf-8",
+    )
+    return config
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--fetch-mode", "pool", "--workers", "1"],
+        ["--fetch-mode", "pool", "--workers", "2"],
+        ["--fetch-mode", "async", "--workers", "1"],
+        ["--fetch-mode", "async", "--workers", "2"],
+        ["--fetch-mode", "async", "--panel"],
+    ],
+    ids=["pool-serial", "pool", "async-serial", "async", "async-panel"],
+)
+def test_batch_writes_outputs_and_summary(tmp_path, replay_config, args):
+    out_dir = tmp_path / "results"
+    out = CliRunner().invoke(
+        main.app,
+        [
+            "batch",
+            "--tickers", "AAA,BAD",
+            "--tickers", "BRK.B,NONE",
+            "--output-dir", str(out_dir),
+            "--config", str(replay_config),
+            *args,
+        ],
+    )
+    # BAD failed to fetch
+    assert out.exit_code == 1, out.output
+
+    summary = json.loads((out_dir / "summary.json").read_text())
+    assert [t["ticker"] for t in summary["tickers"]] == ["AAA", "BAD", "BRK.B", "NONE"]
+    assert (summary["succeeded"], summary["failed"]) == (3, 1)
+    assert summary["total_seconds"] > 0
+    by_ticker = {t["ticker"]: t for t in summary["tickers"]}
+
+    bad = by_ticker["BAD"]
+    assert (bad["status"], bad["failed_stage"]) == ("failed", "fetch")
+    assert bad["error"] and bad["output"] is None
+    assert not (out_dir / "bad_analysis.json").exists()
+
+    # A symbol without fixtures has no price history, which is not a failure
+    assert by_ticker["NONE"]["status"] == "ok"
+    assert "no_price_history" in by_ticker["NONE"]["notes"]
+
+    for symbol, name in [("AAA", "aaa_analysis.json"), ("BRK.B", "brk_b_analysis.json")]:
+        entry = by_ticker[symbol]
+        assert entry["status"] == "ok"
+        assert entry["rows"] == 220
+        assert entry["output"] == str(out_dir / name)
+        assert json.loads((out_dir / name).read_text())["ticker"] == symbol
+        assert {"fetch", "process", "signals", "export", "persist"} <= set(entry["timings"])
+        assert all(secs >= 0 for secs in entry["timings"].values())
+    for stage in ("fetch", "process", "signals", "export", "persist"):
+        assert summary["stage_totals"][stage] == pytest.approx(
+            sum(t["timings"].get(stage, 0.0) for t in summary["tickers"])
+        )
+
+    latest = load_latest_metrics(str(tmp_path / "batch.db"))
+    assert set(latest["ticker"]) == set(GOOD)
+    closes = latest.set_index("ticker")["close"]
+    assert closes["BRK.B"] - closes["AAA"] == pytest.approx(1.0)
+    assert pd.notna(closes).all()
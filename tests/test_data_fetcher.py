@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from src import data_fetcher
+from src.async_fetch import TokenBucket, fetch_many
+from src.cache import CacheMiss, ResponseCache
+from src.config import AppConfig
+from src.database import init_db, save_daily_metrics
+from src.main import analyze_ticker
+from src.providers import CachedProvider, ReplayProvider, get_provider, record_fixtures
+
+
+class FakeProvider:
+    name = "fake"
+
+    def __init__(self, hist: pd.DataFrame):
+        self._hist = hist
+        self.history_calls = []
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        self.history_calls.append({"period": period, "start": start})
+        if start is not None:
+            return self._hist[self._hist.index >= pd.Timestamp(start)]
+        return self._hist
+
+    def quarterly_balance_sheet(self, symbol):
+        return pd.DataFrame()
+
+    def balance_sheet(self, symbol):
+        return pd.DataFrame()
+
+    def info(self, symbol):
+        return {"currency": "USD", "sharesOutstanding": 1000}
+
+    def first_trade_date(self, symbol):
+        self.history_calls.append({"probe": symbol})
+        return None if self._hist.empty else self._hist.index.min().date()
+
+
+def _yf_history(price_df: pd.DataFrame) -> pd.DataFrame:
+    hist = price_df.rename(columns=str.title).set_index("Date")
+    hist.index = pd.DatetimeIndex(pd.to_datetime(hist.index), name="Date")
+    return hist
+
+
+def test_incremental_fetch_requests_only_missing_range(tmp_path, price_df_simple):
+    cfg = AppConfig()
+    cfg.database.path = str(tmp_path / "inc.db")
+    cfg.data_settings.incremental = True
+    init_db(cfg.database.path)
+    stored = price_df_simple.iloc[:200].copy()
+    stored["ticker"] = "TEST"
+    save_daily_metrics(cfg.database.path, stored)
+
+    hist = _yf_history(price_df_simple)
+    hist.iloc[198, hist.columns.get_loc("Close")] = 500.0  # revised bar inside the overlap
+    fake = FakeProvider(hist)
+
+    raw = data_fetcher.fetch_stock_data("TEST", cfg, provider=fake)
+    prices = raw.to_price_frame()
+
+    last = stored["date"].iloc[-1]
+    assert fake.history_calls == [{"period": None, "start": last - timedelta(days=5)}]
+    assert len(prices) == len(price_df_simple)
+    assert prices["date"].is_unique
+    assert prices.loc[198, "close"] == 500.0
+
+    # A failed incremental request is a fetch failure, not a run on stored bars
+    class DownProvider(FakeProvider):
+        def history(self, symbol, period=None, start=None, interval="1d"):
+            raise ConnectionError("503 Service Unavailable")
+
+    with pytest.raises(ConnectionError):
+        data_fetcher.fetch_stock_data("TEST", cfg, provider=DownProvider(hist))
+
+
+def test_response_cache_serves_repeat_and_offline_fetches(tmp_path, price_df_simple):
+    cfg = AppConfig()
+    cfg.data_settings.provider = "replay"
+    cfg.data_settings.replay_dir = str(tmp_path / "fixtures")
+    cfg.data_settings.cache_dir = str(tmp_path / "cache")
+    live = FakeProvider(_yf_history(price_df_simple))
+    record_fixtures(live, "TEST", cfg.data_settings.replay_dir)
+
+    first = data_fetcher.fetch_stock_data("TEST", cfg)
+
+    # Offline runs must be served from the cache even with the fixtures gone
+    cfg.data_settings.replay_dir = str(tmp_path / "missing")
+    cfg.data_settings.offline = True
+    second = data_fetcher.fetch_stock_data("TEST", cfg)
+    pd.testing.assert_frame_equal(first.to_price_frame(), second.to_price_frame())
+    assert second.fundamentals.currency == "USD"
+
+
+def test_offline_cache_miss_is_a_failed_fetch(tmp_path):
+    cfg = AppConfig()
+    cfg.database.path = str(tmp_path / "empty.db")
+    cfg.data_settings.cache_dir = str(tmp_path / "cache")
+    cfg.data_settings.offline = True
+    with pytest.raises(CacheMiss):
+        data_fetcher.fetch_stock_data("TEST", cfg)
+
+    result = analyze_ticker("TEST", cfg)
+    assert result.failed_stage == "fetch"
+    assert "no_price_history" not in result.notes
+
+
+def test_replay_provider_applies_period_to_recorded_history(tmp_path, price_df_simple):
+    record_fixtures(FakeProvider(_yf_history(price_df_simple)), "TEST", str(tmp_path))
+    provider = ReplayProvider(str(tmp_path))
+    assert len(provider.history("TEST", period="max")) == len(price_df_simple)
+    month = provider.history("TEST", period="1mo")
+    last = pd.Timestamp(price_df_simple["date"].iloc[-1])
+    assert month.index.min() >= last - pd.DateOffset(months=1)
+    assert len(month) < len(price_df_simple)
+    assert provider.info("TEST")["sharesOutstanding"] == 1000
+    assert provider.history("NOPE", period="5y").empty
+
+    cfg = AppConfig()
+    cfg.data_settings.provider = "replay"
+    cfg.data_settings.replay_dir = str(tmp_path)
+    raw = data_fetcher.fetch_stock_data("TEST", cfg, provider=get_provider(cfg.data_settings))
+    assert len(raw.to_price_frame()) == len(price_df_simple)
+
+
+class SlowCountingProvider(FakeProvider):
+    def __init__(self, hist):
+        super().__init__(hist)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def _track(self, fn, *args, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.02)
+            return fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        if symbol == "EMPTY":
+            return pd.DataFrame()
+        return self._track(super().history, symbol, period, start, interval)
+
+    def info(self, symbol):
+        return self._track(super().info, symbol)
+
+
+def test_unknown_period_is_rejected_before_any_history_request(price_df_simple):
+    cfg = AppConfig()
+    cfg.data_settings.historical_period = "5 years"
+    provider = FakeProvider(_yf_history(price_df_simple))
+    with pytest.raises(ValueError, match="Unsupported period"):
+        data_fetcher.fetch_stock_data("TEST", cfg, provider=provider)
+    assert all("probe" in call for call in provider.history_calls)
+
+
+def test_async_fetch_respects_concurrency_cap(price_df_simple):
+    cfg = AppConfig()
+    cfg.data_settings.max_concurrency = 3
+    cfg.data_settings.requests_per_second = 0  # unlimited; only the cap applies
+    provider = SlowCountingProvider(_yf_history(price_df_simple))
+    tickers = [f"T{i}" for i in range(8)] + ["EMPTY"]
+
+    outcomes = fetch_many(tickers, cfg, provider=provider)
+
+    assert list(outcomes) == tickers
+    assert all(len(outcomes[t].raw.to_price_frame()) == len(price_df_simple) for t in tickers[:-1])
+    assert isinstance(outcomes["EMPTY"].error, RuntimeError)
+    assert 1 < provider.peak <= 3
+
+
+def test_token_bucket_limits_rate():
+    async def _run():
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.perf_counter()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(_run()) >= 5 / 50 * 0.9
+
+
+class YoungListingProvider(FakeProvider):
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        if period is not None:
+            self.history_calls.append({"period": period, "start": start})
+            return pd.DataFrame()
+        return super().history(symbol, period, start, interval)
+
+
+def test_young_listing_costs_one_probe_and_one_ranged_request(price_df_simple):
+    provider = YoungListingProvider(_yf_history(price_df_simple))
+    raw = data_fetcher.fetch_stock_data("NEW.NS", AppConfig(), provider=provider)
+    first = price_df_simple["date"].iloc[0]
+    assert provider.history_calls == [{"probe": "NEW.NS"}, {"period": None, "start": first}]
+    assert len(raw.to_price_frame()) == len(price_df_simple)
+
+
+def test_empty_symbol_is_negatively_cached(tmp_path):
+    cfg = AppConfig()
+    cfg.data_settings.cache_dir = str(tmp_path / "cache")
+    provider = FakeProvider(pd.DataFrame())
+    with pytest.raises(RuntimeError):
+        data_fetcher.fetch_stock_data("GONE", cfg, provider=provider)
+    assert provider.history_calls == [{"probe": "GONE"}]
+
+    with pytest.raises(RuntimeError, match="negative cache"):
+        data_fetcher.fetch_stock_data("GONE", cfg, provider=provider)
+    assert len(provider.history_calls) == 1
+
+
+def test_empty_probe_expires_with_the_negative_cache(tmp_path, price_df_simple):
+    cfg = AppConfig()
+    cfg.data_settings.cache_dir = str(tmp_path / "cache")
+    cfg.data_settings.negative_cache_ttl = 0  # entries expire at once
+    inner = FakeProvider(pd.DataFrame())
+    provider = CachedProvider(inner, ResponseCache.from_settings(cfg.data_settings))
+    with pytest.raises(RuntimeError):
+        data_fetcher.fetch_stock_data("IPO", cfg, provider=provider)
+
+    # The symbol starts listing: the next fetch probes again instead of
+    # replaying a cached empty probe
+    inner._hist = _yf_history(price_df_simple)
+    raw = data_fetcher.fetch_stock_data("IPO", cfg, provider=provider)
+    assert len(raw.to_price_frame()) == len(price_df_simple)
+    assert inner.history_calls.count({"probe": "IPO"}) == 2
+
+
+def test_provider_errors_do_not_mark_symbol_empty(tmp_path, price_df_simple):
+    class FlakyProvider(FakeProvider):
+        failures = 1
+
+        def first_trade_date(self, symbol):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("429 Too Many Requests")
+            return super().first_trade_date(symbol)
+
+    cfg = AppConfig()
+    cfg.data_settings.cache_dir = str(tmp_path / "cache")
+    provider = FlakyProvider(_yf_history(price_df_simple))
+    with pytest.raises(ConnectionError):
+        data_fetcher.fetch_stock_data("TEST", cfg, provider=provider)
+    raw = data_fetcher.fetch_stock_data("TEST", cfg, provider=provider)
+    assert len(raw.to_price_frame()) == len(price_df_simple)
+
+
+def test_fundamentals_endpoints_fetched_once_per_fetch(price_df_simple):
+    calls = []
+
+    class CountingProvider(FakeProvider):
+        def quarterly_balance_sheet(self, symbol):
+            calls.append("quarterly_balance_sheet")
+            return super().quarterly_balance_sheet(symbol)
+
+        def balance_sheet(self, symbol):
+            calls.append("balance_sheet")
+            return super().balance_sheet(symbol)
+
+        def info(self, symbol):
+            calls.append("info")
+            return super().info(symbol)
+
+    provider = CountingProvider(_yf_history(price_df_simple))
+    raw = data_fetcher.fetch_stock_data("TEST", AppConfig(), provider=provider)
+
+    assert raw.fundamentals.source == "info"
+    assert sorted(calls) == ["balance_sheet", "info", "quarterly_balance_sheet"]
+    assert {"history", "info", "balance_sheet"} <= set(raw.fetch_timings)
+
+    # Snapshots are scoped to one fetch, so a later fetch sees fresh responses
+    data_fetcher.fetch_stock_data("TEST", AppConfig(), provider=provider)
+    assert len(calls) == 6
+
+
+def test_snapshot_failures_are_retried():
+    attempts = []
+
+    class FlakyProvider(FakeProvider):
+        def info(self, symbol):
+            attempts.append(symbol)
+            if len(attempts) == 1:
+                raise ConnectionError("throttled")
+            return {"currency": "USD"}
+
+    snapshot = data_fetcher.FundamentalsSnapshot("TEST", FlakyProvider(pd.DataFrame()))
+    with pytest.raises(ConnectionError):
+        snapshot.get("info")
+    assert snapshot.info == {"currency": "USD"}
+    assert snapshot.info == {"currency": "USD"}
+    assert len(attempts) == 2
+
+
+def test_balance_sheets_become_filings_history(price_df_simple):
+    def _sheet(dates, equity):
+        return pd.DataFrame(
+            [equity, [5.0] * len(dates), [2.0] * len(dates)],
+            index=["Stockholders Equity", "Total Debt", "Cash And Cash Equivalents"],
+            columns=pd.to_datetime(dates),
+        )
+
+    class SheetProvider(FakeProvider):
+        def quarterly_balance_sheet(self, symbol):
+            return _sheet(["2024-06-30", "2024-03-31"], [40.0, 30.0])
+
+        def balance_sheet(self, symbol):
+            return _sheet(["2024-03-31", "2023-12-31"], [99.0, 20.0])
+
+    provider = SheetProvider(_yf_history(price_df_simple))
+    raw = data_fetcher.fetch_stock_data("TEST", AppConfig(), provider=provider)
+    assert [str(d) for d in raw.filings["as_of"]] == ["2023-12-31", "2024-03-31", "2024-06-30"]
+    assert list(raw.filings["total_shareholder_equity"]) == [20.0, 30.0, 40.0]
+    assert raw.fundamentals.source == "quarterly_balance_sheet"
+    assert float(raw.fundamentals.total_shareholder_equity) == 40.0
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from src.config import DatabaseConfig
+from src.database import (
+    DailyMetric,
+    DailyMetricCompact,
+    LatestMetric,
+    PriceBar,
+    dispose_engine,
+    get_engine,
+    init_db,
+    load_history,
+    load_latest_metrics,
+    load_price_history,
+    load_recent_metrics,
+    migrate_to_compact,
+    save_daily_metrics,
+    storage_layout,
+)
+
+
+def _metrics_frame(price_df: pd.DataFrame) -> pd.DataFrame:
+    df = price_df.copy()
+    df["ticker"] = "TEST"
+    df["sma_50"] = df["close"].rolling(50, min_periods=10).mean()
+    return df
+
+
+def test_save_daily_metrics_bulk_upsert_is_idempotent(tmp_path, price_df_simple):
+    db_path = str(tmp_path / "test.db")
+    init_db(db_path)
+    df = _metrics_frame(price_df_simple)
+
+    first = save_daily_metrics(db_path, df, chunk_size=64)
+    assert (first.inserted, first.updated) == (len(df), 0)
+
+    df.loc[df.index[-1], "close"] = 999.0
+    second = save_daily_metrics(db_path, df, chunk_size=64)
+    # only the revised row is rewritten
+    assert (second.inserted, second.updated, second.skipped) == (0, 1, len(df) - 1)
+
+    with Session(get_engine(db_path)) as session:
+        assert session.scalar(select(func.count()).select_from(DailyMetric)) == len(df)
+        last = session.scalar(select(DailyMetric).order_by(DailyMetric.date.desc()).limit(1))
+        assert last.close == 999.0
+        first_row = session.scalar(select(DailyMetric).order_by(DailyMetric.date).limit(1))
+        assert first_row.sma_50 is None
+
+
+def test_engine_is_cached_per_path(tmp_path):
+    db_path = str(tmp_path / "cached.db")
+    engine = get_engine(db_path)
+    assert get_engine(db_path) is engine
+    assert get_engine(str(tmp_path / "other.db")) is not engine
+    dispose_engine(db_path)
+    assert get_engine(db_path) is not engine
+
+
+def test_pragma_profile_applied_on_connect(tmp_path):
+    db_path = str(tmp_path / "pragmas.db")
+    pragmas = DatabaseConfig(path=db_path, profile="bulk-load", busy_timeout=1234).pragmas()
+    init_db(db_path, pragmas)
+    with get_engine(db_path).connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 0
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 1234
+
+
+def test_latest_metrics_tracks_newest_row(tmp_path, price_df_simple):
+    db_path = str(tmp_path / "latest.db")
+    init_db(db_path)
+    df = _metrics_frame(price_df_simple)
+    save_daily_metrics(db_path, df.iloc[:150])
+    save_daily_metrics(db_path, df.iloc[100:])
+    # Rewriting older dates must not move the snapshot backwards
+    save_daily_metrics(db_path, df.iloc[:10])
+    latest = load_latest_metrics(db_path)
+    assert latest["date"].tolist() == [df["date"].iloc[-1]]
+    assert latest["close"].iloc[0] == df["close"].iloc[-1]
+
+    # Databases written before the table existed are backfilled on init
+    with Session(get_engine(db_path)) as session:
+        session.execute(delete(LatestMetric))
+        session.commit()
+    init_db(db_path)
+    assert load_latest_metrics(db_path, ["TEST"])["date"].tolist() == [df["date"].iloc[-1]]
+
+
+def test_compact_layout_round_trips_and_migrates(tmp_path, price_df_simple):
+    df = _metrics_frame(price_df_simple)
+
+    compact = str(tmp_path / "compact.db")
+    init_db(compact, layout="compact")
+    save_daily_metrics(compact, df)
+    assert storage_layout(compact) == "compact"
+    again = save_daily_metrics(compact, df)
+    assert (again.inserted, again.updated, again.skipped) == (0, 0, len(df))
+    df.loc[df.index[-3], "sma_50"] = 1.5
+    revised = save_daily_metrics(compact, df)
+    assert (revised.updated, revised.skipped) == (1, len(df) - 1)
+    assert load_recent_metrics(compact, "TEST", 3)["sma_50"].iloc[0] == 1.5
+    history = load_price_history(compact, "TEST", start=df["date"].iloc[10], limit=5)
+    assert history["date"].tolist() == df["date"].iloc[-5:].tolist()
+    # The daily_metrics view decodes epoch days back to dates and keeps OHLCV
+    with Session(get_engine(compact)) as session:
+        view = session.execute(
+            select(DailyMetric.date, DailyMetric.close, DailyMetric.volume)
+            .where(DailyMetric.ticker_symbol == "TEST", DailyMetric.date >= df["date"].iloc[10])
+            .order_by(DailyMetric.date)
+        ).all()
+    assert [r.date for r in view] == df["date"].iloc[10:].tolist()
+    assert [r.close for r in view] == df["close"].iloc[10:].tolist()
+    # Databases written before price_bars existed are seeded from the view
+    bars = load_price_history(compact, "TEST")
+    assert len(bars) == len(df)
+    with Session(get_engine(compact)) as session:
+        session.execute(delete(PriceBar))
+        session.commit()
+    init_db(compact)
+    pd.testing.assert_frame_equal(load_price_history(compact, "TEST"), bars)
+
+    standard = str(tmp_path / "standard.db")
+    init_db(standard)
+    save_daily_metrics(standard, df)
+    before = load_recent_metrics(standard, "TEST", 20)
+    assert migrate_to_compact(standard, batch_size=64) == len(df)
+    assert storage_layout(standard) == "compact"
+    after = load_recent_metrics(standard, "TEST", 20)
+    pd.testing.assert_frame_equal(before, after)
+    with Session(get_engine(standard)) as session:
+        assert session.scalar(select(func.count()).select_from(DailyMetricCompact)) == len(df)
+
+
+def test_load_history_matches_stored_rows_in_both_layouts(tmp_path, price_df_simple):
+    df = pd.concat(
+        [_metrics_frame(price_df_simple), _metrics_frame(price_df_simple).assign(ticker="OTHER")],
+        ignore_index=True,
+    )
+    start, end = df["date"].iloc[20], df["date"].iloc[59]
+    for layout in ("standard", "compact"):
+        db_path = str(tmp_path / f"{layout}.db")
+        init_db(db_path, layout=layout)
+        save_daily_metrics(db_path, df)
+        out = load_history(
+            db_path, ["TEST", "OTHER", "NONE"], start, end, columns=["close", "sma_50"]
+        )
+        assert sorted(out) == ["OTHER", "TEST"]
+        expected = load_price_history(db_path, "TEST", start=start, end=end)
+        got = out["TEST"]
+        assert list(got) == ["date", "close", "sma_50"]
+        assert got["date"].tolist() == expected["date"].tolist()
+        np.testing.assert_array_equal(got["close"], expected["close"].to_numpy(dtype="float64"))
+        batch = load_history(
+            db_path, ["TEST"], columns=["volume"], as_arrow=True, batch_size=7
+        )["TEST"]
+        assert batch.num_rows == len(price_df_simple)
+
+
+def test_layout_change_by_another_process_is_seen(tmp_path, price_df_simple):
+    db_path = str(tmp_path / "shared.db")
+    df = _metrics_frame(price_df_simple)
+    init_db(db_path)
+    save_daily_metrics(db_path, df.iloc[:100])
+    assert storage_layout(db_path) == "standard"
+
+    script = f"from src.database import migrate_to_compact; migrate_to_compact({db_path!r})"
+    root = Path(__file__).resolve().parents[1]
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True)
+
+    assert storage_layout(db_path) == "compact"
+    saved = save_daily_metrics(db_path, df)
+    assert (saved.inserted, saved.skipped) == (len(df) - 100, 100)
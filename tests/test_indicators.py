@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import IndicatorSpec
+from src.database import init_db, load_recent_metrics, save_daily_metrics
+from src.indicators import EWM_WARMUP, IndicatorContext, compute_indicators, lookback_bars
+from src.models import RawData
+from src.processor import process_panel, to_daily_metrics
+
+SPECS = [
+    IndicatorSpec("ema_rsi", "ema", {"window": 5, "source": "rsi_14"}),  # declared before its input
+    IndicatorSpec("rsi_14", "rsi", {"window": 14}),
+    IndicatorSpec("ema_12", "ema", {"window": 12}),
+    IndicatorSpec("macd", "macd", {}),
+    IndicatorSpec("bb", "bollinger", {"window": 20}),
+    IndicatorSpec("atr_14", "atr", {"window": 14}),
+    IndicatorSpec("vol_20", "sma", {"window": 20, "source": "volume"}),
+]
+
+
+def _prices(seed: int, n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    return pd.DataFrame({
+        "date": pd.date_range("2023-01-02", periods=n, freq="B").date,
+        "open": close, "high": close + rng.uniform(0, 2, n), "low": close - rng.uniform(0, 2, n),
+        "close": close, "volume": rng.integers(1_000, 5_000, n),
+    })
+
+
+def test_panel_indicators_match_single_series_reference():
+    a, b = _prices(0, 120).assign(ticker="AAA"), _prices(1, 80).assign(ticker="BBB")
+    out = compute_indicators(pd.concat([a, b], ignore_index=True), SPECS)
+    got = out[out["ticker"] == "BBB"].reset_index(drop=True)
+
+    close = b["close"]
+    ema12 = close.ewm(span=12, adjust=False, min_periods=12).mean()
+    macd = ema12 - close.ewm(span=26, adjust=False, min_periods=26).mean()
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    tr = pd.concat(
+        [b["high"] - b["low"], (b["high"] - close.shift()).abs(), (b["low"] - close.shift()).abs()],
+        axis=1,
+    ).max(axis=1)
+
+    pd.testing.assert_series_equal(got["ema_12"], ema12, check_names=False)
+    pd.testing.assert_series_equal(got["macd"], macd, check_names=False)
+    pd.testing.assert_series_equal(got["rsi_14"], 100 - 100 / (1 + gain / loss), check_names=False)
+    pd.testing.assert_series_equal(
+        got["bb_upper"], close.rolling(20).mean() + 2 * close.rolling(20).std(), check_names=False
+    )
+    pd.testing.assert_series_equal(
+        got["atr_14"], tr.ewm(alpha=1 / 14, adjust=False, min_periods=14).mean(), check_names=False
+    )
+    assert got["ema_rsi"].notna().sum() > 0
+
+
+def test_shared_intermediates_are_computed_once(monkeypatch):
+    df = _prices(0, 60).assign(ticker="AAA")
+    spy = []
+    original_memo = IndicatorContext._memo
+
+    def memo(self, key, compute):
+        if key not in self._cache:
+            spy.append(key)
+        return original_memo(self, key, compute)
+
+    monkeypatch.setattr(IndicatorContext, "_memo", memo)
+    compute_indicators(df, SPECS)
+    # ema_12 is read by both the configured EMA and MACD but computed once
+    assert spy.count(("ewm", "close", 2 / 13, 12)) == 1
+
+
+def test_dependency_cycle_is_rejected():
+    specs = [
+        IndicatorSpec("x", "ema", {"window": 3, "source": "y"}),
+        IndicatorSpec("y", "ema", {"window": 3, "source": "x"}),
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        compute_indicators(_prices(0, 10).assign(ticker="AAA"), specs)
+
+
+def test_indicators_flow_to_models_and_database(tmp_path):
+    specs = [IndicatorSpec("rsi_14", "rsi", {"window": 14}), IndicatorSpec("bb", "bollinger", {})]
+    df = process_panel([RawData(ticker="AAA", price_frame=_prices(0, 60))], specs)
+    assert list(df.columns[-4:]) == ["rsi_14", "bb_mid", "bb_upper", "bb_lower"]
+    last = to_daily_metrics(df.tail(1))[0]
+    assert set(last.indicators) == {"rsi_14", "bb_mid", "bb_upper", "bb_lower"}
+
+    db_path = str(tmp_path / "ind.db")
+    init_db(db_path)
+    df["note"] = "not an indicator"  # unconfigured extra columns are ignored
+    save_daily_metrics(db_path, df, indicators=["rsi_14", "bb_mid", "bb_upper", "bb_lower"])
+    stored = load_recent_metrics(db_path, "AAA", 5)
+    expected = df.tail(5).reset_index(drop=True)
+    np.testing.assert_allclose(stored["rsi_14"], expected["rsi_14"])
+    np.testing.assert_allclose(stored["bb_lower"], expected["bb_lower"])
+
+
+def test_incremental_ewm_indicators_match_full_recompute():
+    specs = [
+        IndicatorSpec("rsi_14", "rsi", {"window": 14}),
+        IndicatorSpec("macd", "macd", {}),
+        IndicatorSpec("atr_14", "atr", {"window": 14}),
+        IndicatorSpec("ema_rsi", "ema", {"window": 5, "source": "rsi_14"}),
+        IndicatorSpec("ema_sma", "ema", {"window": 10, "source": "sma_200"}),
+    ]
+    prices = _prices(3, 2000)
+    full = process_panel([RawData(ticker="AAA", price_frame=prices)], specs)
+
+    new_from = 1990
+    window = prices.iloc[new_from - lookback_bars(specs) :]
+    inc = process_panel(
+        [RawData(ticker="AAA", price_frame=window, incremental_from=prices["date"][new_from])],
+        specs,
+    )
+    # Core columns are valid sources and their windows count toward the lookback
+    assert lookback_bars([]) == 252
+    assert lookback_bars(specs[-1:]) == 200 + 10 * EWM_WARMUP
+    cols = ["rsi_14", "macd", "macd_signal", "macd_hist", "atr_14", "ema_rsi", "ema_sma"]
+    expected = full.iloc[new_from - 1 :].reset_index(drop=True)  # anchor row + new bars
+    np.testing.assert_allclose(inc[cols].to_numpy(), expected[cols].to_numpy(), rtol=1e-12)
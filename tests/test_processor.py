@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
-from src.models import RawData, PriceBar
-from src.processor import process_data
+from src.models import PriceBar, RawData, RawFundamentals
+from src.processor import (
+    INDICATOR_LOOKBACK,
+    METRIC_COLUMNS,
+    process_data,
+    process_panel,
+    to_daily_metrics,
+    validate_metrics_frame,
+)
 
 
 def test_sma_calculation():
@@ -19,3 +27,102 @@ def test_sma_calculation():
     # Last row must have non-null SMAs due to min_periods settings
     last = out.sort_values("date").iloc[-1]
     assert pd.notna(last["sma_50"]) and pd.notna(last["sma_200"])  # computed
+
+
+def test_price_frame_ingestion_drops_invalid_rows(price_df_simple):
+    df = price_df_simple.copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.tz_localize("America/New_York")
+    df.loc[5, "high"] = df.loc[5, "low"] - 1  # high < low
+    df.loc[6, "close"] = float("nan")
+    df["volume"] = df["volume"].astype(float)
+    df.loc[7, "volume"] = float("nan")
+    raw = RawData(ticker="TEST", price_frame=df, fundamentals=None)
+    prices = raw.to_price_frame()
+    assert len(prices) == len(df) - 2
+    assert str(prices["volume"].dtype) == "Int64" and prices["volume"].isna().sum() == 1
+    assert prices["date"].iloc[0] == price_df_simple["date"].iloc[0]
+    out = process_data(raw)
+    assert len(out) > 0 and "sma_50" in out.columns
+
+
+def test_validate_metrics_frame_masks_invalid_rows(price_df_simple):
+    df = price_df_simple.copy()
+    df["ticker"] = "TEST"
+    df.loc[3, "high"] = df.loc[3, "low"] - 5
+    df.loc[4, "open"] = None
+    out = validate_metrics_frame(df)
+    assert len(out) == len(df) - 2
+    assert list(out.columns) == METRIC_COLUMNS
+    models = to_daily_metrics(out.tail(3))
+    assert len(models) == 3 and models[-1].sma_50 is None and models[-1].volume == 1000
+
+
+def test_incremental_processing_matches_full_recompute():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2022-01-03", periods=400, freq="B").date
+    close = 100 + rng.normal(0, 1, len(dates)).cumsum()
+    prices = pd.DataFrame({
+        "date": dates, "open": close, "high": close + 1, "low": close - 1,
+        "close": close, "volume": 1000,
+    })
+    full = process_data(RawData(ticker="TEST", price_frame=prices))
+
+    new_from = 395
+    window = prices.iloc[new_from - INDICATOR_LOOKBACK :]
+    inc = process_data(
+        RawData(ticker="TEST", price_frame=window, incremental_from=dates[new_from])
+    )
+    assert list(inc["date"]) == list(dates[new_from - 1 :])
+    expected = full.iloc[new_from - 1 :].reset_index(drop=True)
+    cols = ["sma_50", "sma_200", "high_52w", "pct_from_52w_high"]
+    np.testing.assert_allclose(inc[cols].to_numpy(), expected[cols].to_numpy(), rtol=1e-10)
+
+
+def test_fundamentals_are_joined_point_in_time(price_df_simple):
+    filings = pd.DataFrame({
+        "as_of": [pd.Timestamp("2024-03-29").date(), pd.Timestamp("2024-06-28").date()],
+        "total_shareholder_equity": [1000.0, 4000.0],
+        "total_debt": [50.0, 80.0],
+        "cash_and_short_term_investments": [10.0, 20.0],
+        "shares_outstanding": [100.0, np.nan],
+    })
+    fund = RawFundamentals(shares_outstanding=200)
+    raw = RawData(ticker="TEST", price_frame=price_df_simple, fundamentals=fund, filings=filings)
+    out = process_data(raw, filing_lag_days=0)
+    by_date = out.set_index("date")
+    before = by_date.loc[pd.Timestamp("2024-03-28").date()]
+    first = by_date.loc[pd.Timestamp("2024-06-27").date()]
+    second = by_date.loc[pd.Timestamp("2024-06-28").date()]
+    assert np.isnan(before["book_value_per_share"]) and np.isnan(before["enterprise_value"])
+    assert first["book_value_per_share"] == 10.0
+    assert first["enterprise_value"] == 100 * first["close"] + 50 - 10
+    # Second filing lacks shares, so the info share count applies
+    assert second["book_value_per_share"] == 20.0
+    assert second["price_to_book"] == second["close"] / 20.0
+
+    # By default a filing only applies once its publication lag has passed
+    lagged = process_data(raw).set_index("date")
+    assert np.isnan(lagged.loc[pd.Timestamp("2024-05-10").date(), "book_value_per_share"])
+    assert lagged.loc[pd.Timestamp("2024-05-13").date(), "book_value_per_share"] == 10.0
+
+
+def test_panel_matches_per_ticker_processing(price_df_simple):
+    rng = np.random.default_rng(1)
+    long_dates = pd.date_range("2022-01-03", periods=300, freq="B").date
+    close = 50 + rng.normal(0, 1, len(long_dates)).cumsum()
+    long_prices = pd.DataFrame({
+        "date": long_dates, "open": close, "high": close + 1, "low": close - 1,
+        "close": close, "volume": 10,
+    })
+    raws = [
+        RawData(ticker="AAA", price_frame=long_prices, fundamentals=RawFundamentals(book_value=5)),
+        RawData(ticker="BBB", price_frame=price_df_simple),
+        RawData(ticker="CCC", price_frame=long_prices, incremental_from=long_dates[290]),
+    ]
+    panel = process_panel(raws)
+    assert list(panel["ticker"].unique()) == ["AAA", "BBB", "CCC"]
+    for raw in raws:
+        expected = process_data(raw)
+        got = panel[panel["ticker"] == raw.ticker].reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, expected)
+    assert len(panel[panel["ticker"] == "CCC"]) == 11  # anchor row + 10 new bars
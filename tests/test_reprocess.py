@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from typer.testing import CliRunner
+
+from src.config import AppConfig, DatabaseConfig
+from src.database import (
+    get_engine,
+    init_db,
+    load_fundamentals,
+    load_price_history,
+    load_recent_metrics,
+    load_signal_events,
+    save_signal_events,
+)
+from src.main import _stored_raws, _write_job, analyze_raw, app
+from src.models import RawData, RawFundamentals
+from src.writer import BackgroundWriter
+
+
+def _raw(ticker: str, seed: int) -> RawData:
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, 260).cumsum()
+    prices = pd.DataFrame({
+        "date": pd.date_range("2023-01-02", periods=260, freq="B").date,
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1000,
+    })
+    filings = pd.DataFrame({
+        "as_of": [date(2022, 12, 31), date(2023, 6, 30)],
+        "total_shareholder_equity": [1e9, 1.2e9],
+        "total_debt": [2e8, 1e8],
+        "cash_and_short_term_investments": [5e7, 6e7],
+        "shares_outstanding": [1e7, 1e7],
+    })
+    fundamentals = RawFundamentals(
+        total_shareholder_equity=Decimal("1.2e9"), shares_outstanding=10_000_000,
+        book_value=Decimal("120"), enterprise_value=Decimal("1.5e9"), currency="USD",
+        as_of=date(2023, 6, 30), source="quarterly",
+    )
+    return RawData(ticker=ticker, price_frame=prices, fundamentals=fundamentals, filings=filings)
+
+
+def test_reprocess_rebuilds_derived_metrics_from_local_data(tmp_path):
+    db_path = str(tmp_path / "bars.db")
+    cfg = AppConfig(database=DatabaseConfig(path=db_path))
+    init_db(db_path)
+    with BackgroundWriter(db_path) as writer:
+        for i, ticker in enumerate(["AAA", "BBB"]):
+            writer.submit(_write_job(analyze_raw(_raw(ticker, i), cfg=cfg), cfg))
+    before = load_recent_metrics(db_path, "AAA", 300)
+    assert len(load_price_history(db_path, "AAA")) == 260
+    filings, snapshots = load_fundamentals(db_path, ["AAA"])
+    assert len(filings) == 2 and snapshots["currency"].tolist() == ["USD"]
+
+    # Stored source data alone reproduces the original input
+    rebuilt = {raw.ticker: raw for raw in _stored_raws(db_path, ["AAA", "BBB"])}
+    pd.testing.assert_frame_equal(rebuilt["AAA"].price_frame, _raw("AAA", 0).price_frame)
+
+    # Corrupt derived data, then recompute it without the network
+    with get_engine(db_path).begin() as conn:
+        conn.execute(text("UPDATE daily_metrics SET sma_50 = 0, price_to_book = NULL"))
+    save_signal_events(db_path, "AAA", [date(2023, 1, 3)], "death_cross")
+    config = tmp_path / "config.yaml"
+    config.write_text(f"database:\n  path: {db_path}\n", encoding="utf-8")
+
+    out = CliRunner().invoke(app, ["reprocess", "--config", str(config)])
+    assert out.exit_code == 0, out.output
+    pd.testing.assert_frame_equal(load_recent_metrics(db_path, "AAA", 300), before)
+    assert (date(2023, 1, 3), "death_cross") not in load_signal_events(db_path, "AAA")
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from src.database import init_db, save_daily_metrics, save_signal_events
+from src.screener import Filter, screen
+
+
+def _seed(db_path: str) -> None:
+    init_db(db_path)
+    rows = []
+    start = date(2024, 1, 1)
+    universe = [("AAA", 2.0, -3.0), ("BBB", 5.0, -1.0), ("CCC", 1.5, -20.0), ("DDD", 2.5, -4.0)]
+    for ticker, pb, pct in universe:
+        for i in range(3):
+            rows.append({
+                "ticker": ticker, "date": start + timedelta(days=i), "open": 10.0, "high": 11.0,
+                "low": 9.0, "close": 10.0 + i, "volume": 100,
+                # only the latest row satisfies the screen
+                "price_to_book": pb if i == 2 else 99.0, "pct_from_52w_high": pct,
+                "rsi_14": 40.0 + i,
+            })
+    save_daily_metrics(db_path, pd.DataFrame(rows), indicators=["rsi_14"])
+    save_signal_events(db_path, "AAA", [start], "golden_cross")
+    save_signal_events(db_path, "DDD", [start - timedelta(days=60)], "golden_cross")
+
+
+def test_screen_filters_latest_rows_and_recent_signals(tmp_path):
+    db_path = str(tmp_path / "screen.db")
+    _seed(db_path)
+
+    out = screen(
+        db_path, ["price_to_book < 3", "pct_from_52w_high >= -5"], order_by="price_to_book"
+    )
+    assert list(out["ticker"]) == ["AAA", "DDD"]
+    assert set(out["date"]) == {date(2024, 1, 3)}
+
+    recent = screen(db_path, ["price_to_book < 3"], signals=["golden_cross:20"])
+    assert list(recent["ticker"]) == ["AAA"]
+
+    ranked = screen(
+        db_path,
+        ["rsi_14 >= 42", "close > open"],
+        order_by="price_to_book",
+        descending=True,
+        limit=2,
+    )
+    assert list(ranked["ticker"]) == ["BBB", "DDD"]
+    assert list(ranked["rsi_14"]) == [42.0, 42.0]
+
+    # A typo is an error, not an empty screen
+    for typo in (["price_to_bok < 3"], ["close > rsi_41"]):
+        with pytest.raises(ValueError, match="Unknown field"):
+            screen(db_path, typo)
+    with pytest.raises(ValueError, match="Unknown field"):
+        screen(db_path, order_by="rsi_41")
+
+
+def test_filter_parsing_rejects_garbage():
+    assert Filter.parse("close > sma_200") == Filter("close", ">", "sma_200")
+    assert Filter.parse("price_to_book<=3") == Filter("price_to_book", "<=", 3.0)
+    for bad in ["close >", "close ~ 3", "1 < close", "close > sma;drop"]:
+        with pytest.raises(ValueError):
+            Filter.parse(bad)
@@ -1,8 +1,21 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
-from src.signals import detect_death_crossover, detect_golden_crossover
+from src.config import AppConfig, DatabaseConfig, SignalSettings
+from src.database import init_db, load_price_history, load_signal_events, save_signal_frame
+from src.indicators import lookback_bars
+from src.main import _write_job, analyze_raw
+from src.models import RawData
+from src.processor import INDICATOR_LOOKBACK
+from src.signals import (
+    detect_crossovers,
+    detect_crossovers_panel,
+    detect_death_crossover,
+    detect_golden_crossover,
+)
+from src.writer import BackgroundWriter
 
 
 def test_golden_and_death_cross_detection():
@@ -18,3 +31,95 @@ def test_golden_and_death_cross_detection():
     # Golden on day index 2, Death on day index 4
     assert dates[2] in golden
     assert dates[4] in death
+
+
+def test_panel_crossovers_do_not_leak_across_tickers(tmp_path):
+    dates = pd.date_range("2024-01-01", periods=4, freq="D").date
+    df = pd.DataFrame({
+        "ticker": ["AAA"] * 4 + ["BBB"] * 4,
+        "date": list(dates) * 2,
+        # AAA ends below, BBB starts above: a naive shift would see a golden cross
+        "sma_50": [3, 1, 1, 1, 2, 2, 1, 1],
+        "sma_200": [2, 2, 2, 2, 1, 1, 2, 2],
+    })
+    signals = detect_crossovers_panel(df)
+    assert signals.values.tolist() == [
+        ["AAA", dates[1], "death_cross"],
+        ["BBB", dates[2], "death_cross"],
+    ]
+
+    db_path = str(tmp_path / "signals.db")
+    init_db(db_path)
+    save_signal_frame(db_path, signals)
+    save_signal_frame(db_path, signals)  # idempotent
+    assert load_signal_events(db_path, "BBB") == [(dates[2], "death_cross")]
+
+
+def test_hysteresis_and_min_gap_suppress_flapping():
+    dates = pd.date_range("2024-01-01", periods=8, freq="D").date
+    df = pd.DataFrame({
+        "date": dates,
+        "sma_200": [100.0] * 8,
+        "sma_50": [95, 100.5, 99.5, 100.5, 99.5, 103, 103, 103],
+    })
+    raw = detect_crossovers(df)
+    assert raw.golden.dtype == np.dtype("datetime64[D]")
+    assert len(raw.golden) == 3 and len(raw.death) == 2
+
+    banded = detect_crossovers(df, hysteresis=0.01)
+    assert banded.golden.tolist() == [dates[5]] and len(banded.death) == 0
+
+    gapped = detect_crossovers(df, min_gap=2)
+    assert gapped.golden.tolist() == [dates[5]] and len(gapped.death) == 0
+
+
+def test_newest_cross_is_held_back_until_min_gap_bars_follow():
+    dates = pd.date_range("2024-01-01", periods=6, freq="D").date
+    df = pd.DataFrame({
+        "date": dates,
+        "sma_200": [100.0] * 6,
+        "sma_50": [95, 95, 95, 95, 105, 105],
+    })
+    assert len(detect_crossovers(df, min_gap=3).golden) == 0
+    more = pd.concat([df, df.tail(1).assign(date=dates[-1] + pd.Timedelta(days=1))])
+    assert detect_crossovers(more, min_gap=3).golden.tolist() == [dates[4]]
+
+
+def test_incremental_signals_match_full_recompute(tmp_path):
+    db_path = str(tmp_path / "signals.db")
+    cfg = AppConfig(
+        database=DatabaseConfig(path=db_path),
+        signals=SignalSettings(hysteresis=0.002, min_gap=10),
+    )
+    init_db(db_path)
+    n = 700
+    close = 100 + 10 * np.sin(np.arange(n) / 40.0)
+    prices = pd.DataFrame({
+        "date": pd.date_range("2021-01-04", periods=n, freq="B").date,
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1000,
+    })
+    full = analyze_raw(RawData(ticker="AAA", price_frame=prices), cfg=cfg)
+    assert len(full.golden) >= 2 and len(full.death) >= 2
+
+    # Store a prefix that ends a few bars after a cross, then catch up in two runs
+    cut = prices.index[prices["date"] == full.golden[-1]][0] + 3
+    with BackgroundWriter(db_path) as writer:
+        prefix = analyze_raw(RawData(ticker="AAA", price_frame=prices.iloc[:cut]), cfg=cfg)
+        assert full.golden[-1] not in prefix.golden  # not yet confirmed
+        writer.submit(_write_job(prefix, cfg))
+    lookback = max(INDICATOR_LOOKBACK, lookback_bars(cfg.indicators))
+    for end in (cut + 5, n):
+        start = load_price_history(db_path, "AAA")["date"].max()
+        new_from = prices.index[prices["date"] > start][0]
+        raw = RawData(
+            ticker="AAA",
+            price_frame=prices.iloc[max(0, new_from - lookback) : end],
+            incremental_from=prices["date"][new_from],
+        )
+        with BackgroundWriter(db_path) as writer:
+            writer.submit(_write_job(analyze_raw(raw, cfg=cfg), cfg))
+
+    expected = sorted(
+        [(d, "golden_cross") for d in full.golden] + [(d, "death_cross") for d in full.death]
+    )
+    assert load_signal_events(db_path, "AAA") == expected
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+import pandas as pd
+from typer.testing import CliRunner
+
+from src import main
+from src import writer as writer_module
+from src.database import init_db, load_latest_metrics, load_signal_events
+from src.main import PipelineResult
+from src.processor import validate_metrics_frame
+from src.writer import BackgroundWriter, WriteJob
+
+
+def _job(ticker: str, n: int = 3) -> WriteJob:
+    dates = [date(2024, 1, 1) + timedelta(days=i) for i in range(n)]
+    metrics = pd.DataFrame({
+        "ticker": ticker, "date": dates, "open": 10.0, "high": 11.0, "low": 9.0,
+        "close": [10.0 + i for i in range(n)], "volume": 100,
+    })
+    signals = pd.DataFrame(
+        {"ticker": [ticker], "date": [dates[1]], "signal_type": ["golden_cross"]}
+    )
+    return WriteJob(ticker=ticker, metrics=metrics, signals=signals)
+
+
+def test_jobs_are_group_committed_and_flushed(tmp_path):
+    db_path = str(tmp_path / "writer.db")
+    init_db(db_path)
+    seen = []
+    with BackgroundWriter(db_path, max_queue=2, group_rows=10_000, group_seconds=60,
+                          on_commit=lambda t, err, secs: seen.append((t, err))) as writer:
+        for ticker in ["AAA", "BBB", "CCC"]:
+            writer.submit(_job(ticker))
+        writer.flush()
+        assert writer.commits == 1  # one transaction for all three tickers
+        assert set(load_latest_metrics(db_path)["ticker"]) == {"AAA", "BBB", "CCC"}
+        writer.submit(_job("DDD"))
+        writer.submit(_job("AAA"))  # unchanged rerun
+    assert writer.commits == 2
+    assert writer.skipped == 3
+    assert seen == [(t, None) for t in ["AAA", "BBB", "CCC", "DDD", "AAA"]]
+    assert load_signal_events(db_path, "DDD") == [(date(2024, 1, 2), "golden_cross")]
+
+
+def test_failed_group_is_retried_per_ticker(tmp_path):
+    db_path = str(tmp_path / "writer.db")
+    init_db(db_path)
+    bad = _job("BAD")
+    bad.metrics["date"] = None  # violates NOT NULL
+    with BackgroundWriter(db_path, group_rows=10_000, group_seconds=60) as writer:
+        for job in [_job("AAA"), bad, _job("BBB")]:
+            writer.submit(job)
+    assert set(writer.errors) == {"BAD"}
+    assert set(load_latest_metrics(db_path)["ticker"]) == {"AAA", "BBB"}
+
+
+class _SlowJob(WriteJob):
+    """Job the writer thread takes a while to queue, so submits never let the queue drain."""
+
+    @property
+    def rows(self) -> int:
+        time.sleep(0.02)
+        return super().rows
+
+
+def test_group_deadline_holds_under_steady_submits(tmp_path):
+    db_path = str(tmp_path / "writer.db")
+    init_db(db_path)
+    submitted: Dict[str, float] = {}
+    ages: List[float] = []
+
+    def on_commit(ticker, error, seconds):
+        ages.append(time.monotonic() - submitted[ticker])
+
+    # max_queue=1: each submit returns once the writer picked up the previous job,
+    # and the next job is already waiting, so the queue get() never times out
+    with BackgroundWriter(
+        db_path, max_queue=1, group_rows=10_000, group_seconds=0.1, on_commit=on_commit
+    ) as writer:
+        for i in range(50):
+            job = _job(f"T{i:02d}")
+            submitted[job.ticker] = time.monotonic()
+            writer.submit(_SlowJob(job.ticker, job.metrics, job.signals))
+        writer.flush()
+    assert len(ages) == 50
+    assert writer.commits > 1
+    assert max(ages) < 0.6
+
+
+def test_run_reports_failed_save_after_commit(tmp_path, monkeypatch):
+    db_path = tmp_path / "run.db"
+    config = tmp_path / "config.yaml"
+    config.write_text(f"database:\n  path: {db_path}\n", encoding="utf-8")
+    metrics = validate_metrics_frame(_job("BAD").metrics)
+    monkeypatch.setattr(main, "analyze_ticker", lambda t, cfg: PipelineResult(ticker=t, df=metrics))
+
+    def _fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(writer_module, "save_daily_metrics", _fail)
+    output = tmp_path / "BAD.json"
+
+    out = CliRunner().invoke(
+        main.app, ["run", "--ticker", "BAD", "--output", str(output), "--config", str(config)]
+    )
+    assert out.exit_code == 1
+    assert json.loads(output.read_text())["notes"] == ["database_save_failed"]